@@ -0,0 +1,94 @@
+"""
+Answer comparators
+- Each question gets a comparator tag when it is generated (comparator_for)
+- The tag is stored next to the answer, so grading is a single dict dispatch
+  with no runtime type sniffing and no exception-driven parsing
+"""
+
+import re
+
+# Comparator tags
+EXACT_INT = 'exact_int'                    # whole-number answers
+QUOTIENT_REMAINDER = 'quotient_remainder'  # division: {'quotient': q, 'remainder': r}
+CHART_TRIPLE = 'chart_triple'              # charts: three text/number answers
+FRACTION_TOLERANCE = 'fraction_tolerance'  # decimal answers, within 5%
+EXACT = 'exact'                            # anything else: plain equality
+
+FRACTION_TOLERANCE_RATIO = 0.05
+
+NUMBER_PATTERN = re.compile(r'\s*[-+]?(\d+\.?\d*|\.\d+)\s*')
+
+
+def comparator_for(answer):
+    """Pick the comparator tag for a freshly generated answer"""
+    if isinstance(answer, dict) and 'quotient' in answer and 'remainder' in answer:
+        return QUOTIENT_REMAINDER
+    if isinstance(answer, list) and len(answer) == 3:
+        return CHART_TRIPLE
+    if isinstance(answer, bool):
+        return EXACT
+    if isinstance(answer, int):
+        return EXACT_INT
+    if isinstance(answer, float):
+        return FRACTION_TOLERANCE
+    return EXACT
+
+
+def _as_number(value):
+    """User input as a number, or None if it isn't one (no exceptions)"""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        try:
+            float(value)        # a JSON int too big for a float can't be right, and would overflow below
+        except OverflowError:
+            return None
+        return value
+    if isinstance(value, float):
+        return value
+    if isinstance(value, str) and NUMBER_PATTERN.fullmatch(value):
+        return float(value)
+    return None
+
+
+def _exact_int(correct, user):
+    return _as_number(user) == correct
+
+
+def _quotient_remainder(correct, user):
+    return (
+        isinstance(user, dict)
+        and str(user.get('quotient')) == str(correct['quotient'])
+        and str(user.get('remainder')) == str(correct['remainder'])
+    )
+
+
+def _chart_triple(correct, user):
+    return (
+        isinstance(user, list)
+        and len(user) == 3
+        and all(str(u).strip().lower() == str(c).strip().lower() for u, c in zip(user, correct))
+    )
+
+
+def _fraction_tolerance(correct, user):
+    number = _as_number(user)
+    return number is not None and abs(number - correct) <= FRACTION_TOLERANCE_RATIO * abs(correct)
+
+
+def _exact(correct, user):
+    return user == correct
+
+
+COMPARATORS = {
+    EXACT_INT: _exact_int,
+    QUOTIENT_REMAINDER: _quotient_remainder,
+    CHART_TRIPLE: _chart_triple,
+    FRACTION_TOLERANCE: _fraction_tolerance,
+    EXACT: _exact,
+}
+
+
+def compare_answer(comparator, correct, user):
+    """Grade a user's answer with the comparator chosen at generation time"""
+    return COMPARATORS[comparator](correct, user)
@@ -0,0 +1,482 @@
+"""
+Answer storage for issued questions
+
+Every store implements the BaseAnswerStore interface. Two backends ship:
+- MemoryAnswerStore: in-process, bounded with LRU eviction and a TTL, lock striped
+  so concurrent requests rarely wait on each other. Remembers recently dropped
+  ids, so a lookup can say whether an answer expired or was never issued.
+- SQLiteAnswerStore: a SQLite database in WAL mode that several workers on one
+  host can share. Inserts are group-committed by a background writer thread
+  before the question goes out, and expired rows are purged periodically.
+
+Pick one with ANSWER_STORE=memory|sqlite (see create_answer_store).
+"""
+
+import atexit
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# Lookup statuses
+FOUND = 'found'
+EXPIRED = 'expired'
+EVICTED = 'evicted'
+NOT_ISSUED = 'not_issued'
+
+DEFAULT_MAX_SIZE = 50000
+DEFAULT_TTL = 2 * 60 * 60  # 2 hours is longer than any quiz session
+DEFAULT_STRIPES = 16
+DEFAULT_SQLITE_PATH = os.path.join(os.path.dirname(__file__), 'answers.sqlite3')
+
+# How many expired entries a single put() may sweep from the front of a stripe
+SWEEP_LIMIT = 8
+
+
+class BaseAnswerStore:
+    """Interface shared by all answer store backends"""
+
+    def put(self, question_id, answer):
+        """Store the answer for a newly issued question"""
+        self.put_many([(question_id, answer)])
+
+    def put_many(self, items):
+        """Store several (question_id, answer) pairs in one operation"""
+        raise NotImplementedError
+
+    def lookup(self, question_id):
+        """
+        Look up an answer.
+
+        Returns:
+            (status, answer) where status is FOUND, EXPIRED, EVICTED or NOT_ISSUED
+            and answer is None unless status is FOUND
+        """
+        raise NotImplementedError
+
+    def get(self, question_id):
+        """Return the stored answer, or None if it is missing or expired"""
+        return self.lookup(question_id)[1]
+
+    def purge_expired(self):
+        """Drop every expired entry. Returns the number of entries removed."""
+        raise NotImplementedError
+
+    def stats(self):
+        """Snapshot of size and counters"""
+        raise NotImplementedError
+
+    def fill_ratio(self):
+        """How full a bounded store is (0.0 to 1.0), or None if it has no size limit"""
+        return None
+
+    def close(self):
+        """Flush pending writes and release resources"""
+
+    def __len__(self):
+        return self.stats()['size']
+
+
+class _Stripe:
+    """One independently locked slice of the store"""
+
+    __slots__ = ('lock', 'entries', 'tombstones', 'capacity',
+                 'hits', 'misses', 'evictions', 'expirations')
+
+    def __init__(self, capacity):
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()     # id -> (expires_at, answer), oldest first
+        self.tombstones = OrderedDict()  # id -> EXPIRED / EVICTED, bounded like entries
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def bury(self, question_id, reason):
+        self.tombstones[question_id] = reason
+        if len(self.tombstones) > self.capacity:
+            self.tombstones.popitem(last=False)
+
+
+class MemoryAnswerStore(BaseAnswerStore):
+    """
+    Thread-safe, bounded in-process answer store.
+
+    Args:
+        max_size: Maximum number of answers kept in memory
+        ttl: Seconds an answer stays valid after it was stored
+        stripes: Number of lock stripes (max_size is split evenly between them)
+        clock: Time source, in seconds (monotonic by default)
+    """
+
+    def __init__(self, max_size=DEFAULT_MAX_SIZE, ttl=DEFAULT_TTL,
+                 stripes=DEFAULT_STRIPES, clock=time.monotonic):
+        stripes = max(1, min(stripes, max_size))
+        self.max_size = max_size
+        self.ttl = ttl
+        self._clock = clock
+        per_stripe = -(-max_size // stripes)  # ceiling division
+        self._stripes = [_Stripe(per_stripe) for _ in range(stripes)]
+
+    def _stripe(self, question_id):
+        return self._stripes[hash(question_id) % len(self._stripes)]
+
+    def put(self, question_id, answer):
+        stripe = self._stripe(question_id)
+        with stripe.lock:
+            self._insert(stripe, question_id, answer, self._clock())
+
+    def put_many(self, items):
+        # Group by stripe so each lock is taken once per batch
+        by_stripe = {}
+        for question_id, answer in items:
+            by_stripe.setdefault(self._stripe(question_id), []).append((question_id, answer))
+        now = self._clock()
+        for stripe, stripe_items in by_stripe.items():
+            with stripe.lock:
+                for question_id, answer in stripe_items:
+                    self._insert(stripe, question_id, answer, now)
+
+    def _insert(self, stripe, question_id, answer, now):
+        """Insert one entry; the caller holds stripe.lock"""
+        entries = stripe.entries
+        entries[question_id] = (now + self.ttl, answer)
+        entries.move_to_end(question_id)
+        stripe.tombstones.pop(question_id, None)
+
+        # Opportunistically drop expired entries from the old end
+        for _ in range(SWEEP_LIMIT):
+            oldest_id, (expires_at, _answer) = next(iter(entries.items()))
+            if expires_at > now or oldest_id == question_id:
+                break
+            del entries[oldest_id]
+            stripe.bury(oldest_id, EXPIRED)
+            stripe.expirations += 1
+
+        # Least recently used entries go first when the stripe is full
+        while len(entries) > stripe.capacity:
+            evicted_id, _entry = entries.popitem(last=False)
+            stripe.bury(evicted_id, EVICTED)
+            stripe.evictions += 1
+
+    def lookup(self, question_id):
+        now = self._clock()
+        stripe = self._stripe(question_id)
+        with stripe.lock:
+            entry = stripe.entries.get(question_id)
+            if entry is not None:
+                expires_at, answer = entry
+                if expires_at > now:
+                    stripe.entries.move_to_end(question_id)
+                    stripe.hits += 1
+                    return FOUND, answer
+                del stripe.entries[question_id]
+                stripe.bury(question_id, EXPIRED)
+                stripe.expirations += 1
+                stripe.misses += 1
+                return EXPIRED, None
+            stripe.misses += 1
+            return stripe.tombstones.get(question_id, NOT_ISSUED), None
+
+    def purge_expired(self):
+        now = self._clock()
+        removed = 0
+        for stripe in self._stripes:
+            with stripe.lock:
+                expired = [qid for qid, (expires_at, _answer) in stripe.entries.items()
+                           if expires_at <= now]
+                for qid in expired:
+                    del stripe.entries[qid]
+                    stripe.bury(qid, EXPIRED)
+                stripe.expirations += len(expired)
+                removed += len(expired)
+        return removed
+
+    def stats(self):
+        totals = {'backend': 'memory', 'size': 0, 'max_size': self.max_size, 'ttl': self.ttl,
+                  'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0}
+        for stripe in self._stripes:
+            with stripe.lock:
+                totals['size'] += len(stripe.entries)
+                totals['hits'] += stripe.hits
+                totals['misses'] += stripe.misses
+                totals['evictions'] += stripe.evictions
+                totals['expirations'] += stripe.expirations
+        return totals
+
+    def __len__(self):
+        return sum(len(stripe.entries) for stripe in self._stripes)
+
+    def fill_ratio(self):
+        return len(self) / self.max_size
+
+
+# SQL used by SQLiteAnswerStore. Statements are kept as constants so sqlite3's
+# per-connection statement cache reuses the prepared statement every time.
+_SQL_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS answers ("
+    " id TEXT PRIMARY KEY, answer TEXT NOT NULL, expires_at REAL NOT NULL"
+    ") WITHOUT ROWID",
+    "CREATE INDEX IF NOT EXISTS answers_expires_at ON answers (expires_at)",
+)
+_SQL_INSERT = "INSERT OR REPLACE INTO answers (id, answer, expires_at) VALUES (?, ?, ?)"
+_SQL_SELECT = "SELECT answer, expires_at FROM answers WHERE id = ?"
+_SQL_PURGE = "DELETE FROM answers WHERE expires_at <= ?"
+_SQL_COUNT = "SELECT COUNT(*) FROM answers"
+
+
+class SQLiteAnswerStore(BaseAnswerStore):
+    """
+    Answer store backed by a SQLite database in WAL mode.
+
+    Several worker processes on one host can point at the same file. Writes go
+    through a queue to a background writer thread that commits them in batches
+    (concurrent requests share one transaction); put_many() returns once its
+    rows are committed, so any worker can look them up as soon as the question
+    has been sent. Lookups read the database once and never wait. Reads use one
+    connection per thread.
+
+    If a commit fails (e.g. "database is locked" under heavy contention), the
+    writer logs it and retries the batch; this process keeps answering lookups
+    for those rows from its pending entries, and put_many() stops waiting after
+    commit_wait seconds.
+
+    Expired rows are kept for purge_grace seconds, so lookups can still report
+    them as expired, and then deleted by the writer thread.
+
+    Args:
+        path: Database file shared by the workers
+        ttl: Seconds an answer stays valid after it was stored
+        batch_size: Maximum number of rows committed in one transaction
+        flush_interval: Seconds the writer waits for more rows before committing
+        purge_interval: Seconds between purges of expired rows
+        purge_grace: Seconds an expired row is kept before it is purged
+        commit_wait: Most seconds put_many() waits for its rows to be committed
+        retry_delay: Seconds the writer waits before retrying a failed commit
+    """
+
+    def __init__(self, path=DEFAULT_SQLITE_PATH, ttl=DEFAULT_TTL, batch_size=500,
+                 flush_interval=0.005, purge_interval=60, purge_grace=DEFAULT_TTL,
+                 commit_wait=1.0, retry_delay=0.5, clock=time.time):
+        self.path = path
+        self.ttl = ttl
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.purge_interval = purge_interval
+        self.purge_grace = purge_grace
+        self.commit_wait = commit_wait
+        self.retry_delay = retry_delay
+        self._clock = clock
+        self._counter_lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._writes = 0
+        self._batches = 0
+        self._write_errors = 0
+
+        connection = self._connect()
+        connection.execute("PRAGMA journal_mode=WAL")
+        for statement in _SQL_SCHEMA:
+            connection.execute(statement)
+        connection.commit()
+        connection.close()
+
+        self._reset_process_state()
+        atexit.register(self.close)
+
+    def _reset_process_state(self):
+        """(Re)create per-process state; also used after a fork"""
+        self._pid = os.getpid()
+        self._local = threading.local()
+        self._pending = {}  # id -> (expires_at, answer), not committed yet
+        self._pending_lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._writer = None
+        self._writer_lock = threading.Lock()
+        self._last_purge = self._clock()
+
+    def _connect(self):
+        connection = sqlite3.connect(self.path, timeout=10, cached_statements=32)
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.execute("PRAGMA busy_timeout=10000")
+        return connection
+
+    def _connection(self):
+        """Connection for the calling thread, opened on first use"""
+        if self._pid != os.getpid():
+            # Connections and threads don't survive a fork; start fresh in the child
+            self._reset_process_state()
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = self._local.connection = self._connect()
+        return connection
+
+    def _ensure_writer(self):
+        if self._pid != os.getpid():
+            self._reset_process_state()
+        if self._writer is None or not self._writer.is_alive():
+            with self._writer_lock:
+                if self._writer is None or not self._writer.is_alive():
+                    # First use, or the writer died: start one (queued rows are kept)
+                    self._writer = threading.Thread(target=self._write_loop,
+                                                    name='answer-store-writer', daemon=True)
+                    self._writer.start()
+
+    def put_many(self, items):
+        self._ensure_writer()
+        expires_at = self._clock() + self.ttl
+        rows = [(question_id, json.dumps(answer, separators=(',', ':')), expires_at)
+                for question_id, answer in items]
+        with self._pending_lock:
+            for question_id, answer in items:
+                self._pending[question_id] = (expires_at, answer)
+        committed = threading.Event()
+        self._queue.put((rows, committed))
+        committed.wait(self.commit_wait)
+
+    def _write_loop(self):
+        """Background writer: commit queued rows in batches, purge expired rows"""
+        connection = self._connection()
+        rows, waiters = [], []      # a failed batch is kept and retried
+        stop = False
+        while True:
+            if not rows:
+                # Sleep until rows arrive or the next purge is due
+                timeout = max(0, self._last_purge + self.purge_interval - self._clock())
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    item = ()
+                if item is None:
+                    stop = True
+                elif item:
+                    rows.extend(item[0])
+                    waiters.append(item[1])
+
+            # Give concurrent requests a moment to join this transaction
+            deadline = time.monotonic() + self.flush_interval
+            while rows and not stop and len(rows) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                else:
+                    rows.extend(item[0])
+                    waiters.append(item[1])
+
+            try:
+                if rows:
+                    self._commit(connection, rows)
+                    with self._pending_lock:
+                        for question_id, _answer, _expires_at in rows:
+                            self._pending.pop(question_id, None)
+                    with self._counter_lock:
+                        self._writes += len(rows)
+                        self._batches += 1
+                    for committed in waiters:
+                        committed.set()
+                    rows, waiters = [], []
+
+                now = self._clock()
+                if now - self._last_purge >= self.purge_interval:
+                    self._last_purge = now
+                    self._purge(connection, now)
+            except sqlite3.Error as e:
+                with self._counter_lock:
+                    self._write_errors += 1
+                print(f"Answer store write failed ({len(rows)} rows, will retry): {e}")
+                if stop:
+                    # Shutting down: nothing will retry; the rows stay in this process only
+                    connection.close()
+                    return
+                time.sleep(self.retry_delay)
+                continue
+
+            if stop:
+                connection.close()
+                return
+
+    def _commit(self, connection, rows):
+        with connection:
+            connection.executemany(_SQL_INSERT, rows)
+
+    def _purge(self, connection, now):
+        with connection:
+            return connection.execute(_SQL_PURGE, (now - self.purge_grace,)).rowcount
+
+    def lookup(self, question_id):
+        now = self._clock()
+        with self._pending_lock:
+            entry = self._pending.get(question_id)
+        if entry is None:
+            entry = self._select(question_id)
+
+        with self._counter_lock:
+            if entry is not None and entry[0] > now:
+                self._hits += 1
+            else:
+                self._misses += 1
+        if entry is None:
+            return NOT_ISSUED, None
+        expires_at, answer = entry
+        if expires_at <= now:
+            return EXPIRED, None
+        return FOUND, answer
+
+    def _select(self, question_id):
+        """(expires_at, answer) from the database, or None"""
+        row = self._connection().execute(_SQL_SELECT, (question_id,)).fetchone()
+        if row is None:
+            return None
+        return row[1], json.loads(row[0])
+
+    def purge_expired(self):
+        # Unlike the periodic purge there's no grace period here
+        return self._purge(self._connection(), self._clock())
+
+    def stats(self):
+        size = self._connection().execute(_SQL_COUNT).fetchone()[0]
+        with self._pending_lock:
+            pending = len(self._pending)
+        with self._counter_lock:
+            return {'backend': 'sqlite', 'size': size, 'pending': pending, 'ttl': self.ttl,
+                    'hits': self._hits, 'misses': self._misses,
+                    'writes': self._writes, 'batches': self._batches,
+                    'write_errors': self._write_errors}
+
+    def close(self):
+        """Flush queued writes and stop the writer thread"""
+        if self._writer is not None and self._pid == os.getpid():
+            self._queue.put(None)
+            self._writer.join(timeout=5)
+            self._writer = None
+
+
+def create_answer_store():
+    """
+    Build the answer store from environment settings.
+
+    ANSWER_STORE=memory (default) keeps answers in this process.
+    ANSWER_STORE=sqlite shares them between workers through ANSWER_STORE_PATH.
+    """
+    ttl = int(os.environ.get('ANSWER_STORE_TTL', DEFAULT_TTL))
+    backend = os.environ.get('ANSWER_STORE', 'memory')
+    if backend == 'sqlite':
+        return SQLiteAnswerStore(
+            path=os.environ.get('ANSWER_STORE_PATH', DEFAULT_SQLITE_PATH),
+            ttl=ttl,
+        )
+    if backend != 'memory':
+        raise RuntimeError(f"Unknown ANSWER_STORE backend: {backend}")
+    return MemoryAnswerStore(
+        max_size=int(os.environ.get('ANSWER_STORE_MAX_SIZE', DEFAULT_MAX_SIZE)),
+        ttl=ttl,
+        stripes=int(os.environ.get('ANSWER_STORE_STRIPES', DEFAULT_STRIPES)),
+    )
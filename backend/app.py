@@ -1,75 +1,236 @@
 
-from flask import Flask, jsonify, request, send_from_directory
+from flask import Flask, jsonify, request, g
 from flask_cors import CORS
+from werkzeug.middleware.proxy_fix import ProxyFix
 import random
 import uuid
 import csv
 import os
-from grades import grade_1, grade_2, grade_3, grade_4, grade_5, grade_6
+import re
+import time
+import hmac
+from collections import namedtuple
+from functools import partial
+from types import MappingProxyType
+from grades import available_grades, get_generator, get_spec, sections_for
+from answer_store import create_answer_store, EXPIRED, EVICTED, FOUND
+from question_tokens import create_token_signer, INVALID
+from question_pool import create_question_pool
+from chart_plans import compile_chart_question, evaluate_plan
+from answer_checks import comparator_for, compare_answer, CHART_TRIPLE
+from static_assets import create_static_assets
+from metrics import MetricsRegistry, CONTENT_TYPE as METRICS_CONTENT_TYPE
+from profiling import create_profiler
+from content_banks import create_content_banks
+from bank_cache import create_bank_cache
+from responses import ResponseSchemas, json_response
+from rate_limit import create_rate_limiter, create_load_shedder, retry_after
+from question_sampler import create_sampler
+from session_history import create_session_history, parse_time, DEFAULT_PAGE_SIZE as SESSION_PAGE_SIZE
 
 app = Flask(__name__)
 CORS(app)
 
-# Load graph data from CSV
-def load_graph_data():
+# Behind N reverse proxies, take the client address from X-Forwarded-For (rate limits are per client)
+TRUSTED_PROXIES = int(os.environ.get('TRUSTED_PROXIES', 0))
+if TRUSTED_PROXIES:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=TRUSTED_PROXIES)
+
+# Answers for issued questions (bounded, expires old entries)
+ANSWER_STORE = create_answer_store()
+
+# Signed answer tokens (ANSWER_MODE=token): answers travel with the question
+# instead of living in this process, so any worker can check them
+TOKEN_SIGNER = create_token_signer()
+
+# Request and selection metrics, served at /metrics
+METRICS = MetricsRegistry()
+REQUEST_LATENCY = METRICS.histogram('quiz_request_duration_seconds', 'Request latency by route',
+                                    ('route', 'grade', 'section', 'status'))
+TEMPLATE_SELECTIONS = METRICS.counter('quiz_template_selections_total',
+                                      'Word problem templates and charts picked for questions',
+                                      ('section', 'template'))
+
+# Sampled request profiling (PROFILE_SAMPLE_RATE > 0), downloadable by admins
+PROFILER = create_profiler()
+
+# Shared secret for /api/admin endpoints, sent as the X-Admin-Token header (unset = disabled)
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN')
+
+# Grades with a grades/grade_<N>.py module; each is imported the first time it is used
+GRADES = frozenset(available_grades())
+
+# Charts are offered from this grade up (shared across grades, see generate_question)
+CHART_MIN_GRADE = 5
+
+# Largest quiz /api/questions will generate in one request
+MAX_BATCH_SIZE = 100
+
+# Sections wrapped in word problems (one {section}_templates.csv each), from this grade up
+WORD_PROBLEM_SECTIONS = ('addition', 'subtraction', 'multiplication', 'division')
+WORD_PROBLEM_MIN_GRADE = 4
+
+# Operand slots a template may use; generators return them in result['operands']
+TEMPLATE_SLOTS = ('a', 'b')
+TEMPLATE_SLOT_PATTERN = re.compile(r'\{(\w+)\}')
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), 'data')
+GRAPH_CSV = os.path.join(DATA_DIR, 'graphs', 'chart_problems.csv')
+GRAPH_COLUMNS = ('ID', 'Question1', 'Answer1', 'Question2', 'Answer2', 'Question3', 'Answer3',
+                 'GraphType', 'Title', 'Labels', 'Values', 'MinGrade')
+TEMPLATE_COLUMNS = ('ID', 'Template', 'Category', 'Emoji')
+CHART_INT_PATTERN = re.compile(r'[-+]?\d+')
+CHART_FLOAT_PATTERN = re.compile(r'[-+]?(\d+\.?\d*|\.\d+)([eE][-+]?\d+)?')
+
+def require_columns(reader, columns, csv_path):
+    missing = [column for column in columns if column not in (reader.fieldnames or ())]
+    if missing:
+        raise ValueError(f"{os.path.basename(csv_path)} is missing columns {missing}")
+
+# Chart values: whole numbers become ints, decimals floats, anything else 0
+def parse_chart_value(text):
+    text = text.strip()
+    if CHART_INT_PATTERN.fullmatch(text):
+        return int(text)
+    if CHART_FLOAT_PATTERN.fullmatch(text):
+        val = float(text)
+        return int(val) if val.is_integer() else val
+    return 0
+
+# Load graph data from CSV (raises ValueError on a malformed file)
+def load_graph_data(csv_path=GRAPH_CSV):
     graphs = []
-    csv_path = os.path.join(os.path.dirname(__file__), 'data', 'graphs', 'chart_problems.csv')
-    try:
-        with open(csv_path, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                # Parse values, handling both integers and floats
-                values = []
-                for v in row['Values'].split(','):
-                    try:
-                        # Try to parse as float first, then convert to int if it's a whole number
-                        val = float(v)
-                        if val.is_integer():
-                            values.append(int(val))
-                        else:
-                            values.append(val)
-                    except ValueError:
-                        values.append(0)
-                
-                graphs.append({
-                    'id': row['ID'],
-                    'questions': [row['Question1'], row['Question2'], row['Question3']],
-                    'answers': [row['Answer1'], row['Answer2'], row['Answer3']],
-                    'graph_type': row['GraphType'],
-                    'title': row['Title'],
-                    'labels': row['Labels'].split(','),
-                    'values': values,
-                    'min_grade': int(row['MinGrade'])
-                })
-    except Exception as e:
-        print(f"Error loading graph data: {e}")
+    with open(csv_path, 'r', encoding='utf-8') as f:
+        reader = csv.DictReader(f)
+        require_columns(reader, GRAPH_COLUMNS, csv_path)
+        for row in reader:
+            # Parse values, handling both integers and floats
+            values = [parse_chart_value(v) for v in row['Values'].split(',')]
+            
+            questions = [row['Question1'], row['Question2'], row['Question3']]
+            answers = [row['Answer1'], row['Answer2'], row['Answer3']]
+            labels = row['Labels'].split(',')
+            if len(labels) != len(values):
+                raise ValueError(f"chart {row['ID']} has {len(labels)} labels but {len(values)} values")
+            
+            # Compile each question into an answer plan once, instead of on every request
+            plans = []
+            for question, answer in zip(questions, answers):
+                plan, problem = compile_chart_question(question, labels, answer)
+                if problem:
+                    print(f"Chart {row['ID']}: \"{question}\": {problem}")
+                plans.append(plan)
+            
+            graphs.append({
+                'id': row['ID'],
+                'questions': questions,
+                'answers': answers,
+                'plans': plans,
+                'graph_type': row['GraphType'],
+                'title': row['Title'],
+                'category': row.get('Category') or '',
+                'labels': labels,
+                'values': values,
+                'min_grade': int(row['MinGrade'])
+            })
+    if not graphs:
+        raise ValueError("no charts")
     return graphs
 
-# Load word problem templates from CSV
-def load_word_problem_templates(operation):
+# Split a template into literal text and operand slots once, at load time:
+# 'Sam has {a} apples' -> ('Sam has ', 'a', ' apples')
+def compile_template(text):
+    pieces = tuple(TEMPLATE_SLOT_PATTERN.split(text))
+    unknown = set(pieces[1::2]) - set(TEMPLATE_SLOTS)
+    if unknown:
+        raise ValueError(f"unknown slots {sorted(unknown)}")
+    return pieces
+
+# Fill a compiled template with the operands the generator returned
+def render_template(pieces, operands):
+    parts = list(pieces)
+    parts[1::2] = [str(operands[slot]) for slot in pieces[1::2]]
+    return ''.join(parts)
+
+def template_csv(operation):
+    return os.path.join(DATA_DIR, 'word_problems', f'{operation}_templates.csv')
+
+# Load word problem templates from CSV (raises ValueError on a malformed file)
+def load_word_problem_templates(operation, csv_path=None):
+    csv_path = csv_path or template_csv(operation)
     templates = []
-    csv_path = os.path.join(os.path.dirname(__file__), 'data', 'word_problems', f'{operation}_templates.csv')
-    try:
-        with open(csv_path, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                templates.append({
-                    'id': row['ID'],
-                    'template': row['Template'],
-                    'category': row['Category'],
-                    'emoji': row['Emoji']
-                })
-        print(f"Loaded {len(templates)} {operation} templates")
-    except Exception as e:
-        print(f"Error loading {operation} templates: {e}")
+    with open(csv_path, 'r', encoding='utf-8') as f:
+        reader = csv.DictReader(f)
+        require_columns(reader, TEMPLATE_COLUMNS, csv_path)
+        for row in reader:
+            try:
+                pieces = compile_template(row['Template'])
+            except ValueError as e:
+                print(f"Skipping {operation} template {row['ID']}: {e}")
+                continue
+            templates.append({
+                'id': row['ID'],
+                'template': row['Template'],
+                'pieces': pieces,
+                'category': row['Category'],
+                'emoji': row['Emoji']
+            })
+    if not templates:
+        raise ValueError(f"no usable {operation} templates")
+    print(f"Loaded {len(templates)} {operation} templates")
     return templates
 
-GRAPH_DATA = load_graph_data()
-ADDITION_TEMPLATES = load_word_problem_templates('addition')
-SUBTRACTION_TEMPLATES = load_word_problem_templates('subtraction')
+# Index graphs by (grade, graph type, category) so chart selection is a single lookup.
+# None in a key means "any"; grades with no eligible graphs fall back to all graphs.
+def build_graph_index(graphs):
+    max_grade = max([max(GRADES)] + [g['min_grade'] for g in graphs])
+    index = {}
+    for grade in range(1, max_grade + 1):
+        eligible = [g for g in graphs if g['min_grade'] <= grade] or graphs
+        for graph in eligible:
+            graph_type = graph['graph_type'].lower()
+            category = graph['category'].lower()
+            for key in ((grade, None, None), (grade, graph_type, None),
+                        (grade, None, category), (grade, graph_type, category)):
+                index.setdefault(key, []).append(graph)
+    return {key: tuple(graphs) for key, graphs in index.items()}, max_grade
+
+# One consistent version of every content bank; replaced as a whole on reload, never modified
+ContentSnapshot = namedtuple('ContentSnapshot', 'graphs graph_index graph_index_max_grade templates')
+
+def build_content_snapshot(parts):
+    """Snapshot from freshly loaded parts: {'graphs': [...], '<section>': [...templates]}"""
+    graphs = tuple(parts['graphs'])
+    graph_index, max_grade = build_graph_index(graphs)
+    templates = MappingProxyType({section: tuple(parts[section]) for section in WORD_PROBLEM_SECTIONS})
+    return ContentSnapshot(graphs, MappingProxyType(graph_index), max_grade, templates)
+
+# Content banks: name -> (CSV path, parser, contents if it fails to load at startup).
+# A bank that fails to load is empty (charts fall back to a static example).
+CONTENT_SOURCES = dict(
+    [('graphs', (GRAPH_CSV, load_graph_data, []))] +
+    [(section, (template_csv(section), partial(load_word_problem_templates, section), []))
+     for section in WORD_PROBLEM_SECTIONS]
+)
+
+# Parsed banks are kept in binary cache files and only re-parsed when a CSV changes
+BANK_CACHE = create_bank_cache()
+
+# Chart bank and word problem templates, reloaded when their CSVs change
+CONTENT_BANKS = create_content_banks(
+    {name: (path, BANK_CACHE.wrap(parse) if BANK_CACHE else parse, fallback)
+     for name, (path, parse, fallback) in CONTENT_SOURCES.items()},
+    build_content_snapshot,
+)
+
+def eligible_graphs(grade, graph_type=None, category=None, bank=None):
+    """Graphs a grade may see, optionally filtered by graph type and category"""
+    bank = bank or CONTENT_BANKS.current()
+    grade = min(max(grade, 1), bank.graph_index_max_grade)
+    return bank.graph_index.get((grade, graph_type and graph_type.lower(), category and category.lower()), ())
 
 # Generate random values for graph and compute answers dynamically
-def generate_graph_values_and_answers(graph, grade):
+def generate_graph_values_and_answers(graph, grade, rng=random):
     """
     Generate random values based on grade level and recalculate answers.
     Returns: (new_values, new_answers)
@@ -79,140 +240,61 @@ def generate_graph_values_and_answers(graph, grade):
     # Generate random values based on grade
     if grade == 5:
         # Grade 5: 2-3 digit numbers (10-99)
-        new_values = [random.randint(10, 99) for _ in range(num_values)]
+        new_values = [rng.randint(10, 99) for _ in range(num_values)]
     else:
         # Grade 6: 3-4 digit numbers (100-999)
-        new_values = [random.randint(100, 999) for _ in range(num_values)]
+        new_values = [rng.randint(100, 999) for _ in range(num_values)]
     
-    # Map label indices to their values for answer calculation
+    # Apply the answer plans compiled at load time
     labels = graph['labels']
-    label_value_map = {label: new_values[i] for i, label in enumerate(labels)}
-    
-    # Calculate answers based on question patterns
-    new_answers = []
-    for i, question in enumerate(graph['questions']):
-        q_lower = question.lower()
-        
-        # "Which X has the highest/most/maximum value?"
-        if ('highest' in q_lower or 'most' in q_lower or 'maximum' in q_lower):
-            max_val = max(new_values)
-            max_idx = new_values.index(max_val)
-            new_answers.append(labels[max_idx])
-        
-        # "Which X has the lowest/least/minimum value?"
-        elif ('lowest' in q_lower or 'least' in q_lower and 'how many' not in q_lower or 'minimum' in q_lower):
-            min_val = min(new_values)
-            min_idx = new_values.index(min_val)
-            new_answers.append(labels[min_idx])
-        
-        # Question 2: "What is the total/sum?"
-        elif 'total' in q_lower or 'sum' in q_lower:
-            new_answers.append(str(sum(new_values)))
-        
-        # Question 2: "What is the average?"
-        elif 'average' in q_lower:
-            avg = sum(new_values) / len(new_values)
-            new_answers.append(str(round(avg)))
-        
-        # Question 3: "How many more is X than Y?" or "How much more X than Y?"
-        elif 'how many more' in q_lower or 'how much more' in q_lower:
-            # Extract label names from question
-            # Pattern: "How many more is A than B?" means A - B
-            first_label = None
-            second_label = None
-            
-            # Split by "than" to separate the two parts
-            if ' than ' in q_lower:
-                before_than, after_than = q_lower.split(' than ', 1)
-                
-                # Find label after "is" or "more" (this is A)
-                for label in labels:
-                    label_text = ''.join(c for c in label if c.isalpha() or c.isspace()).strip()
-                    if label_text.lower() in before_than:
-                        first_label = label
-                        break
-                
-                # Find label after "than" (this is B)
-                for label in labels:
-                    label_text = ''.join(c for c in label if c.isalpha() or c.isspace()).strip()
-                    if label_text.lower() in after_than and label != first_label:
-                        second_label = label
-                        break
-                
-                if first_label and second_label:
-                    # Calculate A - B
-                    diff = label_value_map[first_label] - label_value_map[second_label]
-                    new_answers.append(str(diff))
-                else:
-                    # Fallback: difference between max and min
-                    new_answers.append(str(max(new_values) - min(new_values)))
-            else:
-                # Fallback: difference between max and min
-                new_answers.append(str(max(new_values) - min(new_values)))
-        
-        # Question: "How many X?" - specific label value
-        elif 'how many' in q_lower or 'what' in q_lower and 'was' in q_lower:
-            # Try to find the specific label mentioned in the question
-            found = False
-            for label in labels:
-                # Extract text from label (remove emojis)
-                label_text = ''.join(c for c in label if c.isalpha() or c.isspace()).strip()
-                if label_text.lower() in q_lower:
-                    new_answers.append(str(label_value_map[label]))
-                    found = True
-                    break
-            if not found:
-                # Default to first value
-                new_answers.append(str(new_values[0]))
-        
-        else:
-            # Default fallback - use original answer pattern
-            new_answers.append(graph['answers'][i])
+    new_answers = [evaluate_plan(plan, labels, new_values) for plan in graph['plans']]
     
     return new_values, new_answers
 
-# Generate a random question for each section using grade-specific modules
-def generate_question(section, grade=6):
-    # Map grade to module
-    grade_modules = {
-        1: grade_1,
-        2: grade_2,
-        3: grade_3,
-        4: grade_4,
-        5: grade_5,
-        6: grade_6
-    }
+def answer_entry(q):
+    """What gets stored (or signed) for a question: its comparator tag and answer"""
+    return (q["comparator"], q["answer"])
+
+def attach_answer_token(result):
+    """In token mode, sign the answer into the question so no server state is needed"""
+    if TOKEN_SIGNER:
+        result["token"] = TOKEN_SIGNER.sign(answer_entry(result))
+    return result
+
+# Build a random question for each section using grade-specific modules
+# (no id yet, so questions can be generated ahead of time for the pool).
+# All randomness comes from rng, so a seeded random.Random reproduces the question.
+# record=False leaves the template/chart pick out of TEMPLATE_SELECTIONS.
+# bank is the content snapshot to use (default: the current one).
+# generator replaces the grade's generator (the session sampler passes one with fixed operands).
+def build_question(section, grade=6, graph_type=None, category=None, rng=random, record=True, bank=None,
+                   generator=None):
+    # One snapshot for the whole question, even if the banks are reloaded meanwhile
+    if bank is None:
+        bank = CONTENT_BANKS.current()
     
-    # Get the appropriate grade module
-    grade_module = grade_modules.get(grade)
+    # Look up the grade's generator for this section (one dict lookup once the grade is loaded)
+    generator = generator or get_generator(grade, section)
     
     # If grade has a module and section exists, use it
-    if grade_module and section in grade_module.QUESTION_GENERATORS:
-        result = grade_module.QUESTION_GENERATORS[section]()
-        result["id"] = str(uuid.uuid4())
+    if generator:
+        result = generator(rng)
         result["section"] = section
+        result["comparator"] = comparator_for(result["answer"])
         
-        # Apply word problem templates for grade 4+ (addition/subtraction only)
-        if grade >= 4 and section == "addition" and ADDITION_TEMPLATES:
-            template = random.choice(ADDITION_TEMPLATES)
-            # Extract numbers from the generated question
-            import re
-            numbers = re.findall(r'\d+', result['question'])
-            if len(numbers) >= 2:
-                result['question'] = template['template'].replace('{a}', numbers[0]).replace('{b}', numbers[1])
-        elif grade >= 4 and section == "subtraction" and SUBTRACTION_TEMPLATES:
-            template = random.choice(SUBTRACTION_TEMPLATES)
-            # Extract numbers from the generated question
-            import re
-            numbers = re.findall(r'\d+', result['question'])
-            if len(numbers) >= 2:
-                result['question'] = template['template'].replace('{a}', numbers[0]).replace('{b}', numbers[1])
+        # Wrap the question in a word problem for grade 4+, using the generator's operands
+        templates = bank.templates.get(section)
+        if grade >= WORD_PROBLEM_MIN_GRADE and templates and 'operands' in result:
+            template = rng.choice(templates)
+            if record:
+                TEMPLATE_SELECTIONS.inc(section, template['id'])
+            result['question'] = render_template(template['pieces'], result['operands'])
         
         return result
     elif section == "charts":
         # Charts section is shared across all grades (with grade-specific value ranges)
         # Load a random graph from CSV data, filtered by grade
-        if not GRAPH_DATA:
+        if not bank.graphs:
             # Fallback to static data if CSV not loaded
             chart_data = {
                 "labels": ["Red", "Blue", "Green"],
@@ -225,15 +307,17 @@ def generate_question(section, grade=6):
             ]
             answers = ["Green", "15", "4"]
         else:
-            # Filter graphs by MinGrade
-            eligible_graphs = [g for g in GRAPH_DATA if g['min_grade'] <= grade]
-            if not eligible_graphs:
-                eligible_graphs = GRAPH_DATA  # Fallback to all graphs if none match
+            # Graphs for this grade (by MinGrade) matching the requested filters
+            graphs = eligible_graphs(grade, graph_type, category, bank)
+            if not graphs:
+                return None
             
-            graph = random.choice(eligible_graphs)
+            graph = rng.choice(graphs)
+            if record:
+                TEMPLATE_SELECTIONS.inc(section, graph['id'])
             
             # Generate random values and recalculate answers
-            new_values, new_answers = generate_graph_values_and_answers(graph, grade)
+            new_values, new_answers = generate_graph_values_and_answers(graph, grade, rng)
             
             chart_data = {
                 "labels": graph['labels'],
@@ -244,125 +328,669 @@ def generate_question(section, grade=6):
             answers = new_answers
         
         return {
-            "id": str(uuid.uuid4()),
             "question": "Look at the graph and answer the questions below.",
             "chart": chart_data,
             "sub_questions": questions,
             "answer": answers,
+            "comparator": CHART_TRIPLE,
             "section": section
         }
     return None
 
+# Ready-made questions per (grade, section), refilled in the background
+QUESTION_POOL = create_question_pool(build_question)
+
+# Generate a question with a fresh id, from the pool when one is ready.
+# With a quiz session id, the question is the session's no-repeat question `index` instead.
+def generate_question(section, grade=6, graph_type=None, category=None, session=None, index=0):
+    result = None
+    if session and QUESTION_SAMPLER is not None and not (graph_type or category) and get_generator(grade, section):
+        result = QUESTION_SAMPLER.draw(session, section, grade, index)
+    elif not (graph_type or category):
+        # Pools hold unfiltered questions only
+        result = QUESTION_POOL.take(section, grade)
+    if result is None:
+        result = build_question(section, grade, graph_type, category)
+        if result is None:
+            return None
+        if not (graph_type or category) and grade in GRADES:
+            # First use of this (grade, section): start keeping a pool for it.
+            # Only real grades: charts build for any grade number.
+            QUESTION_POOL.register(grade, section)
+            QUESTION_POOL.start()
+    result["id"] = str(uuid.uuid4())
+    return attach_answer_token(result)
+
+# Seeded questions: the id "s:<grade>:<section>:<seed>:<index>:<bank version>" is enough to
+# regenerate the question and its answer, so nothing is stored per question.
+# SECRET_KEY is mixed into the stream so answers can't be computed from the id alone.
+# The content bank version pins the CSV rows the question was built from.
+SEEDED_ID_PREFIX = 's'
+# Grades and question indices: ASCII digits only (str.isdigit also takes other scripts' digits)
+NUMBER_PATTERN = re.compile(r'[0-9]{1,9}')
+SEED_PATTERN = re.compile(r'[A-Za-z0-9_]{1,32}')
+BANK_VERSION_PATTERN = re.compile(r'[0-9a-f]{8}')
+SEED_SECRET = os.environ.get('SECRET_KEY', '')
+
+def seeded_rng(grade, section, seed, index):
+    """Random stream for one question of a seeded quiz"""
+    return random.Random(f"{SEED_SECRET}:{grade}:{section}:{seed}:{index}")
+
+def generate_seeded_question(section, grade, seed, index):
+    """Question `index` of the quiz identified by (grade, section, seed); bypasses the pool"""
+    version, bank = CONTENT_BANKS.current_versioned()
+    result = build_question(section, grade, rng=seeded_rng(grade, section, seed, index), bank=bank)
+    if result is None:
+        return None
+    result["id"] = f"{SEEDED_ID_PREFIX}:{grade}:{section}:{seed}:{index}:{version}"
+    return result
+
+def regenerate_seeded_answer(question_id):
+    """
+    (status, entry) for a seeded question id, rebuilt from the id itself against the
+    content it was issued with; EXPIRED once that content is no longer kept
+    """
+    parts = question_id.split(':')
+    if len(parts) != 6 or parts[0] != SEEDED_ID_PREFIX:
+        return INVALID, None
+    _prefix, grade, section, seed, index, version = parts
+    if not (NUMBER_PATTERN.fullmatch(grade) and NUMBER_PATTERN.fullmatch(index) and SEED_PATTERN.fullmatch(seed)
+            and BANK_VERSION_PATTERN.fullmatch(version)):
+        return INVALID, None
+    grade = int(grade)
+    if section not in sections_for_grade(grade):
+        return INVALID, None
+    bank = CONTENT_BANKS.snapshot_for(version)
+    if bank is None:
+        return EXPIRED, None
+    result = build_question(section, grade, rng=seeded_rng(grade, section, seed, int(index)),
+                            record=False, bank=bank)
+    return FOUND, answer_entry(result)
+
+# Questions don't repeat within a quiz session (the `session` and `index` parameters):
+# question `index` is a position in a keyed permutation of the section's operand
+# tuples, so the client keeps its next index and any worker can serve the session
+QUESTION_SAMPLER = create_sampler(get_spec, build_question, SEED_SECRET)
+SESSION_PATTERN = re.compile(r'[A-Za-z0-9_-]{1,64}')
+
+def sections_for_grade(grade):
+    """All sections a grade can be quizzed on"""
+    sections = sections_for(grade)
+    if grade >= CHART_MIN_GRADE:
+        sections.append("charts")
+    return sections
+
+# Routes timed into REQUEST_LATENCY
+INSTRUMENTED_ROUTES = {'get_question', 'get_questions', 'get_mixed_questions',
+                       'check_answer', 'check_answers', 'get_answer', 'serve_frontend',
+                       'save_session', 'list_sessions', 'session_progress'}
+
+@app.before_request
+def start_request_timer():
+    if request.endpoint in INSTRUMENTED_ROUTES:
+        g.request_start = time.perf_counter()
+        if PROFILER:
+            g.profile = PROFILER.begin(request.endpoint)
+
+# Routes that issue questions (each one adds answers to the answer store)
+ISSUING_ROUTES = {'get_question', 'get_questions', 'get_mixed_questions'}
+
+# Routes subject to rate limits and load shedding
+API_ROUTES = ISSUING_ROUTES | {'check_answer', 'check_answers', 'get_answer',
+                               'save_session', 'list_sessions', 'session_progress'}
+
+# Per-client token buckets per route (RATE_LIMITS), off by default
+RATE_LIMITER = create_rate_limiter()
+
+# Shed new questions once the answer store is this full (0 = never), so a flood
+# of questions can't evict the answers of everyone else's quiz
+ANSWER_STORE_HIGH_WATER = float(os.environ.get('ANSWER_STORE_HIGH_WATER', 0))
+
+def answer_store_overloaded():
+    """True while the answer store is past its high-water mark, after dropping expired answers"""
+    if not ANSWER_STORE_HIGH_WATER or TOKEN_SIGNER:
+        return False
+    ratio = ANSWER_STORE.fill_ratio()
+    if ratio is not None and ratio >= ANSWER_STORE_HIGH_WATER:
+        ANSWER_STORE.purge_expired()
+        ratio = ANSWER_STORE.fill_ratio()
+    return ratio is not None and ratio >= ANSWER_STORE_HIGH_WATER
+
+LOAD_SHEDDER = create_load_shedder(checks=[answer_store_overloaded])
+
+@app.before_request
+def limit_request_rate():
+    endpoint = request.endpoint
+    if endpoint not in API_ROUTES:
+        return None
+    if RATE_LIMITER is not None and not is_admin():
+        wait = RATE_LIMITER.acquire(endpoint, request.remote_addr)
+        if wait:
+            return jsonify({"error": "Too many requests, slow down"}), 429, {'Retry-After': retry_after(wait)}
+    wait = LOAD_SHEDDER.enter(run_checks=endpoint in ISSUING_ROUTES)
+    if wait:
+        return jsonify({"error": "Server busy, try again shortly"}), 503, {'Retry-After': retry_after(wait)}
+    g.admitted = True
+    return None
+
+@app.teardown_request
+def finish_request(error=None):
+    # teardown runs even when the view raised, so a profile is never left running
+    # and an admitted request always leaves the in-flight count
+    handle = g.pop('profile', None)
+    if handle is not None:
+        PROFILER.end(handle)
+    if g.pop('admitted', False):
+        LOAD_SHEDDER.leave()
+
+@app.after_request
+def record_request_metrics(response):
+    start = g.pop('request_start', None)
+    if start is not None:
+        # Grade and section come from the query string, or the JSON body for answer checks;
+        # unknown values are folded into "other" to keep the label sets bounded
+        params = request.args
+        if not params and request.is_json:
+            params = request.get_json(silent=True) or {}
+            if not isinstance(params, dict):
+                params = {}
+        grade = str(params.get('grade', ''))
+        section = str(params.get('section', ''))
+        # Routes default to grade 6 when none is given
+        label_grade = (int(grade) if NUMBER_PATTERN.fullmatch(grade) else None) if grade else 6
+        if grade and label_grade not in GRADES:
+            grade = 'other'
+        if section and (label_grade not in GRADES or section not in sections_for_grade(label_grade)):
+            section = 'other'
+        REQUEST_LATENCY.observe(time.perf_counter() - start, request.endpoint, grade, section,
+                                str(response.status_code))
+    return response
+
+# Fields sent to the client per (grade, section), on top of question/id/section/answer.
+# Grade None covers every grade; the token is added in token mode.
+QUESTION_RESPONSE_SCHEMAS = ResponseSchemas(
+    base=('question', 'id', 'section', 'answer'),
+    declared={
+        (None, 'charts'): ('chart', 'sub_questions'),
+        (None, 'fractions'): ('fraction_visual', 'fraction'),
+        # Visual division for Grade 4
+        (4, 'division'): ('visual', 'dividend', 'divisor', 'quotient', 'remainder'),
+        # Visual blocks for Grade 1 and Grade 2 (5 and 10 sections per block)
+        (1, 'addition'): ('visual', 'first_number', 'second_number'),
+        (2, 'addition'): ('visual', 'first_number', 'second_number'),
+        (2, 'subtraction'): ('visual', 'minuend', 'subtrahend'),
+    },
+    optional=('token',),
+    grades=GRADES,
+)
+
+def build_question_response(q, grade):
+    """Shape a generated question into the JSON sent to the client"""
+    return QUESTION_RESPONSE_SCHEMAS.project(q, grade, q["section"])
+
+def store_answers(questions):
+    """Store answers for issued questions in one bulk operation (token mode keeps nothing server-side)"""
+    # Seeded questions are regenerated from their id when checked
+    if not TOKEN_SIGNER:
+        ANSWER_STORE.put_many([(q['id'], answer_entry(q)) for q in questions
+                               if not q['id'].startswith(SEEDED_ID_PREFIX + ':')])
+
 # Get a random question from a specific section (default: addition)
 @app.route('/api/question', methods=['GET'])
 def get_question():
     section = request.args.get('section', 'addition')
-    grade = int(request.args.get('grade', 6))  # Default to grade 6
+    grade = parse_grade()  # Default to grade 6
+    if grade is None:
+        return invalid_grade()
     
-    q = generate_question(section, grade)
+    graph_type = request.args.get('graph_type')
+    category = request.args.get('category')
+    
+    seed = parse_seed()
+    if seed is False:
+        return invalid_seed()
+    session = parse_session()
+    if session is False:
+        return invalid_session()
+    index = parse_index()
+    if index is None:
+        return invalid_index()
+    if seed is not None:
+        q = generate_seeded_question(section, grade, seed, index)
+    else:
+        q = generate_question(section, grade, graph_type, category, session, index)
     
     if q:
-        # Store the answer in a global dict for answer checking
-        if 'answers' not in app.config:
-            app.config['answers'] = {}
-        app.config['answers'][q['id']] = q['answer']
-        # For charts, include chart and sub_questions in response
-        # For fractions, include fraction_visual and answer in response
-        # For Grade 1 addition, include visual data (5 sections per block)
-        # For Grade 2 addition, include visual data (10 sections per block)
-        resp = {"question": q["question"], "id": q["id"], "section": section, "answer": q.get("answer")}
-        if section == "charts":
-            resp["chart"] = q.get("chart")
-            resp["sub_questions"] = q.get("sub_questions")
-        elif section == "fractions":
-            resp["fraction_visual"] = q.get("fraction_visual")
-            resp["fraction"] = q.get("fraction")
-        elif section == "division":
-            # Include division visual data for Grade 4
-            resp["visual"] = q.get("visual")
-            resp["dividend"] = q.get("dividend")
-            resp["divisor"] = q.get("divisor")
-            resp["quotient"] = q.get("quotient")
-            resp["remainder"] = q.get("remainder")
-        elif section == "addition" and grade in [1, 2]:
-            # Include visual blocks data for Grade 1 and Grade 2 addition
-            resp["visual"] = q.get("visual")
-            resp["first_number"] = q.get("first_number")
-            resp["second_number"] = q.get("second_number")
-        elif section == "subtraction" and grade in [1, 2]:
-            # Include visual blocks data for Grade 1 and Grade 2 subtraction
-            resp["visual"] = q.get("visual")
-            resp["minuend"] = q.get("minuend")
-            resp["subtrahend"] = q.get("subtrahend")
-        return jsonify(resp)
+        # Store the answer for answer checking
+        store_answers([q])
+        response = build_question_response(q, grade)
+        if session and seed is None:
+            response["nextIndex"] = index + 1
+        return json_response(response)
+    return invalid_question(section)
+
+def invalid_question(section):
+    """400 response for a section (or chart filter) that can't produce questions"""
+    if section == "charts":
+        return jsonify({"error": "No charts match the given filters"}), 400
     return jsonify({"error": "Invalid section"}), 400
 
+def generate_quiz(sections, grade, count, graph_type=None, category=None, seed=None, session=None,
+                  session_index=0):
+    """
+    Generate, store and shape `count` questions, spread evenly over `sections`.
+    With a seed the quiz is reproducible: the same seed always gives the same questions.
+    With a session id, questions don't repeat within the session: each section's k-th
+    question is the session's question session_index + k (see quiz_next_index).
+    Returns (responses, None), or (None, failed_section) if a section can't produce questions.
+    """
+    plan = [sections[i % len(sections)] for i in range(count)]
+    if seed is None:
+        random.shuffle(plan)
+    else:
+        random.Random(f"{SEED_SECRET}:{grade}:{','.join(sections)}:{seed}").shuffle(plan)
+    questions = []
+    section_counts = {}
+    for index, section in enumerate(plan):
+        if seed is None:
+            k = section_counts.get(section, 0)
+            section_counts[section] = k + 1
+            q = generate_question(section, grade, graph_type, category, session, session_index + k)
+        else:
+            q = generate_seeded_question(section, grade, seed, index)
+        if not q:
+            return None, section
+        questions.append(q)
+    store_answers(questions)
+    return [build_question_response(q, grade) for q in questions], None
+
+def parse_grade():
+    """The `grade` query parameter (default 6), or None if it isn't a number"""
+    grade = request.args.get('grade', '6')
+    return int(grade) if NUMBER_PATTERN.fullmatch(grade) else None
+
+def invalid_grade():
+    return jsonify({"error": "grade must be a non-negative integer of at most 9 digits"}), 400
+
+def parse_seed():
+    """
+    The `seed` query parameter: None when absent, False when invalid or combined
+    with chart filters (seeded ids don't record filters)
+    """
+    seed = request.args.get('seed')
+    if seed is None:
+        return None
+    if not SEED_PATTERN.fullmatch(seed) or request.args.get('graph_type') or request.args.get('category'):
+        return False
+    return seed
+
+def invalid_seed():
+    return jsonify({"error": "seed must be 1-32 letters, digits or _ and can't be used with chart filters"}), 400
+
+def parse_session():
+    """The `session` query parameter (a quiz session id): None when absent, False when invalid"""
+    session = request.args.get('session')
+    if session is None:
+        return None
+    return session if SESSION_PATTERN.fullmatch(session) else False
 
+def invalid_session():
+    return jsonify({"error": "session must be 1-64 letters, digits, - or _"}), 400
+
+def parse_index():
+    """The `index` query parameter of a seeded quiz or quiz session (default 0), or None if invalid"""
+    index = request.args.get('index', '0')
+    return int(index) if NUMBER_PATTERN.fullmatch(index) else None
+
+def invalid_index():
+    return jsonify({"error": "index must be a non-negative integer of at most 9 digits"}), 400
+
+def quiz_next_index(sections, count, session_index):
+    """The session index to send with the next quiz: past every section's questions in this one"""
+    return session_index + -(-count // len(sections))
+
+def parse_batch_count():
+    """Read the `count` query parameter, or None if it isn't a number in range"""
+    count = request.args.get('count', '10')
+    if not NUMBER_PATTERN.fullmatch(count):
+        return None
+    count = int(count)
+    return count if 1 <= count <= MAX_BATCH_SIZE else None
+
+# Get a whole quiz from one section in a single round trip
+@app.route('/api/questions', methods=['GET'])
+def get_questions():
+    section = request.args.get('section', 'addition')
+    grade = parse_grade()
+    if grade is None:
+        return invalid_grade()
+    count = parse_batch_count()
+    if count is None:
+        return jsonify({"error": f"count must be a whole number between 1 and {MAX_BATCH_SIZE}"}), 400
+
+    seed = parse_seed()
+    if seed is False:
+        return invalid_seed()
+    session = parse_session()
+    if session is False:
+        return invalid_session()
+    session_index = parse_index()
+    if session_index is None:
+        return invalid_index()
+
+    return quiz_response([section], grade, count, seed, session, session_index)
+
+# Get a quiz mixing several sections (default: every section of the grade)
+@app.route('/api/questions/mixed', methods=['GET'])
+def get_mixed_questions():
+    grade = parse_grade()
+    if grade is None:
+        return invalid_grade()
+    count = parse_batch_count()
+    if count is None:
+        return jsonify({"error": f"count must be a whole number between 1 and {MAX_BATCH_SIZE}"}), 400
+    if request.args.get('sections'):
+        sections = request.args['sections'].split(',')
+    else:
+        sections = sections_for_grade(grade)
+    if not sections:
+        return jsonify({"error": "Invalid grade"}), 400
+    seed = parse_seed()
+    if seed is False:
+        return invalid_seed()
+    session = parse_session()
+    if session is False:
+        return invalid_session()
+    session_index = parse_index()
+    if session_index is None:
+        return invalid_index()
+
+    return quiz_response(sections, grade, count, seed, session, session_index)
+
+def quiz_response(sections, grade, count, seed, session, session_index):
+    """JSON response for a generated quiz, with the session's next index when there is one"""
+    questions, failed_section = generate_quiz(sections, grade, count,
+                                              request.args.get('graph_type'), request.args.get('category'),
+                                              seed, session, session_index)
+    if questions is None:
+        return invalid_question(failed_section)
+    response = {"questions": questions}
+    if session and seed is None:
+        response["nextIndex"] = quiz_next_index(sections, count, session_index)
+    return json_response(response)
+
+def lookup_answer(data):
+    """
+    Find a question's (comparator, answer) entry by regenerating it (seeded ids),
+    from its signed token (token mode) or from the answer store. Returns (status, entry).
+    """
+    question_id = data.get("id")
+    if isinstance(question_id, str) and question_id.startswith(SEEDED_ID_PREFIX + ':'):
+        return regenerate_seeded_answer(question_id)
+    if TOKEN_SIGNER and data.get("token") is not None:
+        return TOKEN_SIGNER.verify(data["token"])
+    return ANSWER_STORE.lookup(question_id)
+
+# Longest question id accepted (pool ids are 36-character uuids, seeded ids are shorter than this)
+MAX_QUESTION_ID_LENGTH = 128
+
+def submission_error(data):
+    """Why an answer submission is malformed, or None if it can be looked up"""
+    if not isinstance(data, dict):
+        return "Expected a JSON object"
+    question_id = data.get("id")
+    if not isinstance(question_id, str) or not 0 < len(question_id) <= MAX_QUESTION_ID_LENGTH:
+        return f"id must be a string of at most {MAX_QUESTION_ID_LENGTH} characters"
+    if data.get("token") is not None and not isinstance(data["token"], str):
+        return "token must be a string"
+    return None
+
+def invalid_submission(error):
+    return jsonify({"error": error}), 400
+
+def answer_not_found(status):
+    """Error response that tells the client why the answer is unavailable"""
+    if status == INVALID:
+        return jsonify({"error": "Invalid question id or token", "reason": "invalid"}), 400
+    if status == EXPIRED:
+        return jsonify({"error": "Question expired", "reason": "expired"}), 404
+    if status == EVICTED:
+        return jsonify({"error": "Question expired", "reason": "evicted"}), 404
+    return jsonify({"error": "Question not found", "reason": "not_issued"}), 404
 
 @app.route('/api/answer', methods=['POST'])
 def check_answer():
-    data = request.json
-    question_id = data.get("id")
-    user_answer = data.get("answer")
-    answers = app.config.get('answers', {})
-    correct_answer = answers.get(question_id)
-    if correct_answer is not None:
-        # Division: expect dict with quotient and remainder
-        if isinstance(correct_answer, dict) and "quotient" in correct_answer and "remainder" in correct_answer:
-            if (
-                isinstance(user_answer, dict)
-                and str(user_answer.get("quotient")) == str(correct_answer["quotient"])
-                and str(user_answer.get("remainder")) == str(correct_answer["remainder"])
-            ):
-                correct = True
-            else:
-                correct = False
-            return jsonify({"correct": correct, "correct_answer": correct_answer})
-        # Charts: expect list of 3 answers
-        if isinstance(correct_answer, list) and len(correct_answer) == 3 and isinstance(user_answer, list) and len(user_answer) == 3:
-            correct = all(str(user_answer[i]).strip().lower() == str(correct_answer[i]).strip().lower() for i in range(3))
-            return jsonify({"correct": correct, "correct_answer": correct_answer})
-        # For fractions, allow 5% tolerance
-        try:
-            user_answer_f = float(user_answer)
-            correct_answer_f = float(correct_answer)
-            if abs(user_answer_f - correct_answer_f) <= 0.05 * abs(correct_answer_f):
-                correct = True
-            else:
-                correct = False
-        except Exception:
-            correct = (user_answer == correct_answer)
-        return jsonify({"correct": correct, "correct_answer": correct_answer})
-    return jsonify({"error": "Question not found"}), 404
+    data = request.get_json(silent=True)
+    error = submission_error(data)
+    if error:
+        return invalid_submission(error)
+    status, entry = lookup_answer(data)
+    if status == FOUND:
+        comparator, correct_answer = entry
+        correct = compare_answer(comparator, correct_answer, data.get("answer"))
+        return json_response({"correct": correct, "correct_answer": correct_answer})
+    return answer_not_found(status)
+
+# Grade a whole submission in one request
+@app.route('/api/answers', methods=['POST'])
+def check_answers():
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return invalid_submission("Expected a JSON object with an `answers` list")
+    submissions = data.get("answers") or []
+    if not isinstance(submissions, list):
+        return invalid_submission("answers must be a list")
+    if len(submissions) > MAX_BATCH_SIZE:
+        return jsonify({"error": f"At most {MAX_BATCH_SIZE} answers per request"}), 400
+    for i, submission in enumerate(submissions):
+        error = submission_error(submission)
+        if error:
+            return invalid_submission(f"answers[{i}]: {error}")
+
+    results = []
+    correct_count = 0
+    for submission in submissions:
+        status, entry = lookup_answer(submission)
+        if status != FOUND:
+            results.append({"id": submission.get("id"), "error": "Question unavailable", "reason": status})
+            continue
+        comparator, correct_answer = entry
+        correct = compare_answer(comparator, correct_answer, submission.get("answer"))
+        correct_count += correct
+        results.append({"id": submission.get("id"), "correct": correct, "correct_answer": correct_answer})
+    return json_response({"results": results, "correct": correct_count, "total": len(results)})
 
 @app.route('/api/get_answer', methods=['POST'])
 def get_answer():
     """Admin endpoint to get the correct answer for a question"""
-    data = request.json
-    question_id = data.get("id")
-    answers = app.config.get('answers', {})
-    correct_answer = answers.get(question_id)
-    if correct_answer is not None:
-        return jsonify({"answer": correct_answer})
-    return jsonify({"error": "Question not found"}), 404
+    data = request.get_json(silent=True)
+    error = submission_error(data)
+    if error:
+        return invalid_submission(error)
+    status, entry = lookup_answer(data)
+    if status == FOUND:
+        return jsonify({"answer": entry[1]})
+    return answer_not_found(status)
+
+# Saved quiz sessions and per-user progress (SESSION_HISTORY_PATH, empty = off)
+SESSION_HISTORY = create_session_history()
+
+# Most questions kept from one saved session
+MAX_SESSION_QUESTIONS = 500
+
+# Page sizes and cursors (row ids): ASCII digits that fit in a SQLite INTEGER
+CURSOR_PATTERN = re.compile(r'[0-9]{1,18}')
+
+def session_user(value):
+    """Normalized user key (the email the frontend signs in with), or None if invalid"""
+    if not isinstance(value, str):
+        return None
+    value = value.strip().lower()
+    return value if 0 < len(value) <= 254 and value.isprintable() else None
+
+def session_history_off():
+    return jsonify({"error": "Session history is off (set SESSION_HISTORY_PATH)"}), 404
+
+def history_key():
+    """The user's history key, from the X-History-Key header"""
+    return request.headers.get('X-History-Key', '')
+
+def history_key_rejected():
+    return jsonify({"error": "A valid X-History-Key is required for this user"}), 403
+
+# Save a finished quiz session and add it to the user's progress
+@app.route('/api/sessions', methods=['POST'])
+def save_session():
+    if SESSION_HISTORY is None:
+        return session_history_off()
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"error": "Expected a JSON session"}), 400
+    user = session_user(data.get("user"))
+    grade = data.get("grade")
+    section = data.get("section")
+    questions = data.get("questions")
+    if user is None:
+        return jsonify({"error": "user is required"}), 400
+    if not isinstance(grade, int) or grade not in GRADES or section not in sections_for_grade(grade):
+        return jsonify({"error": "Invalid grade or section"}), 400
+    if not isinstance(questions, list) or not questions or len(questions) > MAX_SESSION_QUESTIONS:
+        return jsonify({"error": f"questions must be a list of 1 to {MAX_SESSION_QUESTIONS} answers"}), 400
+    sections = sections_for_grade(grade)
+    questions = [q for q in questions if isinstance(q, dict)]
+    for q in questions:
+        # Questions from other sections count towards those; unknown ones towards the session's
+        if q.get("section") not in sections:
+            q["section"] = section
+    session_id = data.get("sessionId")
+    if not (isinstance(session_id, str) and 0 < len(session_id) <= 64):
+        session_id = str(uuid.uuid4())
+    # A user's first save claims their history (in the same transaction) and gets the
+    # key for every later request
+    session = (user, session_id, grade, section, parse_time(data.get("startTime")),
+               parse_time(data.get("endTime")), questions)
+    new_key = None
+    if SESSION_HISTORY.authorize(user, history_key()):
+        saved = SESSION_HISTORY.add(*session)
+    else:
+        new_key, saved = SESSION_HISTORY.claim_and_add(*session)
+        if new_key is None:
+            return history_key_rejected()
+    body = {"saved": saved, "sessionId": session_id}
+    if new_key is not None:
+        body["historyKey"] = new_key
+    return json_response(body, 201 if saved else 200)
+
+# A page of a user's saved sessions, newest first
+@app.route('/api/sessions', methods=['GET'])
+def list_sessions():
+    if SESSION_HISTORY is None:
+        return session_history_off()
+    user = session_user(request.args.get("user"))
+    if user is None:
+        return jsonify({"error": "user is required"}), 400
+    if not SESSION_HISTORY.authorize(user, history_key()):
+        return history_key_rejected()
+    limit = request.args.get("limit", str(SESSION_PAGE_SIZE))
+    before = request.args.get("before")
+    if not CURSOR_PATTERN.fullmatch(limit) or (before is not None and not CURSOR_PATTERN.fullmatch(before)):
+        return jsonify({"error": "limit and before must be non-negative integers"}), 400
+    sessions, cursor = SESSION_HISTORY.page(user, int(limit), int(before) if before is not None else None)
+    return json_response({"sessions": sessions, "next": cursor})
+
+# A user's attempts, accuracy and average time per grade and section
+@app.route('/api/sessions/progress', methods=['GET'])
+def session_progress():
+    if SESSION_HISTORY is None:
+        return session_history_off()
+    user = session_user(request.args.get("user"))
+    if user is None:
+        return jsonify({"error": "user is required"}), 400
+    if not SESSION_HISTORY.authorize(user, history_key()):
+        return history_key_rejected()
+    return json_response({"progress": SESSION_HISTORY.progress(user)})
+
+@METRICS.collector
+def collect_app_gauges():
+    """Sizes read when /metrics is scraped"""
+    store = ANSWER_STORE.stats()
+    pool = QUESTION_POOL.stats()
+    bank = CONTENT_BANKS.current()
+    yield ('quiz_answer_store_size', 'gauge', 'Answers held by the answer store', ('backend',),
+           [((store['backend'],), store['size'])])
+    yield ('quiz_answer_store_lookups_total', 'counter', 'Answer store lookups', ('result',),
+           [(('hit',), store['hits']), (('miss',), store['misses'])])
+    yield ('quiz_chart_bank_size', 'gauge', 'Charts loaded from chart_problems.csv', (),
+           [((), len(bank.graphs))])
+    yield ('quiz_word_problem_templates', 'gauge', 'Word problem templates loaded per section', ('section',),
+           [((section,), len(templates)) for section, templates in bank.templates.items()])
+    yield ('quiz_question_pool_lookups_total', 'counter', 'Question pool lookups', ('result',),
+           [(('hit',), pool['hits']), (('miss',), pool['misses'])])
+    yield ('quiz_content_reloads_total', 'counter', 'Content bank reloads', ('result',),
+           [(('ok',), CONTENT_BANKS.reloads), (('failed',), CONTENT_BANKS.failures)])
+    yield ('quiz_requests_in_flight', 'gauge', 'API requests being handled by this process', (),
+           [((), LOAD_SHEDDER.in_flight)])
+    yield ('quiz_requests_rejected_total', 'counter', 'API requests turned away', ('reason',),
+           [(('rate_limited',), RATE_LIMITER.limited if RATE_LIMITER is not None else 0), (('shed',), LOAD_SHEDDER.shed)])
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus scrape endpoint"""
+    return METRICS.render(), 200, {'Content-Type': METRICS_CONTENT_TYPE}
+
+def is_admin():
+    """True if the request carries the configured admin token"""
+    token = request.headers.get('X-Admin-Token', '')
+    return bool(ADMIN_TOKEN) and hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode())
+
+# Download (GET) or clear (DELETE) the sampled request profiles
+@app.route('/api/admin/profile', methods=['GET', 'DELETE'])
+def admin_profile():
+    if not is_admin():
+        return jsonify({"error": "Forbidden"}), 403
+    if not PROFILER:
+        return jsonify({"error": "Profiling is off (set PROFILE_SAMPLE_RATE)"}), 404
+    if request.method == 'DELETE':
+        PROFILER.reset()
+        return jsonify({"reset": True})
+
+    route = request.args.get('route')
+    fmt = request.args.get('format', 'summary')
+    if fmt == 'summary':
+        return jsonify(PROFILER.summary())
+    if fmt == 'pstats':
+        data = PROFILER.pstats_bytes(route)
+        filename, mimetype = 'profile.pstats', 'application/octet-stream'
+    elif fmt == 'collapsed':
+        data = PROFILER.collapsed(route)
+        filename, mimetype = 'profile.collapsed.txt', 'text/plain; charset=utf-8'
+    else:
+        return jsonify({"error": "format must be summary, pstats or collapsed"}), 400
+    if data is None:
+        return jsonify({"error": f"No {fmt} samples yet (PROFILE_MODE is {PROFILER.mode})"}), 404
+    return data, 200, {'Content-Type': mimetype,
+                       'Content-Disposition': f'attachment; filename="{filename}"'}
+
+# Frontend files, served from memory with ETags, precompressed variants and
+# content-hashed app.js/style.css names
+STATIC_ASSETS = create_static_assets(os.path.join(os.path.dirname(__file__), '..', 'frontend'))
 
 # Serve frontend static files
 @app.route('/', defaults={'path': ''})
 @app.route('/<path:path>')
 def serve_frontend(path):
     """Serve frontend files from the frontend directory"""
-    frontend_dir = os.path.join(os.path.dirname(__file__), '..', 'frontend')
-    
     # If path is empty or requesting a file without extension, serve index.html
     if not path or '.' not in path.split('/')[-1]:
-        return send_from_directory(frontend_dir, 'index.html')
+        return STATIC_ASSETS.response(STATIC_ASSETS.get('index.html'), request)
     
     # Try to serve the requested file
-    if os.path.exists(os.path.join(frontend_dir, path)):
-        return send_from_directory(frontend_dir, path)
+    asset = STATIC_ASSETS.get(path)
+    if asset is not None:
+        return STATIC_ASSETS.response(asset, request)
     
     # If file doesn't exist, serve index.html (for SPA routing)
-    return send_from_directory(frontend_dir, 'index.html')
+    return STATIC_ASSETS.response(STATIC_ASSETS.get('index.html'), request)
 
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Binary cache of the parsed content banks
+- The first load of a CSV stores the parsed rows with marshal in
+  data/.cache/<csv name>.bin; later loads mmap that file and unmarshal it,
+  skipping CSV parsing, value parsing and chart plan compilation
+- The header records the CSV's mtime and size, so a cache is rebuilt as soon
+  as its CSV changes, and a sha256 of the payload, so a truncated or corrupt
+  cache is rebuilt instead of loaded
+- marshal's format depends on the Python version, which is also in the header
+
+Compile every bank ahead of time (e.g. in a build step):
+    python bank_cache.py
+"""
+
+import hashlib
+import marshal
+import mmap
+import os
+import struct
+import sys
+import tempfile
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(__file__), 'data', '.cache')
+
+# File format version; bump when the parsed row layout changes
+FORMAT_VERSION = 1
+MAGIC = b'QBNK' + bytes([FORMAT_VERSION, sys.version_info[0], sys.version_info[1], marshal.version])
+
+# magic, CSV mtime (ns), CSV size, sha256 of the payload; the marshalled payload follows
+HEADER = struct.Struct('<8sqq32s')
+
+
+class BankCache:
+    """
+    Loads parsed banks from binary cache files, rebuilding stale ones.
+
+    Args:
+        directory: Where cache files are kept
+    """
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR):
+        self.directory = directory
+        self.hits = 0
+        self.rebuilds = 0
+
+    def path_for(self, csv_path):
+        return os.path.join(self.directory, os.path.basename(csv_path) + '.bin')
+
+    def load(self, csv_path, parse, rebuild=False):
+        """parse(csv_path)'s result, from the cache when it is up to date"""
+        stat = os.stat(csv_path)
+        cache_path = self.path_for(csv_path)
+        if not rebuild:
+            found, data = self._read(cache_path, stat)
+            if found:
+                self.hits += 1
+                return data
+        data = parse(csv_path)
+        self._write(cache_path, stat, data)
+        self.rebuilds += 1
+        return data
+
+    def wrap(self, parse):
+        """parse, loading through the cache"""
+        return lambda csv_path: self.load(csv_path, parse)
+
+    def _read(self, cache_path, stat):
+        """(True, data) from a valid cache file, else (False, None)"""
+        try:
+            f = open(cache_path, 'rb')
+        except OSError:
+            return False, None
+        with f:
+            if os.fstat(f.fileno()).st_size < HEADER.size:
+                return False, None
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                magic, mtime_ns, size, digest = HEADER.unpack_from(mapped)
+                if magic != MAGIC or (mtime_ns, size) != (stat.st_mtime_ns, stat.st_size):
+                    return False, None
+                payload = memoryview(mapped)[HEADER.size:]
+                try:
+                    if hashlib.sha256(payload).digest() != digest:
+                        print(f"Cache {cache_path} is corrupt, rebuilding")
+                        return False, None
+                    return True, marshal.loads(payload)
+                finally:
+                    payload.release()
+
+    def _write(self, cache_path, stat, data):
+        try:
+            payload = marshal.dumps(data)
+        except ValueError as e:
+            print(f"Can't cache {cache_path}: {e}")
+            return
+        header = HEADER.pack(MAGIC, stat.st_mtime_ns, stat.st_size, hashlib.sha256(payload).digest())
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            # Write to a temporary file and rename, so readers (other workers) never see a partial file
+            fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(header)
+                f.write(payload)
+            os.replace(temp_path, cache_path)
+        except OSError as e:
+            # A read-only deployment still works, it just parses the CSV every time
+            print(f"Can't write cache {cache_path}: {e}")
+
+
+def create_bank_cache():
+    """
+    Build the bank cache from environment settings, or None when disabled:
+        CONTENT_CACHE_DIR  directory for cache files (default data/.cache; empty = no cache)
+    """
+    directory = os.environ.get('CONTENT_CACHE_DIR', DEFAULT_CACHE_DIR)
+    return BankCache(directory) if directory else None
+
+
+def main():
+    # Importing app loads (and caches) every bank; rebuild them all explicitly
+    import app
+    cache = app.BANK_CACHE or BankCache()
+    for name, (csv_path, parse, _fallback) in app.CONTENT_SOURCES.items():
+        data = cache.load(csv_path, parse, rebuild=True)
+        print(f"Compiled {name}: {len(data)} rows -> {cache.path_for(csv_path)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for the question hot paths
+
+Measures throughput and per-call latency for:
+- every generator in each grade's QUESTION_GENERATORS
+- the compiled spec samplers alone (operand draws, no question text)
+- generate_graph_values_and_answers
+- build_question and the full generate_question dispatch
+- compare_answer for every comparator
+- the Flask routes, through the test client
+
+Results are written as JSON. --compare checks them against an earlier run and
+exits with status 1 if any benchmark's median latency got worse by more than
+--threshold.
+
+Examples:
+    python benchmark.py --output baseline.json
+    python benchmark.py --compare baseline.json --threshold 0.15
+    python benchmark.py --filter generator/grade6 --duration 2
+"""
+
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+
+from app import (app, GRADES, CONTENT_BANKS, build_question, generate_question,
+                 generate_graph_values_and_answers, sections_for_grade)
+from grades import generator_table
+from grades.specs import load_grade_specs, spec_grades
+from answer_checks import (compare_answer, EXACT_INT, QUOTIENT_REMAINDER, CHART_TRIPLE,
+                           FRACTION_TOLERANCE, EXACT)
+
+DEFAULT_DURATION = 0.5     # seconds of timed calls per benchmark
+DEFAULT_THRESHOLD = 0.10   # allowed median slowdown before --compare fails
+WARMUP_CALLS = 50
+
+# (correct answer, user answer) per comparator, one right and one wrong
+COMPARE_CASES = {
+    EXACT_INT: (84, '84', '85'),
+    QUOTIENT_REMAINDER: ({'quotient': 12, 'remainder': 3},
+                         {'quotient': '12', 'remainder': '3'}, {'quotient': '12', 'remainder': '4'}),
+    CHART_TRIPLE: (['🔴 Red', '350', '12'], ['🔴 red', '350', '12'], ['Blue', '350', '12']),
+    FRACTION_TOLERANCE: (0.83, '0.83', '0.5'),
+    EXACT: ('yes', 'yes', 'no'),
+}
+
+
+def measure(func, duration):
+    """
+    Call func repeatedly for about `duration` seconds.
+
+    Returns:
+        dict with calls, ops_per_sec and mean/p50/p95/p99 latency in microseconds
+    """
+    for _ in range(WARMUP_CALLS):
+        func()
+
+    clock = time.perf_counter_ns
+    samples = []
+    start = clock()
+    deadline = start + int(duration * 1e9)
+    now = start
+    while now < deadline:
+        before = clock()
+        func()
+        now = clock()
+        samples.append(now - before)
+    elapsed = (now - start) / 1e9
+
+    samples.sort()
+    count = len(samples)
+
+    def percentile(p):
+        return samples[min(count - 1, int(p * count))] / 1000
+
+    return {
+        'calls': count,
+        'ops_per_sec': round(count / elapsed, 1),
+        'mean_us': round(sum(samples) / count / 1000, 2),
+        'p50_us': round(percentile(0.50), 2),
+        'p95_us': round(percentile(0.95), 2),
+        'p99_us': round(percentile(0.99), 2),
+    }
+
+
+def generator_benchmarks():
+    for (grade, section), generator in sorted(generator_table().items()):
+        yield f"generator/grade{grade}/{section}", generator
+
+
+def spec_benchmarks():
+    for grade in spec_grades():
+        for section, spec in load_grade_specs(grade).items():
+            mode = 'exhaustive' if spec.exhaustive else 'sequential'
+            yield f"spec/grade{grade}/{section}/{mode}", lambda spec=spec: spec.sample(random)
+
+
+def chart_benchmarks():
+    graphs = CONTENT_BANKS.current().graphs
+    if not graphs:
+        return
+    # The graph with the most questions exercises the most plans
+    graph = max(graphs, key=lambda g: len(g['plans']))
+    for grade in (5, 6):
+        yield f"charts/values_and_answers/grade{grade}", \
+            lambda grade=grade: generate_graph_values_and_answers(graph, grade)
+
+
+def question_benchmarks():
+    for grade in sorted(GRADES):
+        for section in sections_for_grade(grade):
+            yield f"build_question/grade{grade}/{section}", \
+                lambda section=section, grade=grade: build_question(section, grade)
+            yield f"generate_question/grade{grade}/{section}", \
+                lambda section=section, grade=grade: generate_question(section, grade)
+
+
+def compare_benchmarks():
+    for comparator, (correct, right, wrong) in COMPARE_CASES.items():
+        yield f"compare_answer/{comparator}/correct", \
+            lambda c=comparator, a=correct, u=right: compare_answer(c, a, u)
+        yield f"compare_answer/{comparator}/wrong", \
+            lambda c=comparator, a=correct, u=wrong: compare_answer(c, a, u)
+
+
+def http_benchmarks():
+    client = app.test_client()
+    issued = client.get('/api/questions?section=division&grade=6&count=10').get_json()['questions']
+    question = issued[0]
+    one_answer = {'id': question['id'], 'token': question.get('token'),
+                  'answer': {'quotient': '1', 'remainder': '0'}}
+    many_answers = {'answers': [{'id': q['id'], 'token': q.get('token'),
+                                 'answer': {'quotient': '1', 'remainder': '0'}} for q in issued]}
+
+    def get(url):
+        return lambda: client.get(url)
+
+    def post(url, body):
+        return lambda: client.post(url, json=body)
+
+    yield "http/GET /api/question grade3 addition", get('/api/question?section=addition&grade=3')
+    yield "http/GET /api/question grade6 charts", get('/api/question?section=charts&grade=6')
+    yield "http/GET /api/questions count=10", get('/api/questions?section=multiplication&grade=5&count=10')
+    yield "http/GET /api/questions/mixed count=10", get('/api/questions/mixed?grade=6&count=10')
+    yield "http/POST /api/answer", post('/api/answer', one_answer)
+    yield "http/POST /api/answers x10", post('/api/answers', many_answers)
+    yield "http/GET /", get('/')
+
+
+SUITES = (generator_benchmarks, spec_benchmarks, chart_benchmarks, question_benchmarks, compare_benchmarks, http_benchmarks)
+
+
+def run(duration, name_filter=None):
+    results = {}
+    for suite in SUITES:
+        for name, func in suite():
+            if name_filter and name_filter not in name:
+                continue
+            results[name] = measure(func, duration)
+            r = results[name]
+            print(f"{name:<55} {r['ops_per_sec']:>12,.0f} ops/s  p50 {r['p50_us']:>9.1f} us  "
+                  f"p99 {r['p99_us']:>9.1f} us")
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'platform': platform.platform(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'duration': duration,
+        },
+        'results': results,
+    }
+
+
+def compare(current, baseline, threshold):
+    """Print the change per benchmark; return the names that regressed past threshold"""
+    regressions = []
+    print(f"\nComparison against baseline (threshold {threshold:.0%} on median latency):")
+    for name, result in current['results'].items():
+        base = baseline['results'].get(name)
+        if base is None:
+            print(f"  {name:<55} new")
+            continue
+        change = result['p50_us'] / base['p50_us'] - 1 if base['p50_us'] else 0.0
+        flag = ""
+        if change > threshold:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"  {name:<55} {base['p50_us']:>9.1f} -> {result['p50_us']:>9.1f} us  {change:+7.1%}{flag}")
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark question generation, checking and routes")
+    parser.add_argument('--duration', type=float, default=DEFAULT_DURATION,
+                        help=f"Seconds per benchmark (default: {DEFAULT_DURATION})")
+    parser.add_argument('--filter', default=None, help="Only run benchmarks whose name contains this")
+    parser.add_argument('--output', default=None, help="Write results to this JSON file")
+    parser.add_argument('--compare', default=None, help="Baseline JSON file to compare against")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help=f"Allowed median latency increase, e.g. 0.1 = 10%% (default: {DEFAULT_THRESHOLD})")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    results = run(args.duration, args.filter)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nWrote {len(results['results'])} results to {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} benchmark(s) regressed: {', '.join(regressions)}")
+            return 1
+        print("\nNo regressions")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
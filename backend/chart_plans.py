@@ -0,0 +1,122 @@
+"""
+Compiled answer plans for chart questions
+- Each chart question is parsed once, when chart_problems.csv is loaded, into a
+  small plan such as ('argmax',) or ('diff', 0, 2) with label indices resolved
+- Computing an answer for freshly generated values is then a few index operations
+- Questions that only compile to a fallback (or match several labels) are
+  reported at load time instead of silently falling back on every request
+"""
+
+
+def label_text(label):
+    """Label without emojis, digits or punctuation, e.g. '🔴 Red' -> 'Red'"""
+    return ''.join(c for c in label if c.isalpha() or c.isspace()).strip()
+
+
+def _find_label(text, label_texts, skip=None):
+    """Indices of labels whose text appears in `text` (optionally skipping one index)"""
+    return [i for i, name in enumerate(label_texts) if name.lower() in text and i != skip]
+
+
+def compile_chart_question(question, labels, original_answer):
+    """
+    Compile one chart question into an answer plan.
+
+    Returns:
+        (plan, problem) where problem is None for a clean compile, or a short
+        description when the plan is a fallback or the question is ambiguous
+    """
+    q_lower = question.lower()
+    label_texts = [label_text(label) for label in labels]
+
+    # "Which X has the highest/most/maximum value?"
+    if 'highest' in q_lower or 'most' in q_lower or 'maximum' in q_lower:
+        return ('argmax',), None
+
+    # "Which X has the lowest/least/minimum value?"
+    if 'lowest' in q_lower or 'least' in q_lower and 'how many' not in q_lower or 'minimum' in q_lower:
+        return ('argmin',), None
+
+    # "What is the total/sum?"
+    if 'total' in q_lower or 'sum' in q_lower:
+        return ('sum',), None
+
+    # "What is the average?"
+    if 'average' in q_lower:
+        return ('mean',), None
+
+    # "How many more is A than B?" means A - B
+    if 'how many more' in q_lower or 'how much more' in q_lower:
+        if ' than ' not in q_lower:
+            return ('range',), "no 'than' in comparison, using max - min"
+        before_than, after_than = q_lower.split(' than ', 1)
+        first = _find_label(before_than, label_texts)
+        second = _find_label(after_than, label_texts, skip=first[0] if first else None)
+        if not first or not second:
+            return ('range',), "comparison labels not found, using max - min"
+        problem = None
+        if len(first) > 1 or len(second) > 1:
+            problem = "comparison matches several labels, using the first"
+        return ('diff', first[0], second[0]), problem
+
+    # "How many X?" - specific label value
+    if 'how many' in q_lower or 'what' in q_lower and 'was' in q_lower:
+        found = _find_label(q_lower, label_texts)
+        if not found:
+            return ('lookup', 0), "no label mentioned, using the first value"
+        problem = None
+        if len(found) > 1:
+            problem = "question matches several labels, using the first"
+        return ('lookup', found[0]), problem
+
+    # Unrecognized: keep the answer from the CSV (it won't match the new values)
+    return ('static', original_answer), "unrecognized question, using the CSV answer"
+
+
+def _argmax(labels, values, plan):
+    return labels[values.index(max(values))]
+
+
+def _argmin(labels, values, plan):
+    return labels[values.index(min(values))]
+
+
+def _sum(labels, values, plan):
+    return str(sum(values))
+
+
+def _mean(labels, values, plan):
+    return str(round(sum(values) / len(values)))
+
+
+def _diff(labels, values, plan):
+    return str(values[plan[1]] - values[plan[2]])
+
+
+def _range(labels, values, plan):
+    return str(max(values) - min(values))
+
+
+def _lookup(labels, values, plan):
+    return str(values[plan[1]])
+
+
+def _static(labels, values, plan):
+    return plan[1]
+
+
+PLAN_OPERATIONS = {
+    'argmax': _argmax,
+    'argmin': _argmin,
+    'sum': _sum,
+    'mean': _mean,
+    'diff': _diff,
+    'range': _range,
+    'lookup': _lookup,
+    'static': _static,
+}
+
+
+def evaluate_plan(plan, labels, values):
+    """Compute the answer string for one compiled question"""
+    return PLAN_OPERATIONS[plan[0]](labels, values, plan)
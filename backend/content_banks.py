@@ -0,0 +1,181 @@
+"""
+Hot-reloadable content banks (chart bank, word problem templates)
+- Each source is one CSV file with its own parse function
+- A background thread polls the files' mtimes; when one changes, only that
+  file is re-parsed, then a new immutable snapshot is built from it and the
+  unchanged parts, and swapped in with a single assignment
+- Requests take one snapshot reference and use it throughout, so they never
+  see a half-loaded bank
+- A file that fails to parse keeps its previous contents and is reported once;
+  the other changed files are still reloaded
+- A failed build keeps the previous snapshot and reports the error; the
+  parsed files are kept for the next build
+- Each snapshot has a version tag derived from the mtimes and sizes of the files
+  its contents were parsed from (the same in every process); the previous
+  snapshot is kept, so work issued just before a reload can still be redone
+  against the content it came from
+"""
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_RELOAD_INTERVAL = 2.0
+
+# Snapshots kept by version: the current one and the one before it
+KEPT_SNAPSHOTS = 2
+
+
+def _file_version(path):
+    """(mtime, size) of a file, or None if it is missing"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _version_tag(versions):
+    """Short tag for a set of file versions"""
+    return hashlib.blake2b(repr(sorted(versions.items())).encode(), digest_size=4).hexdigest()
+
+
+class ContentBanks:
+    """
+    Snapshots of the content banks, rebuilt when a source file changes.
+
+    Args:
+        sources: {name: (path, parse, fallback)}; parse(path) returns the parsed
+            part and raises on invalid content; fallback is used if the file
+            can't be loaded at startup
+        build: Function {name: part} -> snapshot; may raise to reject a reload
+        interval: Seconds between mtime checks (0 disables watching)
+    """
+
+    def __init__(self, sources, build, interval=DEFAULT_RELOAD_INTERVAL):
+        self._sources = sources
+        self._build = build
+        self.interval = interval
+        self.reloads = 0
+        self.failures = 0
+        self.last_error = None
+        self._lock = threading.Lock()
+        self._thread = None
+
+        self._parts = {}
+        self._versions = {}     # name -> file version last seen (to notice changes)
+        self._loaded = {}       # name -> file version its part was parsed from (None: fallback)
+        for name, (path, parse, fallback) in sources.items():
+            self._versions[name] = _file_version(path)
+            try:
+                self._parts[name] = parse(path)
+                self._loaded[name] = self._versions[name]
+            except Exception as e:
+                print(f"Error loading {name} from {path}: {e}")
+                self._parts[name] = fallback
+                self._loaded[name] = None
+        self._snapshots = OrderedDict()     # version tag -> snapshot, oldest first
+        self._keep(_version_tag(self._loaded), build(dict(self._parts)))
+
+        # The watcher thread doesn't survive a fork; each process starts its own
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._forget_thread)
+
+    def _forget_thread(self):
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _keep(self, version, snapshot):
+        """Make snapshot current, forgetting all but the last KEPT_SNAPSHOTS"""
+        self._snapshots[version] = snapshot
+        self._snapshots.move_to_end(version)
+        while len(self._snapshots) > KEPT_SNAPSHOTS:
+            self._snapshots.popitem(last=False)
+        # One assignment, so readers never see a version with another version's snapshot
+        self._current = (version, snapshot)
+
+    @property
+    def snapshot(self):
+        return self._current[1]
+
+    def current(self):
+        """The current snapshot (starts the watcher on first use)"""
+        return self.current_versioned()[1]
+
+    def current_versioned(self):
+        """(version tag, snapshot) of the current snapshot"""
+        if self._thread is None and self.interval > 0:
+            self._start_watcher()
+        return self._current
+
+    def snapshot_for(self, version):
+        """A kept snapshot by version tag, or None if it is gone"""
+        return self._snapshots.get(version)
+
+    def _start_watcher(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._watch_loop, name='content-watcher', daemon=True)
+                self._thread.start()
+
+    def _watch_loop(self):
+        while True:
+            time.sleep(self.interval)
+            self.check()
+
+    def check(self):
+        """Reload any changed source now; returns the names that were reloaded"""
+        changed = [name for name, (path, _parse, _fallback) in self._sources.items()
+                   if _file_version(path) != self._versions[name]]
+        if not changed:
+            return []
+
+        with self._lock:
+            parts = dict(self._parts)
+            loaded = dict(self._loaded)
+            reloaded = []
+            errors = []
+            for name in changed:
+                path, parse, _fallback = self._sources[name]
+                version = _file_version(path)
+                # Remember the new version even if it is broken, so it is reported once, not on every poll
+                self._versions[name] = version
+                try:
+                    parts[name] = parse(path)
+                except Exception as e:
+                    errors.append(f"{name}: {e}")
+                    continue
+                loaded[name] = version
+                reloaded.append(name)
+            if reloaded:
+                # Parsed parts are kept even if the build fails, so the next build includes them
+                self._parts = parts
+                self._loaded = loaded
+                try:
+                    snapshot = self._build(parts)
+                except Exception as e:
+                    errors.append(f"{', '.join(reloaded)}: {e}")
+                    reloaded = []
+                else:
+                    self._keep(_version_tag(loaded), snapshot)
+                    self.reloads += 1
+            if errors:
+                self.failures += 1
+                self.last_error = '; '.join(errors)
+                print(f"Content reload failed, keeping the previous version ({self.last_error})")
+            else:
+                self.last_error = None
+        if reloaded:
+            print(f"Reloaded content: {', '.join(reloaded)}")
+        return reloaded
+
+
+def create_content_banks(sources, build):
+    """
+    Build the content banks from environment settings:
+        CONTENT_RELOAD_INTERVAL  seconds between checks for edited CSVs (default 2, 0 = never reload)
+    """
+    interval = float(os.environ.get('CONTENT_RELOAD_INTERVAL', DEFAULT_RELOAD_INTERVAL))
+    return ContentBanks(sources, build, interval=interval)
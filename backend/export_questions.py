@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Export worksheets / question banks from the command line
+
+Streams questions for the chosen grades and sections to a questions file, with
+the answers in a separate answer-key file. Questions flow through a generator
+pipeline straight into the writer, so memory stays flat however large --count is.
+
+Examples:
+    python export_questions.py --grades 5,6 --count 30 --output worksheets/week1
+    python export_questions.py --grades 4 --sections division --count 1000000 --format csv
+    python export_questions.py --count 500000 --format parquet --shards 0   # one shard per core
+
+Formats: jsonl (default), csv, parquet (columnar, needs pyarrow).
+"""
+
+import argparse
+import csv
+import json
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+
+from app import build_question, sections_for_grade, GRADES
+
+# Presentation fields copied to the questions file (none of them reveal the answer)
+WORKSHEET_FIELDS = ('chart', 'sub_questions', 'fraction_visual')
+
+# Rows per Parquet row group
+PARQUET_ROW_GROUP = 10000
+
+EXTENSIONS = {'jsonl': 'jsonl', 'csv': 'csv', 'parquet': 'parquet'}
+
+
+def iter_questions(plan, shard, seed):
+    """
+    Yield (question_row, answer_row) pairs for one shard.
+
+    Args:
+        plan: List of (grade, section, count) for this shard
+        shard: Shard number, used in question ids
+        seed: Seed for this shard's random stream (None for fresh entropy)
+    """
+    if seed is not None:
+        random.seed(seed)
+    for grade, section, count in plan:
+        for i in range(count):
+            q = build_question(section, grade)
+            question_id = f"{grade}-{section}-{shard}-{i}"
+            row = {'id': question_id, 'grade': grade, 'section': section, 'question': q['question']}
+            for field in WORKSHEET_FIELDS:
+                if field in q:
+                    row[field] = q[field]
+            yield row, {'id': question_id, 'answer': q['answer']}
+
+
+def _json(value):
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':'))
+
+
+def _cell(value):
+    """CSV cell: scalars as-is, structured values as JSON"""
+    if value is None or isinstance(value, (str, int, float)):
+        return value
+    return _json(value)
+
+
+def write_jsonl(pairs, questions_path, answers_path):
+    count = 0
+    with open(questions_path, 'w', encoding='utf-8') as qf, open(answers_path, 'w', encoding='utf-8') as af:
+        for row, answer in pairs:
+            qf.write(_json(row) + '\n')
+            af.write(_json(answer) + '\n')
+            count += 1
+    return count
+
+
+def write_csv(pairs, questions_path, answers_path):
+    count = 0
+    columns = ['id', 'grade', 'section', 'question'] + list(WORKSHEET_FIELDS)
+    with open(questions_path, 'w', encoding='utf-8', newline='') as qf, \
+            open(answers_path, 'w', encoding='utf-8', newline='') as af:
+        questions = csv.writer(qf)
+        answers = csv.writer(af)
+        questions.writerow(columns)
+        answers.writerow(['id', 'answer'])
+        for row, answer in pairs:
+            questions.writerow([_cell(row.get(column)) for column in columns])
+            answers.writerow([answer['id'], _cell(answer['answer'])])
+            count += 1
+    return count
+
+
+def write_parquet(pairs, questions_path, answers_path):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise SystemExit("--format parquet requires pyarrow (pip install pyarrow)")
+
+    question_schema = pa.schema([('id', pa.string()), ('grade', pa.int8()), ('section', pa.string()),
+                                 ('question', pa.string())] +
+                                [(field, pa.string()) for field in WORKSHEET_FIELDS])
+    answer_schema = pa.schema([('id', pa.string()), ('answer', pa.string())])
+
+    count = 0
+    with pq.ParquetWriter(questions_path, question_schema) as questions, \
+            pq.ParquetWriter(answers_path, answer_schema) as answers:
+        question_columns = {name: [] for name in question_schema.names}
+        answer_columns = {name: [] for name in answer_schema.names}
+
+        def flush():
+            questions.write_table(pa.table(question_columns, schema=question_schema))
+            answers.write_table(pa.table(answer_columns, schema=answer_schema))
+            for column in list(question_columns.values()) + list(answer_columns.values()):
+                column.clear()
+
+        for row, answer in pairs:
+            for name in question_schema.names:
+                value = row.get(name)
+                question_columns[name].append(value if name in ('id', 'grade', 'section', 'question')
+                                              or value is None else _json(value))
+            answer_columns['id'].append(answer['id'])
+            answer_columns['answer'].append(_json(answer['answer']))
+            count += 1
+            if count % PARQUET_ROW_GROUP == 0:
+                flush()
+        if question_columns['id']:
+            flush()
+    return count
+
+
+WRITERS = {'jsonl': write_jsonl, 'csv': write_csv, 'parquet': write_parquet}
+
+
+def export_shard(plan, shard, seed, output, fmt, sharded):
+    """Write one shard's questions and answer key. Returns (questions_path, count)."""
+    suffix = f"-{shard:03d}" if sharded else ""
+    extension = EXTENSIONS[fmt]
+    questions_path = f"{output}{suffix}.questions.{extension}"
+    answers_path = f"{output}{suffix}.answers.{extension}"
+    count = WRITERS[fmt](iter_questions(plan, shard, seed), questions_path, answers_path)
+    return questions_path, count
+
+
+def split_plan(plan, shards):
+    """Split each (grade, section, count) evenly across shards"""
+    shard_plans = [[] for _ in range(shards)]
+    for grade, section, count in plan:
+        for shard in range(shards):
+            share = count // shards + (1 if shard < count % shards else 0)
+            if share:
+                shard_plans[shard].append((grade, section, share))
+    return shard_plans
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Export quiz questions and answer keys")
+    parser.add_argument('--grades', default=','.join(str(g) for g in sorted(GRADES)),
+                        help="Comma-separated grades (default: all)")
+    parser.add_argument('--sections', default=None,
+                        help="Comma-separated sections (default: every section of each grade)")
+    parser.add_argument('--count', type=int, default=20,
+                        help="Questions per grade and section (default: 20)")
+    parser.add_argument('--format', choices=sorted(WRITERS), default='jsonl')
+    parser.add_argument('--output', default='questions',
+                        help="Output path prefix (default: ./questions)")
+    parser.add_argument('--shards', type=int, default=1,
+                        help="Number of output shards written in parallel (0 = one per CPU core)")
+    parser.add_argument('--seed', type=int, default=None, help="Seed for reproducible output")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    grades = [int(g) for g in args.grades.split(',')]
+    plan = []
+    for grade in grades:
+        available = sections_for_grade(grade)
+        sections = args.sections.split(',') if args.sections else available
+        for section in sections:
+            if section not in available:
+                raise SystemExit(f"Grade {grade} has no {section} section")
+            plan.append((grade, section, args.count))
+
+    output_dir = os.path.dirname(args.output)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+
+    shards = args.shards or os.cpu_count() or 1
+    shard_plans = split_plan(plan, shards)
+    seeds = [None if args.seed is None else args.seed + shard for shard in range(shards)]
+
+    if shards == 1:
+        results = [export_shard(shard_plans[0], 0, seeds[0], args.output, args.format, False)]
+    else:
+        with ProcessPoolExecutor(max_workers=shards) as pool:
+            futures = [pool.submit(export_shard, shard_plans[shard], shard, seeds[shard],
+                                   args.output, args.format, True)
+                       for shard in range(shards)]
+            results = [future.result() for future in futures]
+
+    for path, count in results:
+        print(f"Wrote {count} questions to {path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1 +1,95 @@
 # Grade-level modules for math quiz generation
+"""
+Grade registry
+- Grade modules are found by naming convention: grade_<N>.py in this package
+  is grade N and exports QUESTION_GENERATORS ({section: generator})
+- Discovery only lists the package directory; a grade module is imported the
+  first time that grade is used
+- Loaded generators go into one flat (grade, section) -> generator table, so
+  dispatch is a single dict lookup
+"""
+
+import importlib
+import pkgutil
+import re
+import threading
+
+GRADE_MODULE_PATTERN = re.compile(r'grade_(\d+)$')
+
+
+class GradeRegistry:
+    """
+    Grade modules of a package, imported on demand.
+
+    Args:
+        package: Package name the grade modules live in
+        path: The package's __path__
+    """
+
+    def __init__(self, package, path):
+        self.package = package
+        self._module_names = {}   # grade -> module name, from the directory listing
+        for info in pkgutil.iter_modules(path):
+            match = GRADE_MODULE_PATTERN.match(info.name)
+            if match:
+                self._module_names[int(match.group(1))] = info.name
+        self._modules = {}        # grade -> imported module
+        self._generators = {}     # (grade, section) -> generator, for loaded grades
+        self._lock = threading.Lock()
+
+    def grades(self):
+        """Available grade numbers, sorted (imports nothing)"""
+        return sorted(self._module_names)
+
+    def __contains__(self, grade):
+        return grade in self._module_names
+
+    def module(self, grade):
+        """The grade's module, imported on first use; None for an unknown grade"""
+        module = self._modules.get(grade)
+        if module is None and grade in self._module_names:
+            with self._lock:
+                module = self._modules.get(grade)
+                if module is None:
+                    module = importlib.import_module(f"{self.package}.{self._module_names[grade]}")
+                    for section, generator in module.QUESTION_GENERATORS.items():
+                        self._generators[(grade, section)] = generator
+                    self._modules[grade] = module
+        return module
+
+    def generator(self, grade, section):
+        """Generator for (grade, section), or None"""
+        generator = self._generators.get((grade, section))
+        if generator is None and grade not in self._modules and self.module(grade) is not None:
+            generator = self._generators.get((grade, section))
+        return generator
+
+    def spec(self, grade, section):
+        """Compiled SectionSpec of (grade, section), or None (unknown, or a hand-written generator)"""
+        module = self.module(grade)
+        return getattr(module, 'SPECS', {}).get(section) if module else None
+
+    def sections(self, grade):
+        """Section names of a grade, in the module's order (empty for an unknown grade)"""
+        module = self.module(grade)
+        return list(module.QUESTION_GENERATORS) if module else []
+
+    def load_all(self):
+        """Import every grade now (e.g. before forking workers)"""
+        for grade in self._module_names:
+            self.module(grade)
+
+    def table(self):
+        """The flat (grade, section) -> generator table for every grade"""
+        self.load_all()
+        return dict(self._generators)
+
+
+REGISTRY = GradeRegistry(__name__, __path__)
+
+available_grades = REGISTRY.grades
+get_generator = REGISTRY.generator
+get_spec = REGISTRY.spec
+sections_for = REGISTRY.sections
+generator_table = REGISTRY.table
+load_all = REGISTRY.load_all
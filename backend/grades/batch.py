@@ -0,0 +1,197 @@
+"""
+Vectorized bulk question generation (NumPy)
+- generate_batch(grade, section, n, seed) draws the operands for a whole batch
+  with NumPy array operations and computes answers the same way
+- The operands come from the section's compiled spec (data/specs/grade_<N>.toml),
+  so batches follow the same ranges, weights and constraints as single questions:
+  exhaustive specs pick rows of their probability table, sequential ones draw
+  each operand in turn with the bound expressions evaluated over arrays
+- Returns a QuestionBatch of columnar arrays; question dicts are only built
+  when the batch is iterated, a chunk at a time
+
+NumPy is optional; it is only needed when this module is used.
+"""
+
+import functools
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - depends on the environment
+    np = None
+
+from . import get_spec
+from .specs import parse_expression
+
+# Rows converted to Python objects at a time while iterating a batch
+ITER_CHUNK_SIZE = 10000
+
+FRACTION_SUFFIX = "(Answer in decimal, rounded to 2 places)"
+
+def _ints(rng, low, high, n):
+    """n integers uniform in [low, high]; low and high may be arrays"""
+    return rng.integers(low, high, size=n, endpoint=True)
+
+
+def _array_bound(bound, names, values, where):
+    """A spec bound as written (int or expression), evaluated over arrays of earlier operands"""
+    if type(bound) is int:
+        return bound
+    scope = {'__builtins__': {},
+             'min': lambda *args: functools.reduce(np.minimum, args),
+             'max': lambda *args: functools.reduce(np.maximum, args)}
+    return eval(compile(parse_expression(bound, names, where), where, 'eval'), scope, dict(values))
+
+
+def _draw_variant(rng, variant, n, where):
+    """{operand: array of n values} drawn like Variant.draw, one operand at a time"""
+    values = {}
+    for name, (low, high) in variant.ranges.items():
+        values[name] = _ints(rng, _array_bound(low, set(values), values, where),
+                             _array_bound(high, set(values), values, where), n)
+    return values
+
+
+def _draw_operands(rng, spec, n):
+    """{operand: array of n values} with the spec's distribution"""
+    operands = spec.kind.operands
+    if spec.exhaustive:
+        table = np.array([[values[name] for name in operands] for values in spec.outcomes])
+        probabilities = np.array(spec.probabilities)
+        rows = table[rng.choice(len(table), size=n, p=probabilities / probabilities.sum())]
+        return {name: rows[:, i] for i, name in enumerate(operands)}
+    path = f"grade_{spec.grade}.{spec.section}"
+    if len(spec.variants) == 1:
+        return _draw_variant(rng, spec.variants[0], n, path)
+    weights = np.array([variant.weight for variant in spec.variants], dtype=float)
+    picks = rng.choice(len(weights), size=n, p=weights / weights.sum())
+    columns = {name: np.zeros(n, dtype=np.int64) for name in operands}
+    for i, variant in enumerate(spec.variants):
+        rows = np.flatnonzero(picks == i)
+        drawn = _draw_variant(rng, variant, len(rows), f"{path}.{variant.name}")
+        for name in operands:
+            columns[name][rows] = drawn[name]
+    return columns
+
+
+def _binary(a, b, answer):
+    return {'a': a, 'b': b, 'answer': answer}
+
+
+def _division(divisor, quotient, remainder):
+    return {
+        'dividend': quotient * divisor + remainder,
+        'divisor': divisor,
+        'quotient': quotient,
+        'remainder': remainder,
+    }
+
+
+def _fractions(num1, denom1, num2, denom2, answer):
+    return {
+        'numerator1': num1,
+        'denominator1': denom1,
+        'numerator2': num2,
+        'denominator2': denom2,
+        'answer': np.round(answer, 2),
+    }
+
+
+# Spec kind -> function (operand arrays) -> batch columns
+COLUMNS = {
+    'addition': lambda v: _binary(v['a'], v['b'], v['a'] + v['b']),
+    'subtraction': lambda v: _binary(v['a'], v['b'], v['a'] - v['b']),
+    'multiplication': lambda v: _binary(v['a'], v['b'], v['a'] * v['b']),
+    'division': lambda v: _division(v['divisor'], v['quotient'], v['remainder']),
+    'fraction_same': lambda v: _fractions(v['num1'], v['denominator'], v['num2'], v['denominator'],
+                                          (v['num1'] + v['num2']) / v['denominator']),
+    'fraction_different': lambda v: _fractions(v['num1'], v['denom1'], v['num2'], v['denom2'],
+                                               v['num1'] / v['denom1'] + v['num2'] / v['denom2']),
+}
+
+OPERATORS = {'addition': '+', 'subtraction': '-', 'multiplication': '×'}
+
+
+class QuestionBatch:
+    """
+    A batch of questions stored as columns (name -> NumPy array).
+
+    Iterating yields question dicts shaped like the scalar generators' output
+    (question, answer, operands, plus fraction for fraction questions), built
+    lazily a chunk at a time so huge batches never materialize as dicts at once.
+    """
+
+    def __init__(self, spec, columns):
+        self.grade = spec.grade
+        self.section = spec.section
+        self.kind_name = spec.kind_name
+        self.text = spec.text       # None: the kind's default text
+        self.columns = columns
+
+    def __len__(self):
+        return len(self.columns['answer'] if 'answer' in self.columns else self.columns['quotient'])
+
+    def __iter__(self):
+        for start in range(0, len(self), ITER_CHUNK_SIZE):
+            # tolist() turns a whole chunk into Python ints/floats in one call
+            chunk = {name: column[start:start + ITER_CHUNK_SIZE].tolist()
+                     for name, column in self.columns.items()}
+            yield from self._build(chunk)
+
+    def _build(self, chunk):
+        kind, text = self.kind_name, self.text
+        if kind in OPERATORS:
+            op = OPERATORS[kind]
+            for a, b, answer in zip(chunk['a'], chunk['b'], chunk['answer']):
+                yield {
+                    'question': f"What is {a} {op} {b}?" if text is None else text.format(a=a, b=b),
+                    'answer': answer,
+                    'operands': {'a': a, 'b': b}
+                }
+        elif kind == 'division':
+            for dividend, divisor, quotient, remainder in zip(
+                    chunk['dividend'], chunk['divisor'], chunk['quotient'], chunk['remainder']):
+                yield {
+                    'question': (f"What is {dividend} ÷ {divisor}?" if text is None else text.format(
+                        dividend=dividend, divisor=divisor, quotient=quotient, remainder=remainder)),
+                    'answer': {'quotient': quotient, 'remainder': remainder},
+                    'operands': {'a': dividend, 'b': divisor}
+                }
+        else:
+            same_denominator = kind == 'fraction_same'
+            for num1, denom1, num2, denom2, answer in zip(
+                    chunk['numerator1'], chunk['denominator1'],
+                    chunk['numerator2'], chunk['denominator2'], chunk['answer']):
+                if text is not None:
+                    operands = ({'denominator': denom1} if same_denominator
+                                else {'denom1': denom1, 'denom2': denom2})
+                    question = text.format(num1=num1, num2=num2, **operands)
+                else:
+                    question = f"What is {num1}/{denom1} + {num2}/{denom2}? {FRACTION_SUFFIX}"
+                yield {
+                    'question': question,
+                    'answer': answer,
+                    'fraction': (f"{num1 + num2}/{denom1}" if same_denominator
+                                 else f"{num1}/{denom1} + {num2}/{denom2}")
+                }
+
+
+def generate_batch(grade, section, n, seed=None):
+    """
+    Generate n questions for one grade and section in a single vectorized pass.
+
+    Args:
+        grade: Grade level (1-6)
+        section: Section name, as in the grade's spec file
+        n: Number of questions
+        seed: Seed for a reproducible batch (None draws fresh entropy)
+
+    Returns:
+        QuestionBatch
+    """
+    if np is None:
+        raise ImportError("generate_batch requires NumPy (pip install numpy)")
+    spec = get_spec(grade, section)
+    if spec is None:
+        raise ValueError(f"No spec for grade {grade} {section}")
+    rng = np.random.default_rng(seed)
+    return QuestionBatch(spec, COLUMNS[spec.kind_name](_draw_operands(rng, spec, n)))
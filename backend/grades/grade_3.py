@@ -3,39 +3,16 @@ Grade 3 Math Quiz Logic
 - Addition: Numbers 1-50
 - Subtraction: Numbers 1-99, no negatives
 - Multiplication: Tables 2-10
-"""
 
-import random
+Operand ranges and weights live in data/specs/grade_3.toml
+"""
 
-def generate_addition_question():
-    """Generate addition question for Grade 3"""
-    a = random.randint(10, 100)
-    b = random.randint(10, 100)
-    return {
-        'question': f"What is {a} + {b}?",
-        'answer': a + b
-    }
+from .specs import load_grade_specs
 
-def generate_subtraction_question():
-    """Generate subtraction question for Grade 3"""
-    a = random.randint(1, 99)
-    b = random.randint(1, a)  # Ensure a >= b (no negatives)
-    return {
-        'question': f"What is {a} - {b}?",
-        'answer': a - b
-    }
+SPECS = load_grade_specs(3)
 
-def generate_multiplication_question():
-    """Generate multiplication question for Grade 3"""
-    a = random.randint(2, 10)
-    b = random.randint(2, 10)
-    return {
-        'question': f"What is {a} × {b}?",
-        'answer': a * b
-    }
+QUESTION_GENERATORS = {section: spec.generate for section, spec in SPECS.items()}
 
-QUESTION_GENERATORS = {
-    'addition': generate_addition_question,
-    'subtraction': generate_subtraction_question,
-    'multiplication': generate_multiplication_question
-}
+generate_addition_question = SPECS['addition'].generate
+generate_subtraction_question = SPECS['subtraction'].generate
+generate_multiplication_question = SPECS['multiplication'].generate
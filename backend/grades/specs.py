@@ -0,0 +1,615 @@
+"""
+Declarative question specs
+- data/specs/grade_<N>.toml declares each section's kind (addition, division,
+  ...), its operand ranges, constraints and weighted variants; the grade module
+  compiles it once when the grade is loaded
+- Small operand spaces (at most EXHAUSTIVE_LIMIT questions) are enumerated
+  into a table of every operand tuple with its exact probability; a draw is one
+  alias table lookup (or one uniform choice when all tuples are equally likely)
+- Larger spaces draw each operand in turn with precompiled bounds; weighted
+  variants are picked with an alias table
+- Either way a question costs O(1) draws, with no rejection loops
+- Each variant's operand tuples can also be listed by index (operand_spaces),
+  for the no-repeat session sampler to walk in a permuted order
+
+Run `python -m grades.specs` to print the operand table (the generated part
+of GRADE_NUMBER_LIMITS.md), or `--write` to update that document.
+"""
+
+import ast
+import bisect
+import keyword
+import os
+import random
+import sys
+
+try:
+    import tomllib
+except ImportError:     # Python < 3.11
+    import tomli as tomllib
+
+from .block_utils import create_blocks
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SPEC_DIR = os.path.join(BACKEND_DIR, 'data', 'specs')
+LIMITS_DOC = os.path.join(os.path.dirname(BACKEND_DIR), 'GRADE_NUMBER_LIMITS.md')
+
+# Most operand tuples enumerated into an exhaustive table
+EXHAUSTIVE_LIMIT = 10000
+
+# Most prefixes (values of every operand but the last) indexed for a sequential
+# variant whose last operand's range depends on the others
+PREFIX_LIMIT = 100000
+
+# Markers around the generated table in GRADE_NUMBER_LIMITS.md
+DOC_BEGIN = '<!-- BEGIN GENERATED SPEC TABLE (python -m grades.specs --write) -->'
+DOC_END = '<!-- END GENERATED SPEC TABLE -->'
+
+SECTION_KEYS = {'kind', 'blocks', 'visual', 'text', 'operands', 'where', 'variants'}
+VARIANT_KEYS = {'name', 'weight', 'operands', 'where'}
+
+_EXPRESSION_NODES = (
+    ast.Expression, ast.BinOp, ast.UnaryOp, ast.Compare, ast.BoolOp, ast.Call, ast.Name,
+    ast.Load, ast.Constant, ast.Add, ast.Sub, ast.Mult, ast.FloorDiv, ast.Mod, ast.USub,
+    ast.Eq, ast.NotEq, ast.Lt, ast.LtE, ast.Gt, ast.GtE, ast.And, ast.Or,
+)
+_FUNCTIONS = {'min': min, 'max': max}
+_SCOPE = {'__builtins__': {}, **_FUNCTIONS}
+
+
+class SpecError(ValueError):
+    """A spec file that can't be compiled"""
+
+
+def parse_expression(text, names, where):
+    """
+    Checked source of a bound or constraint like "denominator - num1".
+    Only integers, the given operand names, + - * // %, comparisons, and/or,
+    min() and max() are allowed.
+    """
+    try:
+        tree = ast.parse(str(text).strip(), mode='eval')
+    except SyntaxError:
+        raise SpecError(f"{where}: can't parse {text!r}") from None
+    for node in ast.walk(tree):
+        if not isinstance(node, _EXPRESSION_NODES):
+            raise SpecError(f"{where}: {type(node).__name__} not allowed in {text!r}")
+        if isinstance(node, ast.Constant) and type(node.value) is not int:
+            raise SpecError(f"{where}: only whole numbers are allowed in {text!r}")
+        if isinstance(node, ast.Call) and not (
+                isinstance(node.func, ast.Name) and node.func.id in _FUNCTIONS and not node.keywords):
+            raise SpecError(f"{where}: only min() and max() can be called in {text!r}")
+        if isinstance(node, ast.Name) and node.id not in names and node.id not in _FUNCTIONS:
+            raise SpecError(f"{where}: {node.id!r} is not an earlier operand in {text!r}")
+    return ast.unparse(tree)
+
+
+def compile_expression(text, names, where):
+    """A function values -> result for a bound or constraint (see parse_expression)"""
+    code = compile(parse_expression(text, names, where), where, 'eval')
+    return lambda values: eval(code, _SCOPE, values)
+
+
+def _compile_bound(bound, names, where):
+    """A fixed int bound, or a compiled expression over earlier operands"""
+    if type(bound) is int:
+        return bound
+    return compile_expression(bound, names, where)
+
+
+class AliasTable:
+    """
+    Vose alias table: picks index i with probability weights[i] / sum(weights)
+    in O(1), with one random() per draw.
+    """
+
+    def __init__(self, weights):
+        n = len(weights)
+        total = float(sum(weights))
+        if n == 0 or total <= 0:
+            raise SpecError("alias table needs a positive total weight")
+        self.size = n
+        self.uniform = len(set(weights)) == 1
+        self.probability = [1.0] * n
+        self.alias = list(range(n))
+        scaled = [w * n / total for w in weights]
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            s, l = small.pop(), large.pop()
+            self.probability[s] = scaled[s]
+            self.alias[s] = l
+            scaled[l] -= 1.0 - scaled[s]
+            (small if scaled[l] < 1.0 else large).append(l)
+        # Whatever is left is 1 up to rounding
+
+    def pick(self, rng, items):
+        """One of items (len == size), by weight"""
+        if self.uniform:
+            return rng.choice(items)
+        # Whole part of u picks the column, the fraction decides column or alias
+        u = rng.random() * self.size
+        i = min(int(u), self.size - 1)
+        return items[i] if u - i < self.probability[i] else items[self.alias[i]]
+
+
+class Variant:
+    """
+    One weighted set of operand ranges within a section.
+
+    draw(rng=random) is generated Python (one rng.randint per operand, bounds inlined),
+    so it runs as fast as a hand-written generator.
+    """
+
+    def __init__(self, name, weight, operands, where, path):
+        if not isinstance(operands, dict) or not operands:
+            raise SpecError(f"{path}: operands must be a table of name = [low, high] or a number")
+        if type(weight) not in (int, float) or weight <= 0:
+            raise SpecError(f"{path}: weight must be a positive number")
+        self.name = name
+        self.weight = weight
+        self.operands = []      # (name, low, high) in draw order; low/high are ints or functions
+        self.ranges = {}        # name -> (low, high) as written, for the docs
+        names = set()
+        lines = ["def draw(rng=random):"]
+        for operand, bounds in operands.items():
+            if not operand.isidentifier() or keyword.iskeyword(operand) or operand in _SCOPE or operand in ('rng', 'random'):
+                raise SpecError(f"{path}.{operand}: not a valid operand name")
+            if type(bounds) is int:
+                low = high = bounds
+            elif isinstance(bounds, list) and len(bounds) == 2:
+                low, high = bounds
+            else:
+                raise SpecError(f"{path}.{operand}: expected [low, high] or a number")
+            self.operands.append((operand,
+                                  _compile_bound(low, names, f"{path}.{operand}"),
+                                  _compile_bound(high, names, f"{path}.{operand}")))
+            self.ranges[operand] = (low, high)
+            if type(bounds) is int:
+                lines.append(f"    {operand} = {bounds}")
+            else:
+                lines.append(f"    {operand} = rng.randint({parse_expression(low, names, path)}, "
+                             f"{parse_expression(high, names, path)})")
+            names.add(operand)
+        lines.append("    return {" + ", ".join(f"{n!r}: {n}" for n in self.ranges) + "}")
+        scope = dict(_SCOPE, random=random)     # draw()'s default rng
+        exec(compile('\n'.join(lines), path, 'exec'), scope)
+        self.draw = scope['draw']
+        if isinstance(where, str):
+            where = [where]
+        self.where_text = list(where)
+        self.where = [compile_expression(w, names, f"{path}.where") for w in self.where_text]
+
+    def enumerate(self, limit, path):
+        """
+        Every operand tuple with its probability under draw(), restricted to
+        the where constraints (renormalized), or None if there are more than limit
+        """
+        fixed = 1
+        for _name, low, high in self.operands:
+            if type(low) is int and type(high) is int:
+                fixed *= max(1, high - low + 1)
+        if fixed > limit:
+            return None
+        found = []
+
+        def walk(i, values, probability):
+            if len(found) > limit:
+                return
+            if i == len(self.operands):
+                if all(check(values) for check in self.where):
+                    found.append((dict(values), probability))
+                return
+            name, low, high = self.operands[i]
+            if type(low) is not int:
+                low = low(values)
+            if type(high) is not int:
+                high = high(values)
+            if high < low:
+                raise SpecError(f"{path}.{name}: empty range {low}..{high} when {values}")
+            share = probability / (high - low + 1)
+            for value in range(low, high + 1):
+                values[name] = value
+                walk(i + 1, values, share)
+            del values[name]
+
+        walk(0, {}, 1.0)
+        if len(found) > limit:
+            return None
+        total = sum(p for _values, p in found)
+        if not found or total <= 0:
+            raise SpecError(f"{path}: the where constraints exclude every question")
+        return [(values, p / total) for values, p in found]
+
+
+class OperandSpace:
+    """
+    Every operand tuple of one variant, by index: values(i) for i in range(size)
+    lists each tuple once.
+
+    Args:
+        outcomes: The tuples as dicts (exhaustive specs), or None to index the
+            variant's ranges directly
+        variant: The Variant, when outcomes is None. Every operand but the last
+            needs fixed bounds; the last one's bounds may use the others.
+    """
+
+    def __init__(self, outcomes=None, variant=None, path=''):
+        self._outcomes = outcomes
+        if outcomes is not None:
+            self.size = len(outcomes)
+            return
+        *prefix, (self._last, low, high) = variant.operands
+        self._prefix = []           # (name, low, count) of the fixed operands, last varies fastest
+        prefixes = 1
+        for name, p_low, p_high in prefix:
+            if type(p_low) is not int or type(p_high) is not int:
+                raise SpecError(f"{path}.{name}: only the last operand's bounds can use other operands")
+            self._prefix.append((name, p_low, max(0, p_high - p_low + 1)))
+            prefixes *= self._prefix[-1][2]
+        self._bounds = (low, high)
+        if type(low) is int and type(high) is int:
+            # Mixed radix over every range
+            self._ends = None
+            self._last_count = max(0, high - low + 1)
+            self.size = prefixes * self._last_count
+            return
+        if prefixes > PREFIX_LIMIT:
+            raise SpecError(f"{path}: more than {PREFIX_LIMIT} prefixes to index")
+        # ends[p]: tuples up to and including prefix p; prefixes with an empty last range add none
+        self._ends = []
+        total = 0
+        for p in range(prefixes):
+            values = self._prefix_values(p)
+            total += max(0, self._bound(high, values) - self._bound(low, values) + 1)
+            self._ends.append(total)
+        self.size = total
+
+    @staticmethod
+    def _bound(bound, values):
+        return bound if type(bound) is int else bound(values)
+
+    def _prefix_values(self, p):
+        values = {}
+        for name, low, count in reversed(self._prefix):
+            p, digit = divmod(p, count)
+            values[name] = low + digit
+        return values
+
+    def values(self, i):
+        """Operand tuple i, as a dict"""
+        if self._outcomes is not None:
+            return self._outcomes[i]
+        low, high = self._bounds
+        if self._ends is None:
+            p, offset = divmod(i, self._last_count)
+            values = self._prefix_values(p)
+        else:
+            p = bisect.bisect_right(self._ends, i)
+            values = self._prefix_values(p)
+            offset = i - (self._ends[p - 1] if p else 0)
+        values[self._last] = self._bound(low, values) + offset
+        return values
+
+
+class Kind:
+    """How a section's operands become a question dict"""
+
+    def __init__(self, operands, render):
+        self.operands = operands    # operand names the spec must declare
+        self.render = render        # function (values, spec) -> question dict
+
+
+def _render_addition(v, spec):
+    a, b = v['a'], v['b']
+    total = a + b
+    text = f"What is {a} + {b}?" if spec.text is None else spec.text.format(**v)
+    question = {'question': text, 'answer': total, 'operands': {'a': a, 'b': b}}
+    if spec.blocks:
+        question['first_number'] = a
+        question['second_number'] = b
+        question['visual'] = {
+            'first': create_blocks(a, sections_per_block=spec.blocks),
+            'second': create_blocks(b, sections_per_block=spec.blocks),
+            'result': create_blocks(total, sections_per_block=spec.blocks)
+        }
+    return question
+
+
+def _render_subtraction(v, spec):
+    a, b = v['a'], v['b']
+    result = a - b
+    text = f"What is {a} - {b}?" if spec.text is None else spec.text.format(**v)
+    question = {'question': text, 'answer': result, 'operands': {'a': a, 'b': b}}
+    if spec.blocks:
+        question['minuend'] = a
+        question['subtrahend'] = b
+        question['visual'] = {
+            'total': create_blocks(a, sections_per_block=spec.blocks),
+            'subtract': create_blocks(b, sections_per_block=spec.blocks),
+            'result': create_blocks(result, sections_per_block=spec.blocks)
+        }
+    return question
+
+
+def _render_multiplication(v, spec):
+    a, b = v['a'], v['b']
+    text = f"What is {a} × {b}?" if spec.text is None else spec.text.format(**v)
+    return {'question': text, 'answer': a * b, 'operands': {'a': a, 'b': b}}
+
+
+def _render_division(v, spec):
+    divisor, quotient, remainder = v['divisor'], v['quotient'], v['remainder']
+    dividend = quotient * divisor + remainder
+    text = (f"What is {dividend} ÷ {divisor}?" if spec.text is None
+            else spec.text.format(dividend=dividend, **v))
+    answer = {'quotient': quotient, 'remainder': remainder}
+    if not spec.visual:
+        return {'question': text, 'answer': answer, 'operands': {'a': dividend, 'b': divisor}}
+    return {
+        'question': text,
+        'dividend': dividend,
+        'divisor': divisor,
+        'quotient': quotient,
+        'remainder': remainder,
+        'answer': answer,
+        'operands': {'a': dividend, 'b': divisor},
+        'visual': {
+            'dividend': dividend,
+            'divisor': divisor,
+            'quotient': quotient,
+            'remainder': remainder
+        }
+    }
+
+
+def _render_fraction_same(v, spec):
+    num1, num2, denominator = v['num1'], v['num2'], v['denominator']
+    text = (f"What is {num1}/{denominator} + {num2}/{denominator}? (Answer in decimal, rounded to 2 places)"
+            if spec.text is None else spec.text.format(**v))
+    return {
+        'question': text,
+        'answer': round((num1 + num2) / denominator, 2),
+        'fraction': f"{num1 + num2}/{denominator}",
+        'fraction_visual': {
+            'numerator1': num1,
+            'numerator2': num2,
+            'denominator': denominator,
+            'same_denominator': True
+        }
+    }
+
+
+def _render_fraction_different(v, spec):
+    num1, denom1, num2, denom2 = v['num1'], v['denom1'], v['num2'], v['denom2']
+    text = (f"What is {num1}/{denom1} + {num2}/{denom2}? (Answer in decimal, rounded to 2 places)"
+            if spec.text is None else spec.text.format(**v))
+    return {
+        'question': text,
+        'answer': round((num1 / denom1) + (num2 / denom2), 2),
+        'fraction': f"{num1}/{denom1} + {num2}/{denom2}",
+        'fraction_visual': {
+            'numerator1': num1,
+            'denominator1': denom1,
+            'numerator2': num2,
+            'denominator2': denom2,
+            'same_denominator': False
+        }
+    }
+
+
+KINDS = {
+    'addition': Kind(('a', 'b'), _render_addition),
+    'subtraction': Kind(('a', 'b'), _render_subtraction),
+    'multiplication': Kind(('a', 'b'), _render_multiplication),
+    'division': Kind(('divisor', 'quotient', 'remainder'), _render_division),
+    'fraction_same': Kind(('denominator', 'num1', 'num2'), _render_fraction_same),
+    'fraction_different': Kind(('denom1', 'denom2', 'num1', 'num2'), _render_fraction_different),
+}
+
+
+class SectionSpec:
+    """
+    One section's compiled sampler.
+
+    Args:
+        grade: Grade number
+        section: Section name
+        table: The section's table from the spec file
+        exhaustive_limit: Most operand tuples enumerated into an exhaustive table
+    """
+
+    def __init__(self, grade, section, table, exhaustive_limit=EXHAUSTIVE_LIMIT):
+        path = f"grade_{grade}.{section}"
+        unknown = set(table) - SECTION_KEYS
+        if unknown:
+            raise SpecError(f"{path}: unknown keys {sorted(unknown)}")
+        kind = KINDS.get(table.get('kind'))
+        if kind is None:
+            raise SpecError(f"{path}: kind must be one of {sorted(KINDS)}")
+        self.grade = grade
+        self.section = section
+        self.kind_name = table['kind']
+        self.kind = kind
+        self.blocks = table.get('blocks', 0)
+        self.visual = table.get('visual', False)
+        self.text = table.get('text')       # None: the kind's default text
+
+        if 'variants' in table:
+            if 'operands' in table or 'where' in table:
+                raise SpecError(f"{path}: put operands and where in each variant")
+            tables = table['variants']
+        else:
+            tables = [{'name': section, 'weight': 1, 'operands': table.get('operands'),
+                       'where': table.get('where', [])}]
+        self.variants = []
+        for i, variant in enumerate(tables):
+            unknown = set(variant) - VARIANT_KEYS
+            if unknown:
+                raise SpecError(f"{path}.variants[{i}]: unknown keys {sorted(unknown)}")
+            name = variant.get('name', str(i))
+            self.variants.append(Variant(name, variant.get('weight', 1), variant.get('operands'),
+                                         variant.get('where', []), f"{path}.{name}"))
+            if set(self.variants[-1].ranges) != set(kind.operands):
+                raise SpecError(f"{path}.{name}: {self.kind_name} needs operands {', '.join(kind.operands)}")
+
+        # Exhaustive table: every operand tuple (in the kind's operand order) with its probability
+        self.outcomes = None
+        self.probabilities = None
+        total_weight = sum(v.weight for v in self.variants)
+        merged = {}
+        for variant in self.variants:
+            found = variant.enumerate(exhaustive_limit, f"{path}.{variant.name}")
+            if found is None:
+                merged = None
+                break
+            for values, p in found:
+                key = tuple(values[name] for name in kind.operands)
+                merged[key] = merged.get(key, 0.0) + p * variant.weight / total_weight
+            if len(merged) > exhaustive_limit:
+                merged = None
+                break
+        if merged is not None:
+            self.outcomes = [dict(zip(kind.operands, key)) for key in merged]
+            self.probabilities = list(merged.values())
+            self._table = AliasTable(self.probabilities)
+        else:
+            if any(v.where for v in self.variants):
+                raise SpecError(f"{path}: where constraints need a space of at most "
+                                f"{exhaustive_limit} questions; express them as operand bounds")
+            self._table = AliasTable([v.weight for v in self.variants]) if len(self.variants) > 1 else None
+            if self._table is None:
+                self.sample = self.variants[0].draw     # skip the variant pick
+
+        # Render once now, so a bad text template fails at startup, not on a request
+        self.generate(random.Random(0))
+
+    @property
+    def exhaustive(self):
+        return self.outcomes is not None
+
+    def sample(self, rng=random):
+        """Operand values of one question"""
+        if self.outcomes is not None:
+            return self._table.pick(rng, self.outcomes)
+        variant = self._table.pick(rng, self.variants) if self._table is not None else self.variants[0]
+        return variant.draw(rng)
+
+    def generate(self, rng=random):
+        """One question dict, in the same shape as the hand-written generators"""
+        return self.kind.render(self.sample(rng), self)
+
+    def operand_spaces(self):
+        """
+        [(weight, OperandSpace)] per variant, for walking every question once.
+        Exhaustive specs index their enumerated tuples (a tuple in two variants
+        belongs to the first); sequential ones index each variant's ranges.
+        """
+        spaces = []
+        if self.outcomes is not None:
+            seen = set()
+            for variant in self.variants:
+                path = f"grade_{self.grade}.{self.section}.{variant.name}"
+                outcomes = []
+                for values, _p in variant.enumerate(EXHAUSTIVE_LIMIT, path):
+                    key = tuple(values[name] for name in self.kind.operands)
+                    if key not in seen:
+                        seen.add(key)
+                        outcomes.append(values)
+                if outcomes:
+                    spaces.append((variant.weight, OperandSpace(outcomes)))
+            return spaces
+        for variant in self.variants:
+            space = OperandSpace(variant=variant, path=f"grade_{self.grade}.{self.section}.{variant.name}")
+            if space.size:
+                spaces.append((variant.weight, space))
+        return spaces
+
+    def distribution(self):
+        """{operand tuple: probability} for exhaustive specs, else None"""
+        if self.outcomes is None:
+            return None
+        return {tuple(v[name] for name in self.kind.operands): p
+                for v, p in zip(self.outcomes, self.probabilities)}
+
+
+def spec_path(grade, spec_dir=SPEC_DIR):
+    return os.path.join(spec_dir, f"grade_{grade}.toml")
+
+
+def load_grade_specs(grade, spec_dir=SPEC_DIR):
+    """{section: SectionSpec} compiled from data/specs/grade_<grade>.toml, in file order"""
+    with open(spec_path(grade, spec_dir), 'rb') as f:
+        try:
+            tables = tomllib.load(f)
+        except tomllib.TOMLDecodeError as e:
+            raise SpecError(f"grade_{grade}.toml: {e}") from None
+    return {section: SectionSpec(grade, section, table) for section, table in tables.items()}
+
+
+def spec_grades(spec_dir=SPEC_DIR):
+    """Grade numbers that have a spec file, sorted"""
+    grades = []
+    for name in os.listdir(spec_dir):
+        stem, ext = os.path.splitext(name)
+        if ext == '.toml' and stem.startswith('grade_') and stem[6:].isdigit():
+            grades.append(int(stem[6:]))
+    return sorted(grades)
+
+
+def _format_range(low, high):
+    low, high = (bound if type(bound) is int or bound.isidentifier() else f"({bound})"
+                 for bound in (low, high))
+    if low == high:
+        return f"{low}"
+    return f"{low}–{high}"
+
+
+def spec_table(spec_dir=SPEC_DIR):
+    """Markdown table of every spec's operand ranges (the generated part of GRADE_NUMBER_LIMITS.md)"""
+    lines = [
+        "| Grade | Section | Variant | Weight | Operands | Constraints | Sampler |",
+        "|-------|---------|---------|--------|----------|-------------|---------|",
+    ]
+    for grade in spec_grades(spec_dir):
+        for section, spec in load_grade_specs(grade, spec_dir).items():
+            total_weight = sum(v.weight for v in spec.variants)
+            sampler = f"exhaustive ({len(spec.outcomes)})" if spec.exhaustive else "sequential"
+            for variant in spec.variants:
+                operands = ', '.join(f"{name} {_format_range(low, high)}"
+                                     for name, (low, high) in variant.ranges.items())
+                lines.append(
+                    f"| {grade} | {section} | {variant.name if len(spec.variants) > 1 else '—'} | "
+                    f"{variant.weight / total_weight:.0%} | {operands} | "
+                    f"{'; '.join(variant.where_text) or '—'} | {sampler} |")
+    return '\n'.join(lines)
+
+
+def write_limits_doc(path=LIMITS_DOC, spec_dir=SPEC_DIR):
+    """Replace the generated table between the markers in GRADE_NUMBER_LIMITS.md"""
+    with open(path, encoding='utf-8') as f:
+        text = f.read()
+    start = text.index(DOC_BEGIN) + len(DOC_BEGIN)
+    end = text.index(DOC_END)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text[:start] + '\n' + spec_table(spec_dir) + '\n' + text[end:])
+
+
+def documented_table(path=LIMITS_DOC):
+    """The generated table as it currently is in GRADE_NUMBER_LIMITS.md"""
+    with open(path, encoding='utf-8') as f:
+        text = f.read()
+    return text[text.index(DOC_BEGIN) + len(DOC_BEGIN):text.index(DOC_END)].strip()
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if '--write' in argv:
+        write_limits_doc()
+        print(f"Updated {os.path.normpath(LIMITS_DOC)}")
+    else:
+        print(spec_table())
+
+
+if __name__ == '__main__':
+    main()
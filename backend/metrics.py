@@ -0,0 +1,183 @@
+"""
+Request metrics in Prometheus text format
+- Counters and histograms record into per-thread shards, so the request path
+  never takes a shared lock; /metrics adds the shards up when it is scraped
+- Shards of threads that have exited are folded into a retired total at scrape
+  time, so thread-per-request servers don't grow the shard list forever
+- Gauges (store size, bank sizes, ...) are read from collector callbacks at
+  scrape time instead of being tracked on the request path
+
+Metrics are per process; with several workers each one reports its own.
+"""
+
+import bisect
+import threading
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Request latency buckets in seconds
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=''):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_number(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter with a fixed set of label names"""
+
+    kind = 'counter'
+
+    def __init__(self, registry, name, documentation, label_names=()):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+
+    def inc(self, *label_values, amount=1):
+        values = self.registry._shard().setdefault(self.name, {})
+        values[label_values] = values.get(label_values, 0) + amount
+
+    def _merge(self, total, shard_values):
+        for labels, value in shard_values.items():
+            total[labels] = total.get(labels, 0) + value
+
+    def _render(self, values):
+        for labels, value in sorted(values.items()):
+            yield f"{self.name}{_format_labels(self.label_names, labels)} {_format_number(value)}"
+
+
+class Histogram:
+    """Histogram with fixed buckets; each label set keeps [bucket counts..., +Inf count, sum]"""
+
+    kind = 'histogram'
+
+    def __init__(self, registry, name, documentation, label_names=(), buckets=LATENCY_BUCKETS):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *label_values):
+        values = self.registry._shard().setdefault(self.name, {})
+        counts = values.get(label_values)
+        if counts is None:
+            counts = values[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        counts[-1] += value
+
+    def _merge(self, total, shard_values):
+        for labels, counts in shard_values.items():
+            merged = total.get(labels)
+            if merged is None:
+                total[labels] = list(counts)
+            else:
+                for i, count in enumerate(counts):
+                    merged[i] += count
+
+    def _render(self, values):
+        for labels, counts in sorted(values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = f'le="{_format_number(float(bound))}"'
+                yield f"{self.name}_bucket{_format_labels(self.label_names, labels, le)} {cumulative}"
+            label_text = _format_labels(self.label_names, labels)
+            yield f"{self.name}_sum{label_text} {_format_number(counts[-1])}"
+            yield f"{self.name}_count{label_text} {cumulative}"
+
+
+class MetricsRegistry:
+    """
+    Holds the metric definitions and the per-thread shards they record into.
+
+    Collectors are callables returning (name, kind, documentation, label_names,
+    [(label_values, value), ...]) tuples, read on every scrape.
+    """
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+        self._local = threading.local()
+        self._shards = []     # (thread, {metric name: {label values: value}})
+        self._retired = {}    # merged values from threads that have exited
+        self._lock = threading.Lock()
+
+    def counter(self, name, documentation, label_names=()):
+        metric = Counter(self, name, documentation, label_names)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, documentation, label_names=(), buckets=LATENCY_BUCKETS):
+        metric = Histogram(self, name, documentation, label_names, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def collector(self, func):
+        """Register a scrape-time collector (usable as a decorator)"""
+        self._collectors.append(func)
+        return func
+
+    def _shard(self):
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            # Only a thread's first recording takes the lock
+            shard = self._local.shard = {}
+            with self._lock:
+                self._shards.append((threading.current_thread(), shard))
+        return shard
+
+    def _collect(self):
+        """Sum every shard into {metric name: {label values: value}}"""
+        by_name = {metric.name: metric for metric in self._metrics}
+        with self._lock:
+            live = []
+            for thread, shard in self._shards:
+                if thread.is_alive():
+                    live.append((thread, shard))
+                else:
+                    for name, values in shard.items():
+                        by_name[name]._merge(self._retired.setdefault(name, {}), values)
+            self._shards = live
+
+            totals = {}
+            for name, values in self._retired.items():
+                by_name[name]._merge(totals.setdefault(name, {}), values)
+            for _thread, shard in live:
+                # dict.copy() is atomic under the GIL, so a thread recording
+                # concurrently can't break the iteration
+                for name, values in shard.copy().items():
+                    by_name[name]._merge(totals.setdefault(name, {}), values.copy())
+        return totals
+
+    def render(self):
+        """All metrics in Prometheus text exposition format"""
+        lines = []
+        totals = self._collect()
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric._render(totals.get(metric.name, {})))
+        for collector in self._collectors:
+            for name, kind, documentation, label_names, samples in collector():
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {kind}")
+                for label_values, value in samples:
+                    lines.append(f"{name}{_format_labels(label_names, label_values)} {_format_number(value)}")
+        return '\n'.join(lines) + '\n'
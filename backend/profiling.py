@@ -0,0 +1,171 @@
+"""
+Opt-in sampled request profiling
+- PROFILE_SAMPLE_RATE picks the fraction of requests to profile (0 = off)
+- PROFILE_MODE=cprofile runs cProfile for sampled requests and merges the
+  results per route; download them as pstats files
+- PROFILE_MODE=sampler records the stacks of threads serving sampled requests
+  every PROFILE_SAMPLE_INTERVAL seconds from a background thread, much cheaper
+  than cProfile; download them as collapsed stacks for flamegraph tools
+- Unsampled requests cost one random() call
+"""
+
+import cProfile
+import marshal
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+
+CPROFILE = 'cprofile'
+SAMPLER = 'sampler'
+
+DEFAULT_SAMPLE_INTERVAL = 0.005
+
+
+class RequestProfiler:
+    """
+    Profiles a random sample of requests and aggregates the results per route.
+
+    Args:
+        sample_rate: Fraction of requests to profile (0.0-1.0)
+        mode: CPROFILE or SAMPLER
+        interval: Seconds between stack samples (SAMPLER mode)
+    """
+
+    def __init__(self, sample_rate, mode=CPROFILE, interval=DEFAULT_SAMPLE_INTERVAL):
+        if mode not in (CPROFILE, SAMPLER):
+            raise ValueError(f"Unknown profiling mode: {mode}")
+        self.sample_rate = sample_rate
+        self.mode = mode
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._reset_process_state()
+
+    def _reset_process_state(self):
+        """(Re)create per-process state; also used after a fork"""
+        self._pid = os.getpid()
+        self._stats = {}       # route -> pstats.Stats (CPROFILE)
+        self._stacks = {}      # route -> {collapsed stack: samples} (SAMPLER)
+        self._requests = {}    # route -> profiled request count
+        self._active = {}      # thread ident -> route being sampled (SAMPLER)
+        self._sampler = None
+
+    def begin(self, route):
+        """Start profiling this request if it is sampled; returns a handle for end(), or None"""
+        if random.random() >= self.sample_rate:
+            return None
+        if self._pid != os.getpid():
+            self._reset_process_state()
+        if self.mode == SAMPLER:
+            self._ensure_sampler()
+            self._active[threading.get_ident()] = route
+            return (route, None)
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Another request on a concurrent thread holds the profiler (Python 3.12+)
+            return None
+        return (route, profile)
+
+    def end(self, handle):
+        """Finish a request started with begin()"""
+        route, profile = handle
+        if profile is None:
+            self._active.pop(threading.get_ident(), None)
+            with self._lock:
+                self._requests[route] = self._requests.get(route, 0) + 1
+            return
+        profile.disable()
+        stats = pstats.Stats(profile)
+        with self._lock:
+            self._requests[route] = self._requests.get(route, 0) + 1
+            if route in self._stats:
+                self._stats[route].add(stats)
+            else:
+                self._stats[route] = stats
+
+    def _ensure_sampler(self):
+        if self._sampler is None:
+            with self._lock:
+                if self._sampler is None:
+                    self._sampler = threading.Thread(target=self._sample_loop,
+                                                     name='request-profiler', daemon=True)
+                    self._sampler.start()
+
+    def _sample_loop(self):
+        while True:
+            time.sleep(self.interval)
+            if not self._active:
+                continue
+            frames = sys._current_frames()
+            samples = []
+            for ident, route in list(self._active.items()):
+                frame = frames.get(ident)
+                if frame is not None:
+                    samples.append((route, _collapse(frame)))
+            with self._lock:
+                for route, stack in samples:
+                    stacks = self._stacks.setdefault(route, {})
+                    stacks[stack] = stacks.get(stack, 0) + 1
+
+    def summary(self):
+        """Profiled request counts per route"""
+        with self._lock:
+            return {'mode': self.mode, 'sample_rate': self.sample_rate, 'routes': dict(self._requests)}
+
+    def pstats_bytes(self, route=None):
+        """Merged cProfile stats (all routes, or one) in the pstats file format, or None"""
+        with self._lock:
+            selected = [stats for name, stats in self._stats.items() if route in (None, name)]
+            if not selected:
+                return None
+            merged = {}
+            for stats in selected:
+                # pstats entries are (primitive calls, calls, total time, cumulative time, callers)
+                for func, entry in stats.stats.items():
+                    merged[func] = pstats.add_func_stats(merged[func], entry) if func in merged else entry
+            return marshal.dumps(merged)
+
+    def collapsed(self, route=None):
+        """Sampled stacks as collapsed-stack text (route as the root frame), or None"""
+        with self._lock:
+            lines = [f"{name};{stack} {count}"
+                     for name, stacks in sorted(self._stacks.items()) if route in (None, name)
+                     for stack, count in sorted(stacks.items())]
+        return '\n'.join(lines) + '\n' if lines else None
+
+    def reset(self):
+        with self._lock:
+            self._stats = {}
+            self._stacks = {}
+            self._requests = {}
+
+
+def _collapse(frame):
+    """'outer;...;inner' for a thread's current stack"""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+def create_profiler():
+    """
+    Build the request profiler from environment settings, or None when profiling is off:
+        PROFILE_SAMPLE_RATE      fraction of requests to profile (default 0 = off)
+        PROFILE_MODE             cprofile (default) or sampler
+        PROFILE_SAMPLE_INTERVAL  seconds between stack samples in sampler mode (default 0.005)
+    """
+    sample_rate = float(os.environ.get('PROFILE_SAMPLE_RATE', 0))
+    if sample_rate <= 0:
+        return None
+    return RequestProfiler(
+        sample_rate=min(sample_rate, 1.0),
+        mode=os.environ.get('PROFILE_MODE', CPROFILE).lower(),
+        interval=float(os.environ.get('PROFILE_SAMPLE_INTERVAL', DEFAULT_SAMPLE_INTERVAL)),
+    )
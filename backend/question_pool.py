@@ -0,0 +1,144 @@
+"""
+Pre-generated question pools
+- One ring buffer of ready questions per (grade, section) key
+- Requests pop from the buffer; a background thread refills any buffer that
+  drops below its low-water mark, so generation stays off the request thread
+- Keeps hit/miss counters and measures refill lag (time from a buffer dropping
+  below the low-water mark until it is full again)
+"""
+
+import os
+import threading
+import time
+from collections import deque
+
+DEFAULT_POOL_SIZE = 32
+DEFAULT_LOW_WATER = 8
+DEFAULT_MAX_KEYS = 128
+
+
+class QuestionPool:
+    """
+    Pools of pre-generated questions.
+
+    Args:
+        build: Function (section, grade) -> question dict, called by the refill thread
+        size: Questions kept ready per key (0 disables pooling)
+        low_water: Refill a buffer once it holds fewer questions than this
+        max_keys: Most (grade, section) pools; keys registered past this aren't pooled
+    """
+
+    def __init__(self, build, size=DEFAULT_POOL_SIZE, low_water=DEFAULT_LOW_WATER, max_keys=DEFAULT_MAX_KEYS):
+        self._build = build
+        self.size = size
+        self.low_water = min(low_water, size)
+        self.max_keys = max_keys
+        self._buffers = {}          # (grade, section) -> deque of questions
+        self._low_since = {}        # (grade, section) -> time it dropped below low water
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._thread_lock = threading.Lock()
+        self._pid = os.getpid()
+        self.hits = 0
+        self.misses = 0
+        self.generated = 0
+        self.refills = 0
+        self.refill_lag_total = 0.0
+        self.refill_lag_max = 0.0
+
+    @property
+    def enabled(self):
+        return self.size > 0
+
+    def register(self, grade, section):
+        """Keep a pool for this (grade, section) (unless max_keys are kept); it fills once the refill thread runs"""
+        key = (grade, section)
+        if self.enabled and (key in self._buffers or len(self._buffers) < self.max_keys):
+            self._buffers.setdefault(key, deque(maxlen=self.size))
+            self._low_since.setdefault(key, time.monotonic())
+
+    def take(self, section, grade):
+        """
+        Pop a ready question, or return None when the pool for this key is
+        empty or doesn't exist (the caller then generates inline).
+        """
+        buffer = self._buffers.get((grade, section))
+        if buffer is None:
+            return None
+        self._ensure_thread()
+        try:
+            question = buffer.popleft()
+        except IndexError:
+            question = None
+        if question is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        if len(buffer) < self.low_water:
+            self._low_since.setdefault((grade, section), time.monotonic())
+            self._wakeup.set()
+        return question
+
+    def _ensure_thread(self):
+        if self._pid != os.getpid():
+            # Threads don't survive a fork (e.g. gunicorn --preload); start one per process
+            self._pid = os.getpid()
+            self._thread = None
+        if self._thread is None:
+            with self._thread_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._refill_loop,
+                                                    name='question-pool-refill', daemon=True)
+                    self._thread.start()
+
+    def _refill_loop(self):
+        while True:
+            self._wakeup.wait()
+            self._wakeup.clear()
+            for key, since in list(self._low_since.items()):
+                buffer = self._buffers[key]
+                grade, section = key
+                try:
+                    while len(buffer) < self.size:
+                        buffer.append(self._build(section, grade))
+                        self.generated += 1
+                except Exception as e:
+                    print(f"Error refilling question pool {grade}:{section}: {e}")
+                del self._low_since[key]
+                lag = time.monotonic() - since
+                self.refills += 1
+                self.refill_lag_total += lag
+                self.refill_lag_max = max(self.refill_lag_max, lag)
+
+    def start(self):
+        """Fill every registered pool in the background"""
+        if self.enabled:
+            self._ensure_thread()
+            self._wakeup.set()
+
+    def stats(self):
+        """Hit rate, refill lag and current fill level per key"""
+        lookups = self.hits + self.misses
+        return {
+            'size': self.size,
+            'low_water': self.low_water,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'generated': self.generated,
+            'refills': self.refills,
+            'refill_lag_avg': self.refill_lag_total / self.refills if self.refills else 0.0,
+            'refill_lag_max': self.refill_lag_max,
+            'levels': {f"{grade}:{section}": len(buffer)
+                       for (grade, section), buffer in self._buffers.items()},
+        }
+
+
+def create_question_pool(build):
+    """Build the question pool from environment settings (QUESTION_POOL_SIZE=0 disables it)"""
+    return QuestionPool(
+        build,
+        size=int(os.environ.get('QUESTION_POOL_SIZE', DEFAULT_POOL_SIZE)),
+        low_water=int(os.environ.get('QUESTION_POOL_LOW_WATER', DEFAULT_LOW_WATER)),
+        max_keys=int(os.environ.get('QUESTION_POOL_MAX_KEYS', DEFAULT_MAX_KEYS)),
+    )
@@ -0,0 +1,166 @@
+"""
+No-repeat question sampling per quiz session
+- A section's questions are the operand tuples of its compiled spec, listed by
+  index per variant (SectionSpec.operand_spaces)
+- Question `index` of a session is position `index` of a keyed pseudo-random
+  permutation of those tuples (a Feistel network), so questions don't repeat
+  until the tuples are used up, then a new permutation starts. It is a pure
+  function of (session, index): any worker gives the same question, and the
+  client only keeps its next index
+- Variant weights (e.g. Grade 1 addition's 70/30 easy/hard) are kept by
+  stratifying: indices come in blocks in which each variant gets its share of
+  slots, in a keyed shuffled order, and each variant walks its own permutation
+"""
+
+import hashlib
+import math
+import os
+import random
+import threading
+
+FEISTEL_ROUNDS = 6
+
+# Slots per block when stratifying by variant weight (before reducing, e.g. 70/30 -> 7/3)
+STRATA_SLOTS = 100
+
+_MASK64 = (1 << 64) - 1
+
+
+class FeistelPermutation:
+    """
+    Keyed pseudo-random permutation of range(size), in O(1) memory.
+
+    A balanced Feistel network permutes the smallest even-bit-width domain
+    that holds size; values that land outside range(size) are encrypted again
+    (cycle walking) until they fall inside, which takes under 4 steps on average.
+    """
+
+    def __init__(self, size, key):
+        self.size = size
+        self.half_bits = max(1, ((size - 1).bit_length() + 1) // 2)
+        self.half_mask = (1 << self.half_bits) - 1
+        digest = hashlib.blake2b(key.encode(), digest_size=8 * FEISTEL_ROUNDS).digest()
+        self.round_keys = [int.from_bytes(digest[i:i + 8], 'little') for i in range(0, len(digest), 8)]
+
+    def _round(self, value, round_key):
+        # Two multiply-xorshift steps; the top bits depend on every input bit
+        value = ((value ^ round_key) * 0x9E3779B97F4A7C15) & _MASK64
+        value ^= value >> 32
+        value = (value * 0xBF58476D1CE4E5B9) & _MASK64
+        return value >> (64 - self.half_bits)
+
+    def _encrypt(self, value):
+        left, right = value >> self.half_bits, value & self.half_mask
+        for round_key in self.round_keys:
+            left, right = right, left ^ self._round(right, round_key)
+        return (left << self.half_bits) | right
+
+    def __call__(self, position):
+        value = self._encrypt(position)
+        while value >= self.size:
+            value = self._encrypt(value)
+        return value
+
+
+def strata_slots(weights, slots=STRATA_SLOTS):
+    """
+    Whole slots per block for each weight (largest remainder, at least 1 each),
+    reduced by their common divisor: [70, 30] -> [7, 3]
+    """
+    total = float(sum(weights))
+    exact = [w * slots / total for w in weights]
+    counts = [max(1, int(e)) for e in exact]
+    by_remainder = sorted(range(len(weights)), key=lambda i: exact[i] - int(exact[i]), reverse=True)
+    for i in by_remainder[:max(0, slots - sum(counts))]:
+        counts[i] += 1
+    divisor = 0
+    for count in counts:
+        divisor = math.gcd(divisor, count)
+    return [count // divisor for count in counts]
+
+
+class SectionWalk:
+    """
+    The permuted order of one (grade, section)'s questions.
+
+    Args:
+        spaces: [(weight, OperandSpace)] from SectionSpec.operand_spaces()
+    """
+
+    def __init__(self, spaces):
+        self.spaces = [space for _weight, space in spaces]
+        self.counts = strata_slots([weight for weight, _space in spaces])
+        self.block = sum(self.counts)
+        # slot -> variant, before each block shuffles it
+        self.slot_variant = [v for v, count in enumerate(self.counts) for _ in range(count)]
+
+    def locate(self, key, index):
+        """(variant, position in the variant's walk) of question `index`"""
+        if len(self.spaces) == 1:
+            return 0, index
+        block, slot = divmod(index, self.block)
+        order = list(self.slot_variant)
+        random.Random(f"{key}:block:{block}").shuffle(order)
+        variant = order[slot]
+        return variant, block * self.counts[variant] + order[:slot].count(variant)
+
+    def values(self, key, index):
+        """Operand values of question `index` of the walk keyed by `key`"""
+        variant, position = self.locate(key, index)
+        space = self.spaces[variant]
+        cycle, position = divmod(position, space.size)
+        permutation = FeistelPermutation(space.size, f"{key}:{variant}:{cycle}")
+        return space.values(permutation(position))
+
+
+class NoRepeatSampler:
+    """
+    Stateless no-repeat draws per (session, grade, section).
+
+    Args:
+        spec_for: Function (grade, section) -> SectionSpec or None
+        build: Function (section, grade, rng, generator) -> question dict; called
+            with a generator that renders the chosen operands, and an rng seeded
+            from the session and index for the rest (e.g. the word problem template)
+        secret: Mixed into every permutation key, so sessions' questions can't be predicted
+    """
+
+    def __init__(self, spec_for, build, secret=''):
+        self._spec_for = spec_for
+        self._build = build
+        self._secret = secret
+        self._walks = {}        # (grade, section) -> SectionWalk, or None if it has no spec
+        self._lock = threading.Lock()
+        self.draws = 0
+
+    def walk(self, grade, section):
+        """The (grade, section)'s SectionWalk, built on first use; None without a spec"""
+        key = (grade, section)
+        if key not in self._walks:
+            with self._lock:
+                if key not in self._walks:
+                    spec = self._spec_for(grade, section)
+                    self._walks[key] = SectionWalk(spec.operand_spaces()) if spec is not None else None
+        return self._walks[key]
+
+    def draw(self, session, section, grade, index):
+        """Question `index` of the session for (grade, section), or None if the section has no spec"""
+        walk = self.walk(grade, section)
+        if walk is None:
+            return None
+        spec = self._spec_for(grade, section)
+        key = f"{self._secret}:{session}:{grade}:{section}"
+        values = walk.values(key, index)
+        self.draws += 1
+        return self._build(section, grade, rng=random.Random(f"{key}:{index}"),
+                           generator=lambda rng: spec.kind.render(values, spec))
+
+
+def create_sampler(spec_for, build, secret=''):
+    """
+    Build the no-repeat sampler from environment settings, or None if it is off:
+        NO_REPEAT_SESSIONS  1 (default) to walk each session through every question once, 0 = off
+    """
+    if os.environ.get('NO_REPEAT_SESSIONS', '1') == '0':
+        return None
+    return NoRepeatSampler(spec_for, build, secret)
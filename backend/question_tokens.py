@@ -0,0 +1,96 @@
+"""
+Stateless signed question tokens
+- The answer and an expiry time are packed into a compact, HMAC-SHA256 signed token
+- Any worker that knows the secret key can check an answer without a server-side lookup
+- Token format: base64url(JSON payload) + '.' + base64url(truncated signature)
+"""
+
+import base64
+import hashlib
+import hmac
+import json
+import os
+import time
+
+from answer_store import FOUND, EXPIRED, DEFAULT_TTL
+
+# Verification status for tokens that are malformed or carry a bad signature
+INVALID = 'invalid'
+
+# 128 bits of signature is plenty for short-lived quiz answers
+SIGNATURE_BYTES = 16
+
+
+def _b64encode(raw):
+    return base64.urlsafe_b64encode(raw).rstrip(b'=').decode('ascii')
+
+
+def _b64decode(text):
+    return base64.urlsafe_b64decode(text + '=' * (-len(text) % 4))
+
+
+class TokenSigner:
+    """
+    Signs answers into tokens and verifies them.
+
+    Args:
+        secret: Secret key shared by every worker (str or bytes)
+        ttl: Seconds a token stays valid after it was issued
+        clock: Wall-clock time source, in seconds (tokens cross machines, so not monotonic)
+    """
+
+    def __init__(self, secret, ttl=DEFAULT_TTL, clock=time.time):
+        if isinstance(secret, str):
+            secret = secret.encode('utf-8')
+        self._secret = secret
+        self.ttl = ttl
+        self._clock = clock
+
+    def _signature(self, payload):
+        return hmac.new(self._secret, payload, hashlib.sha256).digest()[:SIGNATURE_BYTES]
+
+    def sign(self, answer):
+        """Return a token carrying the answer (int, float, list or dict) and its expiry"""
+        body = {'a': answer, 'e': int(self._clock() + self.ttl)}
+        payload = _b64encode(json.dumps(body, separators=(',', ':')).encode('utf-8')).encode('ascii')
+        return payload.decode('ascii') + '.' + _b64encode(self._signature(payload))
+
+    def verify(self, token):
+        """
+        Check a token's signature and expiry.
+
+        Returns:
+            (status, answer) where status is FOUND, EXPIRED or INVALID
+            and answer is None unless status is FOUND
+        """
+        if not isinstance(token, str) or token.count('.') != 1:
+            return INVALID, None
+        payload, signature = token.split('.')
+        try:
+            payload_bytes = payload.encode('ascii')
+            signature_bytes = _b64decode(signature)
+        except (UnicodeEncodeError, ValueError):
+            return INVALID, None
+        if not hmac.compare_digest(self._signature(payload_bytes), signature_bytes):
+            return INVALID, None
+
+        # The signature matched, so the payload is ours and safe to decode
+        body = json.loads(_b64decode(payload))
+        if body['e'] <= self._clock():
+            return EXPIRED, None
+        return FOUND, body['a']
+
+
+def create_token_signer():
+    """
+    Build the token signer from environment settings.
+
+    Returns None unless ANSWER_MODE=token. Every worker must share SECRET_KEY,
+    so token mode refuses to start without one.
+    """
+    if os.environ.get('ANSWER_MODE', 'store') != 'token':
+        return None
+    secret = os.environ.get('SECRET_KEY')
+    if not secret:
+        raise RuntimeError("ANSWER_MODE=token requires SECRET_KEY to be set")
+    return TokenSigner(secret, ttl=int(os.environ.get('ANSWER_TOKEN_TTL', DEFAULT_TTL)))
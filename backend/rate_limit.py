@@ -0,0 +1,185 @@
+"""
+Per-client rate limiting and load shedding
+- RateLimiter: a token bucket per (route, client), kept as a single float per
+  key (the GCRA "theoretical arrival time": when the bucket will be full
+  again). Keys whose bucket has refilled carry no information and are swept
+  from the old end of an LRU dict; the dict is also capped in size.
+  Rejected requests get 429 with the seconds until the next token.
+- LoadShedder: rejects requests with 503 while too many are in flight in this
+  process, or while an overload check (e.g. answer store nearly full) fails.
+  Checks run at most once per check_interval, not on every request.
+"""
+
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_MAX_CLIENTS = 10000
+DEFAULT_CHECK_INTERVAL = 1.0
+
+# How many refilled buckets a single acquire() may sweep from the old end
+SWEEP_LIMIT = 8
+
+
+def parse_rules(spec):
+    """
+    Rules from a spec like "get_question=5:20,check_answer=10:30"
+    (route=requests per second:burst) -> {route: (rate, burst)}
+    """
+    rules = {}
+    for item in spec.split(','):
+        item = item.strip()
+        if not item:
+            continue
+        route, _, limit = item.partition('=')
+        rate, _, burst = limit.partition(':')
+        rate = float(rate)
+        burst = int(burst) if burst else max(1, math.ceil(rate))
+        if rate <= 0 or burst < 1:
+            raise ValueError(f"Invalid rate limit: {item}")
+        rules[route.strip()] = (rate, burst)
+    return rules
+
+
+class RateLimiter:
+    """
+    Token buckets per (route, client).
+
+    Args:
+        rules: {route: (rate, burst)}; rate is tokens per second, burst the
+            bucket size. Routes without a rule are not limited.
+        max_clients: Most buckets kept; the least recently used go first
+        clock: Time source, in seconds (monotonic by default)
+    """
+
+    def __init__(self, rules, max_clients=DEFAULT_MAX_CLIENTS, clock=time.monotonic):
+        # route -> (seconds per token, seconds for a full burst)
+        self._rules = {route: (1.0 / rate, burst / rate) for route, (rate, burst) in rules.items()}
+        self.max_clients = max_clients
+        self._clock = clock
+        self._full_at = OrderedDict()   # (route, client) -> time the bucket is full again
+        self._lock = threading.Lock()
+        self.allowed = 0
+        self.limited = 0
+
+    def limits(self, route):
+        return route in self._rules
+
+    def acquire(self, route, client):
+        """Take a token; returns 0 if allowed, else the seconds to wait before retrying"""
+        rule = self._rules.get(route)
+        if rule is None:
+            return 0
+        interval, window = rule
+        key = (route, client)
+        now = self._clock()
+        with self._lock:
+            full_at = max(self._full_at.get(key, now), now) + interval
+            wait = full_at - now - window
+            if wait > 0:
+                self.limited += 1
+                return wait
+            self._full_at[key] = full_at
+            self._full_at.move_to_end(key)
+            self.allowed += 1
+            self._sweep(now)
+        return 0
+
+    def _sweep(self, now):
+        """Drop refilled buckets from the old end and enforce max_clients; the caller holds the lock"""
+        full_at = self._full_at
+        for _ in range(SWEEP_LIMIT):
+            oldest, when = next(iter(full_at.items()))
+            if when > now:
+                break
+            del full_at[oldest]
+        while len(full_at) > self.max_clients:
+            full_at.popitem(last=False)
+
+    def __len__(self):
+        return len(self._full_at)
+
+
+class LoadShedder:
+    """
+    Admission control for one process.
+
+    Args:
+        max_in_flight: Most requests handled at once (0 = no limit)
+        checks: Functions returning True while the server is overloaded
+        check_interval: Seconds a check result is reused, and the Retry-After
+            sent when a check fails
+        clock: Time source, in seconds (monotonic by default)
+    """
+
+    def __init__(self, max_in_flight=0, checks=(), check_interval=DEFAULT_CHECK_INTERVAL,
+                 clock=time.monotonic):
+        self.max_in_flight = max_in_flight
+        self.check_interval = check_interval
+        self._checks = list(checks)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.shed = 0
+        self._overloaded = False
+        self._checked_at = None
+
+    def overloaded(self):
+        """Result of the overload checks, re-run once check_interval has passed"""
+        now = self._clock()
+        if self._checked_at is None or now - self._checked_at >= self.check_interval:
+            self._checked_at = now
+            self._overloaded = any(check() for check in self._checks)
+        return self._overloaded
+
+    def enter(self, run_checks=True):
+        """
+        Admit a request; returns 0 if admitted (call leave() when it is done),
+        else the seconds the client should wait
+        """
+        if run_checks and self._checks and self.overloaded():
+            self.shed += 1
+            return self.check_interval
+        with self._lock:
+            if self.max_in_flight and self.in_flight >= self.max_in_flight:
+                self.shed += 1
+                return 1
+            self.in_flight += 1
+        return 0
+
+    def leave(self):
+        with self._lock:
+            self.in_flight -= 1
+
+
+def retry_after(seconds):
+    """Retry-After header value (whole seconds, at least 1)"""
+    return str(max(1, math.ceil(seconds)))
+
+
+def create_rate_limiter():
+    """
+    Build the rate limiter from environment settings, or None when disabled:
+        RATE_LIMITS             per-route buckets, e.g. "get_question=5:20" (route=per second:burst)
+        RATE_LIMIT_MAX_CLIENTS  most (route, client) buckets kept (default 10000)
+    """
+    spec = os.environ.get('RATE_LIMITS', '')
+    rules = parse_rules(spec)
+    if not rules:
+        return None
+    return RateLimiter(rules, max_clients=int(os.environ.get('RATE_LIMIT_MAX_CLIENTS', DEFAULT_MAX_CLIENTS)))
+
+
+def create_load_shedder(checks=()):
+    """
+    Build the load shedder from environment settings:
+        MAX_IN_FLIGHT         most requests handled at once per process (default 0 = no limit)
+        SHED_CHECK_INTERVAL   seconds between overload checks (default 1)
+    """
+    return LoadShedder(
+        max_in_flight=int(os.environ.get('MAX_IN_FLIGHT', 0)),
+        checks=checks,
+        check_interval=float(os.environ.get('SHED_CHECK_INTERVAL', DEFAULT_CHECK_INTERVAL)),
+    )
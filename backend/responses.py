@@ -0,0 +1,69 @@
+"""
+Question response schemas and fast JSON responses
+- Each (grade, section) declares the generator fields it sends to the client;
+  the declarations are resolved once into a flat table, so shaping a response
+  is one lookup plus a projection of those fields
+- Nested payloads (chart data, visual blocks, fraction visuals) are passed
+  through by reference, never copied
+- Responses are encoded with orjson when it is installed, else the stdlib json
+"""
+
+import json
+
+from flask import Response
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+JSON_BACKEND = 'orjson' if orjson is not None else 'json'
+
+
+def dumps(obj):
+    """obj as compact UTF-8 JSON bytes"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def json_response(obj, status=200):
+    """A JSON Response, encoded with the fastest available backend"""
+    return Response(dumps(obj), status=status, mimetype='application/json')
+
+
+class ResponseSchemas:
+    """
+    Response fields per (grade, section).
+
+    Args:
+        base: Fields every response has
+        declared: {(grade, section): extra fields}; grade None applies to every
+            grade that has no entry of its own
+        optional: Fields sent only when the question has them (e.g. token)
+        grades: Grade numbers to resolve the declarations for
+    """
+
+    def __init__(self, base, declared, optional=(), grades=()):
+        self.base = tuple(base)
+        self.optional = tuple(optional)
+        self._default = self.base
+        self._table = {}
+        sections = {section for _grade, section in declared}
+        for section in sections:
+            shared = declared.get((None, section), ())
+            for grade in grades:
+                self._table[(grade, section)] = self.base + tuple(declared.get((grade, section), shared))
+
+    def fields(self, grade, section):
+        """Fields sent for (grade, section), besides the optional ones"""
+        return self._table.get((grade, section), self._default)
+
+    def project(self, q, grade, section):
+        """The response dict for question q: its schema fields plus the optional ones it has"""
+        fields = self.fields(grade, section)
+        resp = dict(zip(fields, map(q.get, fields)))
+        for field in self.optional:
+            if field in q:
+                resp[field] = q[field]
+        return resp
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Production launcher
+- Runs the app under gunicorn's pre-fork server, either as WSGI (sync or
+  threaded workers) or as ASGI through uvicorn workers (SERVER_MODE=asgi)
+- The app is imported once in the master before forking (preload), so the
+  chart bank, word problem templates and static assets are parsed once and
+  shared copy-on-write by every worker
+- Graceful reload: `kill -HUP <master pid>` starts fresh workers and lets the
+  old ones finish their in-flight requests (up to SERVER_GRACEFUL_TIMEOUT).
+  Because the app is preloaded, code changes need a full restart
+
+Settings (environment):
+    PORT                     port to bind (default 5000)
+    SERVER_MODE              wsgi (default) or asgi
+    WEB_CONCURRENCY          worker processes (default 2 x CPU cores + 1, at most 4)
+    SERVER_THREADS           threads per WSGI worker (default 4; 1 = sync workers)
+    SERVER_KEEPALIVE         seconds to keep idle connections open (default 5)
+    SERVER_TIMEOUT           seconds before a stuck worker is restarted (default 30)
+    SERVER_GRACEFUL_TIMEOUT  seconds workers get to finish on reload/shutdown (default 30)
+    SERVER_MAX_REQUESTS      restart a worker after this many requests (default 0 = never)
+
+Usage:
+    python serve.py
+    SERVER_MODE=asgi WEB_CONCURRENCY=4 python serve.py
+
+gunicorn does not run on Windows; there the launcher falls back to Flask's
+threaded development server.
+"""
+
+import gc
+import os
+
+DEFAULT_THREADS = 4
+
+# Default worker cap: each worker holds its own copy of the answer store, pools
+# and caches, and container hosts often report the host's cores, not the quota
+MAX_DEFAULT_WORKERS = 4
+DEFAULT_KEEPALIVE = 5
+DEFAULT_TIMEOUT = 30
+DEFAULT_GRACEFUL_TIMEOUT = 30
+
+# uvicorn's gunicorn worker moved to the uvicorn-worker package; use it if installed
+ASGI_WORKER_CLASSES = ('uvicorn_worker.UvicornWorker', 'uvicorn.workers.UvicornWorker')
+
+
+def create_asgi_app(wsgi_app):
+    """Wrap the Flask app for ASGI servers"""
+    from asgiref.wsgi import WsgiToAsgi
+    return WsgiToAsgi(wsgi_app)
+
+
+def asgi_worker_class():
+    """Dotted path of the first available uvicorn gunicorn worker"""
+    import importlib
+    for path in ASGI_WORKER_CLASSES:
+        module = path.rsplit('.', 1)[0]
+        try:
+            importlib.import_module(module)
+        except ImportError:
+            continue
+        return path
+    raise SystemExit("SERVER_MODE=asgi requires uvicorn and asgiref (pip install uvicorn asgiref)")
+
+
+def server_options():
+    """gunicorn settings from the environment"""
+    mode = os.environ.get('SERVER_MODE', 'wsgi').lower()
+    if mode not in ('wsgi', 'asgi'):
+        raise SystemExit(f"SERVER_MODE must be wsgi or asgi, not {mode!r}")
+    workers = (int(os.environ.get('WEB_CONCURRENCY', 0))
+               or min((os.cpu_count() or 1) * 2 + 1, MAX_DEFAULT_WORKERS))
+    threads = int(os.environ.get('SERVER_THREADS', DEFAULT_THREADS))
+
+    options = {
+        'bind': f"0.0.0.0:{int(os.environ.get('PORT', 5000))}",
+        'workers': workers,
+        'preload_app': True,
+        'keepalive': int(os.environ.get('SERVER_KEEPALIVE', DEFAULT_KEEPALIVE)),
+        'timeout': int(os.environ.get('SERVER_TIMEOUT', DEFAULT_TIMEOUT)),
+        'graceful_timeout': int(os.environ.get('SERVER_GRACEFUL_TIMEOUT', DEFAULT_GRACEFUL_TIMEOUT)),
+        'max_requests': int(os.environ.get('SERVER_MAX_REQUESTS', 0)),
+        'accesslog': '-',
+        'errorlog': '-',
+        'when_ready': _when_ready,
+    }
+    if options['max_requests']:
+        # Stagger restarts so workers don't all recycle at once
+        options['max_requests_jitter'] = max(1, options['max_requests'] // 10)
+
+    if mode == 'asgi':
+        options['worker_class'] = asgi_worker_class()
+    elif threads > 1:
+        options['worker_class'] = 'gthread'
+        options['threads'] = threads
+    else:
+        options['worker_class'] = 'sync'
+    return mode, options
+
+
+def _when_ready(server):
+    # Everything loaded so far lives for the whole process; moving it out of
+    # the collector's generations stops gc passes in the workers from touching
+    # (and so copying) the shared pages
+    gc.freeze()
+    server.log.info("Preloaded app; %d objects frozen before fork", gc.get_freeze_count())
+
+
+def run_gunicorn(application, options):
+    from gunicorn.app.base import BaseApplication
+
+    class QuizServer(BaseApplication):
+        def load_config(self):
+            for key, value in options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return application
+
+    QuizServer().run()
+
+
+def main():
+    mode, options = server_options()
+    if options['workers'] > 1 and os.environ.get('ANSWER_MODE', 'store').lower() != 'token':
+        # Each worker would otherwise keep its own in-memory answers, and an
+        # answer could be checked by a worker that never saw the question
+        os.environ.setdefault('ANSWER_STORE', 'sqlite')
+    from app import app
+    import grades
+    # Import every grade module in the master so workers share them instead of
+    # each importing them on first use
+    grades.load_all()
+
+    try:
+        import gunicorn  # noqa: F401
+    except ImportError:
+        print("gunicorn is not available on this platform; using Flask's threaded server")
+        app.run(host='0.0.0.0', port=int(os.environ.get('PORT', 5000)), threaded=True)
+        return
+
+    application = create_asgi_app(app) if mode == 'asgi' else app
+    print(f"Starting {options['workers']} {mode} workers ({options['worker_class']}) on {options['bind']}")
+    run_gunicorn(application, options)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,294 @@
+"""
+Quiz session history in SQLite
+- Every saved session is appended to the sessions table once (saving the same
+  session id again for the same user is a no-op)
+- Running totals per (user, grade, section) are updated in the same
+  transaction as the insert, so progress summaries read a handful of rows
+  instead of scanning every session
+- History is read a page at a time, newest first, with the last row id as the
+  cursor for the next page
+- Each user's history is guarded by a random history key, handed out once when
+  the user first saves (claim) and required for every later read or write;
+  only its SHA-256 is stored
+"""
+
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import sqlite3
+import threading
+from datetime import datetime, timezone
+
+DEFAULT_PATH = os.path.join(os.path.dirname(__file__), 'sessions.sqlite3')
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+# Longest gap between two answers counted as time spent on a question (longer is a break)
+MAX_QUESTION_SECONDS = 600
+
+# Points one answer can count for; client values are clamped into 0..MAX_QUESTION_POINTS
+# so totals stay far inside SQLite's 64-bit integers
+MAX_QUESTION_POINTS = 1000
+
+_SQL_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS sessions ("
+    " id INTEGER PRIMARY KEY,"
+    " session_id TEXT NOT NULL,"
+    " user TEXT NOT NULL,"
+    " grade INTEGER NOT NULL,"
+    " section TEXT NOT NULL,"
+    " started_at REAL,"
+    " ended_at REAL,"
+    " questions INTEGER NOT NULL,"
+    " correct INTEGER NOT NULL,"
+    " score INTEGER NOT NULL,"
+    " detail TEXT NOT NULL,"
+    " UNIQUE (user, session_id)"
+    ")",
+    "CREATE INDEX IF NOT EXISTS sessions_user ON sessions (user, id)",
+    "CREATE TABLE IF NOT EXISTS users ("
+    " user TEXT PRIMARY KEY,"
+    " key_hash TEXT NOT NULL"
+    ") WITHOUT ROWID",
+    "CREATE TABLE IF NOT EXISTS progress ("
+    " user TEXT NOT NULL,"
+    " grade INTEGER NOT NULL,"
+    " section TEXT NOT NULL,"
+    " sessions INTEGER NOT NULL,"
+    " questions INTEGER NOT NULL,"
+    " correct INTEGER NOT NULL,"
+    " score INTEGER NOT NULL,"
+    " timed_questions INTEGER NOT NULL,"
+    " seconds REAL NOT NULL,"
+    " PRIMARY KEY (user, grade, section)"
+    ") WITHOUT ROWID",
+)
+_SQL_INSERT_SESSION = (
+    "INSERT INTO sessions (session_id, user, grade, section, started_at, ended_at,"
+    " questions, correct, score, detail) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+    " ON CONFLICT (user, session_id) DO NOTHING"
+)
+_SQL_UPDATE_PROGRESS = (
+    "INSERT INTO progress (user, grade, section, sessions, questions, correct, score,"
+    " timed_questions, seconds) VALUES (?, ?, ?, 1, ?, ?, ?, ?, ?)"
+    " ON CONFLICT (user, grade, section) DO UPDATE SET"
+    " sessions = sessions + 1, questions = questions + excluded.questions,"
+    " correct = correct + excluded.correct, score = score + excluded.score,"
+    " timed_questions = timed_questions + excluded.timed_questions,"
+    " seconds = seconds + excluded.seconds"
+)
+# Files from before session ids were unique per user, not globally
+_SQL_OLD_SESSIONS = "SELECT 1 FROM sqlite_master WHERE name = 'sessions' AND sql LIKE '%session_id TEXT NOT NULL UNIQUE%'"
+_SQL_MIGRATE_SESSIONS = (
+    "ALTER TABLE sessions RENAME TO sessions_old",
+    "DROP INDEX IF EXISTS sessions_user",
+)
+_SQL_COPY_OLD_SESSIONS = ("INSERT INTO sessions SELECT * FROM sessions_old", "DROP TABLE sessions_old")
+_SQL_CLAIM = "INSERT INTO users (user, key_hash) VALUES (?, ?) ON CONFLICT (user) DO NOTHING"
+_SQL_KEY_HASH = "SELECT key_hash FROM users WHERE user = ?"
+_SQL_PAGE = (
+    "SELECT id, session_id, grade, section, started_at, ended_at, questions, correct, score"
+    " FROM sessions WHERE user = ? AND id < ? ORDER BY id DESC LIMIT ?"
+)
+_SQL_PROGRESS = (
+    "SELECT grade, section, sessions, questions, correct, score, timed_questions, seconds"
+    " FROM progress WHERE user = ? ORDER BY grade, section"
+)
+
+
+def parse_time(value):
+    """Epoch seconds from an ISO 8601 string (as sent by JSON.stringify(new Date())), or None"""
+    if not isinstance(value, str):
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def hash_key(key):
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+
+def format_time(seconds):
+    return None if seconds is None else datetime.fromtimestamp(seconds, timezone.utc).isoformat()
+
+
+def section_totals(section, started_at, questions):
+    """
+    Per-section totals of one session's questions:
+    {section: [questions, correct, score, timed questions, seconds]}.
+    Time per question is the gap since the previous answer (or the session start).
+    """
+    totals = {}
+    previous = started_at
+    for question in questions:
+        row = totals.setdefault(question.get('section') or section, [0, 0, 0, 0, 0.0])
+        row[0] += 1
+        row[1] += bool(question.get('correct'))
+        points = question.get('pointsEarned')
+        if isinstance(points, int) and not isinstance(points, bool):
+            row[2] += min(max(points, 0), MAX_QUESTION_POINTS)
+        answered_at = parse_time(question.get('timestamp'))
+        if previous is not None and answered_at is not None and 0 <= answered_at - previous <= MAX_QUESTION_SECONDS:
+            row[3] += 1
+            row[4] += answered_at - previous
+        if answered_at is not None:
+            previous = answered_at
+    return totals
+
+
+class SessionHistory:
+    """
+    Saved quiz sessions and per-user progress, in one SQLite file.
+
+    Worker processes on one host can share the file (WAL mode). Each thread
+    uses its own connection, reopened after a fork. Nothing is opened (or
+    created) until the first call that needs the database.
+
+    Args:
+        path: Database file
+    """
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        self._pid = os.getpid()
+        self._local = threading.local()
+        self._ready = False
+        self._ready_lock = threading.Lock()
+
+    def _create_schema(self):
+        """Create the file and tables on first use (once per process)"""
+        with self._ready_lock:
+            if self._ready:
+                return
+            connection = self._connect()
+            connection.execute("PRAGMA journal_mode=WAL")
+            with connection:
+                migrate = connection.execute(_SQL_OLD_SESSIONS).fetchone() is not None
+                if migrate:
+                    for statement in _SQL_MIGRATE_SESSIONS:
+                        connection.execute(statement)
+                for statement in _SQL_SCHEMA:
+                    connection.execute(statement)
+                if migrate:
+                    for statement in _SQL_COPY_OLD_SESSIONS:
+                        connection.execute(statement)
+            connection.close()
+            self._ready = True
+
+    def _connect(self):
+        connection = sqlite3.connect(self.path, timeout=10, cached_statements=16)
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.execute("PRAGMA busy_timeout=10000")
+        return connection
+
+    def _connection(self):
+        """Connection for the calling thread, opened on first use"""
+        if self._pid != os.getpid():
+            # Connections don't survive a fork; start fresh in the child
+            self._pid = os.getpid()
+            self._local = threading.local()
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            if not self._ready:
+                self._create_schema()
+            connection = self._local.connection = self._connect()
+        return connection
+
+    def claim(self, user):
+        """
+        Give a user without a history key a new one.
+        Returns the key (shown only this once), or None if the user already has one.
+        """
+        key = secrets.token_urlsafe(24)
+        connection = self._connection()
+        with connection:
+            claimed = connection.execute(_SQL_CLAIM, (user, hash_key(key))).rowcount
+        return key if claimed else None
+
+    def claim_and_add(self, user, session_id, grade, section, started_at, ended_at, questions):
+        """
+        claim() and add() in one transaction, for a user's first save: if saving
+        fails, the user stays unclaimed. Returns (key, saved); key is None (and
+        nothing is saved) if the user already has one.
+        """
+        key = secrets.token_urlsafe(24)
+        connection = self._connection()
+        with connection:
+            if not connection.execute(_SQL_CLAIM, (user, hash_key(key))).rowcount:
+                return None, False
+            saved = self._insert(connection, user, session_id, grade, section, started_at, ended_at, questions)
+        return key, saved
+
+    def authorize(self, user, key):
+        """True if key is the user's history key"""
+        if not isinstance(key, str) or not key:
+            return False
+        row = self._connection().execute(_SQL_KEY_HASH, (user,)).fetchone()
+        return row is not None and hmac.compare_digest(row[0], hash_key(key))
+
+    def add(self, user, session_id, grade, section, started_at, ended_at, questions):
+        """
+        Append a session and fold it into the user's progress.
+        Returns False if this session id was already saved (nothing changes).
+        """
+        connection = self._connection()
+        with connection:
+            return self._insert(connection, user, session_id, grade, section, started_at, ended_at, questions)
+
+    def _insert(self, connection, user, session_id, grade, section, started_at, ended_at, questions):
+        """add()'s statements, inside the caller's transaction"""
+        totals = section_totals(section, started_at, questions)
+        cursor = connection.execute(_SQL_INSERT_SESSION, (
+            session_id, user, grade, section, started_at, ended_at,
+            sum(row[0] for row in totals.values()), sum(row[1] for row in totals.values()),
+            sum(row[2] for row in totals.values()),
+            json.dumps(questions, separators=(',', ':')),
+        ))
+        if cursor.rowcount == 0:
+            return False
+        connection.executemany(_SQL_UPDATE_PROGRESS, [
+            (user, grade, name, *row) for name, row in totals.items()
+        ])
+        return True
+
+    def page(self, user, limit=DEFAULT_PAGE_SIZE, before=None):
+        """
+        One page of a user's sessions, newest first.
+        Returns (sessions, cursor); pass cursor as `before` for the next page (None = no more).
+        """
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        rows = self._connection().execute(
+            _SQL_PAGE, (user, before if before is not None else 2 ** 63 - 1, limit + 1)).fetchall()
+        sessions = [{
+            'sessionId': session_id, 'grade': grade, 'section': section,
+            'startTime': format_time(started_at), 'endTime': format_time(ended_at),
+            'totalQuestions': questions, 'correctAnswers': correct, 'totalScore': score,
+        } for _id, session_id, grade, section, started_at, ended_at, questions, correct, score in rows[:limit]]
+        cursor = rows[limit - 1][0] if len(rows) > limit else None
+        return sessions, cursor
+
+    def progress(self, user):
+        """A user's running totals per (grade, section)"""
+        return [{
+            'grade': grade, 'section': section, 'sessions': sessions,
+            'attempts': questions, 'correct': correct, 'score': score,
+            'accuracy': round(correct / questions, 4) if questions else None,
+            'average_seconds': round(seconds / timed, 2) if timed else None,
+        } for grade, section, sessions, questions, correct, score, timed, seconds
+            in self._connection().execute(_SQL_PROGRESS, (user,))]
+
+
+def create_session_history():
+    """
+    Build the session history from environment settings, or None when disabled:
+        SESSION_HISTORY_PATH  SQLite file for saved sessions (default backend/sessions.sqlite3; empty = off)
+    """
+    path = os.environ.get('SESSION_HISTORY_PATH', DEFAULT_PATH)
+    return SessionHistory(path) if path else None
@@ -0,0 +1,181 @@
+"""
+In-memory static asset serving for the frontend
+- Loads the frontend directory into memory at startup, and again when a file's mtime changes
+- Precomputes gzip (and brotli, when the brotli package is installed) variants
+- Strong ETags per variant; matching If-None-Match requests get 304 Not Modified
+- app.js and style.css are also served under content-hashed names
+  (app.<hash>.js) that index.html is rewritten to use, so they can be cached
+  for a year; everything else is revalidated with its ETag
+"""
+
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+import threading
+import time
+
+from flask import Response
+from werkzeug.exceptions import NotFound
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Files served under content-hashed names with long-lived caching
+FINGERPRINTED = ('app.js', 'style.css')
+
+# Only text-like files are worth compressing, and only when they're not tiny
+COMPRESSIBLE_TYPES = ('text/', 'application/javascript', 'application/json', 'image/svg+xml')
+MIN_COMPRESS_SIZE = 512
+
+CACHE_IMMUTABLE = 'public, max-age=31536000, immutable'
+CACHE_REVALIDATE = 'no-cache'
+
+# src="app.js?v=123" / href="style.css" references in HTML pages
+REFERENCE_PATTERN = re.compile(r'''(src|href)="(%s)(\?[^"]*)?"''' %
+                               '|'.join(re.escape(name) for name in FINGERPRINTED))
+
+
+class _Asset:
+    """One servable file with its precomputed encodings"""
+
+    __slots__ = ('mimetype', 'cache_control', 'variants')
+
+    def __init__(self, body, mimetype, cache_control):
+        self.mimetype = mimetype
+        self.cache_control = cache_control
+        digest = hashlib.sha256(body).hexdigest()[:20]
+        # encoding -> (body, etag); None is the identity encoding
+        self.variants = {None: (body, digest)}
+        if mimetype.startswith(COMPRESSIBLE_TYPES) and len(body) >= MIN_COMPRESS_SIZE:
+            gz = gzip.compress(body, compresslevel=9, mtime=0)
+            if len(gz) < len(body):
+                self.variants['gzip'] = (gz, f'{digest}-gz')
+            if brotli is not None:
+                br = brotli.compress(body, quality=11)
+                if len(br) < len(body):
+                    self.variants['br'] = (br, f'{digest}-br')
+
+
+def _content_hash(body):
+    return hashlib.sha256(body).hexdigest()[:10]
+
+
+def _hashed_name(name, body):
+    stem, ext = os.path.splitext(name)
+    return f"{stem}.{_content_hash(body)}{ext}"
+
+
+class StaticAssets:
+    """
+    Serves a directory from memory.
+
+    Args:
+        root: Directory to serve
+        check_interval: Minimum seconds between mtime checks for changed files
+    """
+
+    def __init__(self, root, check_interval=2.0):
+        self.root = os.path.abspath(root)
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._assets = {}
+        self._mtimes = {}
+        self._next_check = 0.0
+        self.reload()
+
+    def _scan(self):
+        """Current mtime of every file under root, keyed by relative path (empty if root is missing)"""
+        mtimes = {}
+        for directory, _dirs, files in os.walk(self.root):
+            for name in files:
+                path = os.path.join(directory, name)
+                relative = os.path.relpath(path, self.root).replace(os.sep, '/')
+                try:
+                    mtimes[relative] = os.stat(path).st_mtime_ns
+                except OSError:
+                    continue        # removed since it was listed
+        return mtimes
+
+    def reload(self):
+        """(Re)load every file and swap in the new set of assets"""
+        mtimes = self._scan()
+        files = {}
+        for relative in list(mtimes):
+            try:
+                with open(os.path.join(self.root, relative), 'rb') as f:
+                    files[relative] = f.read()
+            except OSError:
+                del mtimes[relative]    # removed since the scan; the next check sees it's gone
+
+        hashed = {name: _hashed_name(name, files[name]) for name in FINGERPRINTED if name in files}
+
+        def rewrite(match):
+            return f'{match.group(1)}="{hashed[match.group(2)]}"'
+
+        assets = {}
+        for relative, body in files.items():
+            mimetype = mimetypes.guess_type(relative)[0] or 'application/octet-stream'
+            if mimetype == 'text/html' and hashed:
+                body = REFERENCE_PATTERN.sub(rewrite, body.decode('utf-8')).encode('utf-8')
+            if mimetype.startswith('text/') or mimetype == 'application/javascript':
+                mimetype += '; charset=utf-8'
+            assets[relative] = _Asset(body, mimetype, CACHE_REVALIDATE)
+            if relative in hashed:
+                assets[hashed[relative]] = _Asset(body, mimetype, CACHE_IMMUTABLE)
+
+        with self._lock:
+            self._assets = assets
+            self._mtimes = mtimes
+            self._next_check = time.monotonic() + self.check_interval
+
+    def _refresh_if_changed(self):
+        now = time.monotonic()
+        if now < self._next_check:
+            return
+        with self._lock:
+            if now < self._next_check:
+                return
+            self._next_check = now + self.check_interval
+        if self._scan() != self._mtimes:
+            self.reload()
+
+    def get(self, path):
+        """The asset for a relative path, or None"""
+        self._refresh_if_changed()
+        return self._assets.get(path)
+
+    def response(self, asset, request):
+        """
+        Build the response for an asset, honouring Accept-Encoding and If-None-Match.
+        A missing asset (None) is a 404.
+        """
+        if asset is None:
+            raise NotFound()
+        accepted = request.accept_encodings
+        encoding = None
+        for candidate in ('br', 'gzip'):
+            if candidate in asset.variants and accepted[candidate]:
+                encoding = candidate
+                break
+        body, etag = asset.variants[encoding]
+
+        headers = {'ETag': f'"{etag}"', 'Cache-Control': asset.cache_control}
+        if len(asset.variants) > 1:
+            headers['Vary'] = 'Accept-Encoding'
+        if request.if_none_match.contains(etag):
+            return Response(status=304, headers=headers)
+        if encoding:
+            headers['Content-Encoding'] = encoding
+        return Response(body, headers=headers, content_type=asset.mimetype)
+
+
+def create_static_assets(root):
+    """
+    Build the static asset server from environment settings:
+        STATIC_CHECK_INTERVAL  seconds between checks for changed files (default 2, 0 = every request)
+    """
+    return StaticAssets(root, check_interval=float(os.environ.get('STATIC_CHECK_INTERVAL', 2)))
@@ -134,6 +134,576 @@ print(f"Question: {result['question']}")
 print(f"Answer: {result['answer']}")
 print(f"Fraction: {result['fraction']}")
 
+print("\n" + "=" * 50)
+print("Testing seeded generation...")
+print("=" * 50)
+
+# The same random.Random seed must give the same question, so seeded quizzes can be regenerated
+import random
+for grade_module in [grade_1, grade_2, grade_3, grade_4, grade_5, grade_6]:
+    for section, generator in grade_module.QUESTION_GENERATORS.items():
+        first = generator(random.Random(7))
+        second = generator(random.Random(7))
+        assert first == second, f"{grade_module.__name__} {section} is not reproducible"
+    print(f"\n{grade_module.__name__}: {len(grade_module.QUESTION_GENERATORS)} generators reproducible")
+
+print("\n" + "=" * 50)
+print("Testing no-repeat sampling...")
+print("=" * 50)
+
+# A session walks every question of a section once before any repeats, the same in
+# every process, and each block of draws keeps the variant weights
+from question_sampler import NoRepeatSampler
+from grades import get_spec
+
+build = lambda section, grade, rng, generator: generator(rng)
+sampler = NoRepeatSampler(get_spec, build)
+for grade, section, size in [(2, 'subtraction', 210), (5, 'fractions', 84), (4, 'division', 63)]:
+    questions = [sampler.draw('test', section, grade, index)['question'] for index in range(size)]
+    assert len(set(questions)) == size, f"Grade {grade} {section}: {len(set(questions))} distinct of {size}"
+    assert NoRepeatSampler(get_spec, build).draw('test', section, grade, size - 1)['question'] == questions[-1], \
+        "Another process should give the same question for the same index"
+    assert sampler.draw('other', section, grade, 0)['question'] != questions[0] or \
+        sampler.draw('other', section, grade, 1)['question'] != questions[1], "Sessions should differ"
+    print(f"\nGrade {grade} {section.title()}: {size} draws, every question once")
+
+operands = [sampler.draw('test', 'addition', 1, index)['operands'] for index in range(50)]
+assert len({(o['a'], o['b']) for o in operands}) == 50, "Grade 1 addition repeated within 50 draws"
+for block in range(5):
+    easy = sum(o['a'] + o['b'] < 10 for o in operands[block * 10:block * 10 + 10])
+    assert easy == 7, f"Grade 1 block {block} has {easy} easy questions of 10"
+firsts = [sampler.draw(f"s{i}", 'addition', 1, 0)['operands'] for i in range(2000)]
+easy_share = sum(o['a'] + o['b'] < 10 for o in firsts) / len(firsts)
+assert abs(easy_share - 0.7) < 0.04, f"Grade 1 first-draw easy share is {easy_share}"
+print(f"\nGrade 1 Addition: 50 draws without repeats, 7 easy in every 10, first draws {easy_share:.0%} easy")
+
+# Large sequential spaces are indexed too (a dependent last operand included)
+for grade, section in [(6, 'subtraction'), (6, 'division')]:
+    questions = [sampler.draw('test', section, grade, index)['question'] for index in range(200)]
+    assert len(set(questions)) == 200, f"Grade {grade} {section} repeated"
+    spec = get_spec(grade, section)
+    for space in (space for _weight, space in spec.operand_spaces()):
+        for i in (0, space.size // 3, space.size - 1):
+            values = space.values(i)
+            assert spec.variants[0].draw is not None and all(
+                (low if type(low) is int else low(values)) <= values[name] <= (high if type(high) is int else high(values))
+                for name, low, high in spec.variants[0].operands), f"Grade {grade} {section} tuple {i} out of range"
+print("\nGrade 6 Subtraction/Division: indexed without repeats, tuples in range")
+
+from grades.specs import load_grade_specs, spec_grades
+for grade in spec_grades():
+    for section, spec in load_grade_specs(grade).items():
+        assert spec.operand_spaces(), f"Grade {grade} {section} can't be walked by sessions"
+print("\nEvery spec section can be walked by sessions")
+
+print("\n" + "=" * 50)
+print("Testing generator specs...")
+print("=" * 50)
+
+# Compiled specs must keep the documented distributions, and the docs must match the specs
+from collections import Counter
+from grades.specs import AliasTable, SpecError, compile_expression, documented_table, spec_table
+
+distribution = grade_1.SPECS['addition'].distribution()
+easy_share = sum(p for (a, b), p in distribution.items() if a + b < 10)
+assert abs(easy_share - 0.7) < 1e-9, f"Grade 1 easy share is {easy_share}"
+assert all(1 <= a <= 9 and 1 <= b <= 9 for a, b in distribution), "Grade 1 operand out of range"
+print(f"\nGrade 1 Addition: {len(distribution)} questions, {easy_share:.0%} easy")
+
+rng = random.Random(11)
+draws = 50000
+counts = Counter(tuple(grade_1.SPECS['addition'].sample(rng).values()) for _ in range(draws))
+distance = sum(abs(counts[k] / draws - p) for k, p in distribution.items()) / 2
+assert distance < 0.05, f"Grade 1 samples are {distance:.3f} from the spec distribution"
+print(f"Grade 1 Addition: {draws} samples, total variation {distance:.3f}")
+
+assert all(d1 != d2 for d1, d2, _n1, _n2 in grade_6.SPECS['fractions'].distribution()), \
+    "Grade 6 fractions share a denominator"
+print("Grade 6 Fractions: denominators always differ")
+
+counts = Counter(AliasTable([1, 2, 7]).pick(rng, 'abc') for _ in range(draws))
+assert all(abs(counts[k] / draws - p) < 0.01 for k, p in zip('abc', (0.1, 0.2, 0.7))), f"Alias table: {counts}"
+print(f"Alias table 1:2:7: {dict(sorted(counts.items()))}")
+
+for text in ("__import__('os')", "a.real", "c + 1"):
+    try:
+        compile_expression(text, {'a', 'b'}, 'test')
+    except SpecError:
+        continue
+    raise AssertionError(f"{text!r} should not compile")
+print("Bound expressions: unsafe or unknown names rejected")
+
+# sample() and generate() default to the random module, like the hand-written generators did
+from grades.specs import load_grade_specs, spec_grades
+for grade in spec_grades():
+    for section, spec in load_grade_specs(grade).items():
+        values = spec.sample()
+        assert set(values) == set(spec.kind.operands), f"Grade {grade} {section} sampled {values}"
+        assert spec.generate()['question'], f"Grade {grade} {section} generated no question"
+print("Every spec samples with the default rng")
+
+assert documented_table() == spec_table(), "GRADE_NUMBER_LIMITS.md is stale: run python -m grades.specs --write"
+print("GRADE_NUMBER_LIMITS.md matches the specs")
+
+print("\n" + "=" * 50)
+print("Testing response schemas...")
+print("=" * 50)
+
+# Every field a (grade, section) schema declares must come from its generator,
+# and the encoded response must decode back to the projected dict
+import json
+from app import GRADES, QUESTION_RESPONSE_SCHEMAS, build_question, sections_for_grade
+from responses import dumps, JSON_BACKEND
+for grade in sorted(GRADES):
+    for section in sections_for_grade(grade):
+        q = build_question(section, grade)
+        q["id"] = "test"
+        fields = QUESTION_RESPONSE_SCHEMAS.fields(grade, section)
+        missing = [field for field in fields if field not in q]
+        assert not missing, f"Grade {grade} {section} schema fields not generated: {missing}"
+        resp = QUESTION_RESPONSE_SCHEMAS.project(q, grade, section)
+        assert list(resp) == list(fields), f"Grade {grade} {section} response fields: {list(resp)}"
+        assert json.loads(dumps(resp)) == json.loads(json.dumps(resp)), f"Grade {grade} {section} encodes differently"
+    print(f"\nGrade {grade}: {len(sections_for_grade(grade))} schemas valid ({JSON_BACKEND})")
+
+print("\n" + "=" * 50)
+print("Testing bulk generation...")
+print("=" * 50)
+
+# Bulk generation needs NumPy, which is optional; batches draw from the same specs as single questions
+import grades.batch
+from grades.batch import generate_batch
+
+# Batch columns back to spec operand names, per kind
+BATCH_OPERANDS = {
+    'division': {'divisor': 'divisor', 'quotient': 'quotient', 'remainder': 'remainder'},
+    'fraction_same': {'denominator': 'denominator1', 'num1': 'numerator1', 'num2': 'numerator2'},
+    'fraction_different': {'denom1': 'denominator1', 'denom2': 'denominator2',
+                           'num1': 'numerator1', 'num2': 'numerator2'},
+}
+
+def in_variant(variant, values):
+    """values are within the variant's bounds and constraints"""
+    for name, low, high in variant.operands:
+        low = low if type(low) is int else low(values)
+        high = high if type(high) is int else high(values)
+        if not low <= values[name] <= high:
+            return False
+    return all(check(values) for check in variant.where)
+
+if grades.batch.np is None:
+    print("NumPy not installed, skipping")
+else:
+    for grade in spec_grades():
+        for section, spec in load_grade_specs(grade).items():
+            batch = generate_batch(grade, section, 300, seed=42)
+            names = BATCH_OPERANDS.get(spec.kind_name, {'a': 'a', 'b': 'b'})
+            rows = zip(*(batch.columns[column].tolist() for column in names.values()))
+            for values, question in zip(rows, batch):
+                values = dict(zip(names, values))
+                assert any(in_variant(variant, values) for variant in spec.variants), \
+                    f"Grade {grade} {section} batch drew {values} outside its spec"
+                expected = spec.kind.render(values, spec)
+                assert question['question'] == expected['question'], (question, expected)
+                assert question.get('fraction') == expected.get('fraction'), (question, expected)
+                if isinstance(expected['answer'], float):     # np.round and round() can differ by a cent at .xx5
+                    assert abs(question['answer'] - expected['answer']) < 0.011, (question, expected)
+                else:
+                    assert question['answer'] == expected['answer'], (question, expected)
+    columns = generate_batch(1, 'addition', 20000, seed=42).columns
+    easy = float(((columns['a'] + columns['b']) < 10).mean())
+    assert abs(easy - 0.7) < 0.02, f"Grade 1 addition batch should be 70% easy, got {easy:.3f}"
+    assert (columns['answer'] <= 18).all()
+    columns = generate_batch(6, 'fractions', 20000, seed=42).columns
+    assert (columns['denominator1'] != columns['denominator2']).all(), "Grade 6 fractions need distinct denominators"
+    assert set(columns['denominator2'].tolist()) == set(range(2, 10))
+    columns = generate_batch(6, 'subtraction', 20000, seed=42).columns
+    assert (columns['b'] <= columns['a']).all() and columns['b'].min() >= 100 and columns['a'].max() <= 9999
+    print("Bulk generation: every spec section within its spec, Grade 1's 70/30 split, Grade 6's distinct denominators")
+
+print("\n" + "=" * 50)
+print("Testing answer stores...")
+print("=" * 50)
+
+# Stored answers come back until they expire; a failed commit is retried, not lost
+import os
+import sqlite3
+import tempfile
+import time
+from answer_store import MemoryAnswerStore, SQLiteAnswerStore, FOUND, EXPIRED, EVICTED, NOT_ISSUED
+
+now = [0.0]
+store = MemoryAnswerStore(max_size=2, ttl=10, stripes=1, clock=lambda: now[0])
+store.put('a', 1)
+store.put_many([('b', {'quotient': 2, 'remainder': 0}), ('c', 3)])
+assert store.lookup('a') == (EVICTED, None), "Least recently used answer should be evicted"
+assert store.lookup('b') == (FOUND, {'quotient': 2, 'remainder': 0})
+now[0] = 11
+assert store.lookup('c') == (EXPIRED, None), "Answer should expire after the TTL"
+assert store.lookup('never') == (NOT_ISSUED, None)
+print("\nMemory store: put/get, LRU eviction, expiry")
+
+store_dir = tempfile.mkdtemp()
+store_path = os.path.join(store_dir, 'answers.sqlite3')
+now = [1000.0]
+first = SQLiteAnswerStore(store_path, ttl=10, clock=lambda: now[0])
+second = SQLiteAnswerStore(store_path, ttl=10, clock=lambda: now[0])
+first.put('q1', 42)
+assert second.lookup('q1') == (FOUND, 42), "Another worker should see a committed answer at once"
+started = time.monotonic()
+for i in range(100):
+    assert second.lookup(f"unknown{i}") == (NOT_ISSUED, None)
+assert time.monotonic() - started < 0.5, "Unknown ids should not wait for the database"
+now[0] = 1011
+assert second.lookup('q1') == (EXPIRED, None), "Answer should expire after the TTL"
+print("SQLite store: shared between instances, misses don't wait, expiry")
+
+
+class FlakyStore(SQLiteAnswerStore):
+    """Fails its first commit, as a busy database would"""
+    failures = 1
+
+    def _commit(self, connection, rows):
+        if self.failures:
+            self.failures -= 1
+            raise sqlite3.OperationalError("database is locked")
+        super()._commit(connection, rows)
+
+
+flaky = FlakyStore(store_path, ttl=10, clock=lambda: now[0], retry_delay=0.01, commit_wait=0.01)
+flaky.put('q2', 7)
+assert flaky.lookup('q2') == (FOUND, 7), "A pending answer should still be found by its own worker"
+deadline = time.monotonic() + 5
+while second.lookup('q2')[0] != FOUND and time.monotonic() < deadline:
+    time.sleep(0.01)
+assert second.lookup('q2') == (FOUND, 7), "A failed commit should be retried"
+assert flaky.stats()['write_errors'] == 1 and flaky._writer.is_alive(), "Writer should survive a failed commit"
+flaky.put('q3', 8)
+assert second.lookup('q3') == (FOUND, 8), "Writer should keep committing after a failure"
+import threading
+flaky._writer = threading.Thread(target=lambda: None)     # a writer that died
+flaky._writer.start()
+flaky._writer.join()
+flaky.put('q4', 9)
+assert second.lookup('q4') == (FOUND, 9), "A dead writer should be restarted"
+for answer_store in (first, second, flaky):
+    answer_store.close()
+print("SQLite store: writer retries a failed commit, keeps running, restarts if dead")
+
+print("\n" + "=" * 50)
+print("Testing content reloads...")
+print("=" * 50)
+
+# A reload keeps the previous snapshot by version, so questions issued from it can still be graded
+from content_banks import ContentBanks
+
+content_dir = tempfile.mkdtemp()
+bank_path = os.path.join(content_dir, 'bank.csv')
+
+def write_bank(text, mtime):
+    with open(bank_path, 'w') as f:
+        f.write(text)
+    os.utime(bank_path, (mtime, mtime))
+
+def read_bank(path):
+    with open(path) as f:
+        return f.read()
+
+write_bank('one', 1000)
+banks = ContentBanks({'bank': (bank_path, read_bank, '')}, lambda parts: parts['bank'], interval=0)
+v1, snapshot = banks.current_versioned()
+assert snapshot == 'one'
+write_bank('two', 2000)
+assert banks.check() == ['bank']
+v2, snapshot = banks.current_versioned()
+assert snapshot == 'two' and v2 != v1, "A reload should give a new version"
+assert banks.snapshot_for(v1) == 'one', "The previous snapshot should be kept"
+write_bank('three', 3000)
+banks.check()
+assert banks.snapshot_for(v1) is None and banks.snapshot_for(v2) == 'two', "Only one previous snapshot is kept"
+assert ContentBanks({'bank': (bank_path, read_bank, '')}, lambda parts: parts['bank'],
+                    interval=0).current_versioned()[0] == banks.current_versioned()[0], \
+    "Every process should give the same files the same version"
+print("Content banks: versions match across processes, previous snapshot kept")
+
+# A broken file keeps its previous contents without holding back the other changed files
+other_path = os.path.join(content_dir, 'other.csv')
+
+def parse_strict(path):
+    text = read_bank(path)
+    if text == 'broken':
+        raise ValueError("bad row")
+    return text
+
+for path, text in ((bank_path, 'a1'), (other_path, 'b1')):
+    with open(path, 'w') as f:
+        f.write(text)
+    os.utime(path, (1000, 1000))
+pair = ContentBanks({'a': (bank_path, parse_strict, ''), 'b': (other_path, parse_strict, '')},
+                    lambda parts: (parts['a'], parts['b']), interval=0)
+with open(bank_path, 'w') as f:
+    f.write('broken')
+os.utime(bank_path, (2000, 2000))
+with open(other_path, 'w') as f:
+    f.write('b2')
+os.utime(other_path, (2000, 2000))
+assert pair.check() == ['b'] and pair.current() == ('a1', 'b2'), "The good file should still be reloaded"
+assert pair.failures == 1 and pair.last_error.startswith('a:'), "The broken file should be reported"
+assert pair.check() == [] and pair.failures == 1, "A broken file should be reported once"
+with open(bank_path, 'w') as f:
+    f.write('a3')
+os.utime(bank_path, (3000, 3000))
+assert pair.check() == ['a'] and pair.current() == ('a3', 'b2') and pair.last_error is None
+print("Content banks: a broken file keeps its old contents, the others reload")
+
+import app
+seeded = app.generate_seeded_question('addition', 6, 'reload', 0)
+version = seeded['id'].rsplit(':', 1)[1]
+assert app.regenerate_seeded_answer(seeded['id']) == (FOUND, app.answer_entry(seeded))
+assert app.regenerate_seeded_answer(seeded['id'].replace(version, '0' * 8))[0] == EXPIRED, \
+    "A seeded id from content that is gone should expire"
+print("Seeded ids: graded against their own content version")
+
+print("\n" + "=" * 50)
+print("Testing static assets...")
+print("=" * 50)
+
+# Missing files are 404s, and files removed while reloading are skipped
+from flask import Flask, request as flask_request
+from static_assets import StaticAssets
+
+static_dir = tempfile.mkdtemp()
+with open(os.path.join(static_dir, 'index.html'), 'w') as f:
+    f.write('<script src="app.js"></script>')
+
+
+class VanishingAssets(StaticAssets):
+    def _scan(self):
+        mtimes = super()._scan()
+        mtimes['gone.css'] = 1      # listed, then removed before it is read
+        return mtimes
+
+
+assets = VanishingAssets(static_dir, check_interval=0)
+assert assets.get('index.html') is not None and assets.get('gone.css') is None
+empty = StaticAssets(os.path.join(static_dir, 'missing'), check_interval=0)
+static_app = Flask(__name__)
+static_app.add_url_rule('/<path:path>', 'static_file',
+                        lambda path: empty.response(empty.get(path), flask_request))
+assert static_app.test_client().get('/index.html').status_code == 404, "A missing frontend should be a 404"
+print("Static assets: missing files are 404s, vanished files skipped")
+
+print("\n" + "=" * 50)
+print("Testing rate limiting...")
+print("=" * 50)
+
+# A full bucket allows a burst, then one request per 1/rate seconds; buckets are per client
+from rate_limit import RateLimiter, LoadShedder, parse_rules
+
+assert parse_rules("get_question=5:20, check_answer=2") == {'get_question': (5.0, 20), 'check_answer': (2.0, 2)}
+now = [100.0]
+limiter = RateLimiter({'get_question': (2.0, 3)}, clock=lambda: now[0])
+assert [limiter.acquire('get_question', 'a') for _ in range(3)] == [0, 0, 0], "A full burst should be allowed"
+wait = limiter.acquire('get_question', 'a')
+assert abs(wait - 0.5) < 1e-9, f"The 4th request should wait one token (0.5 s), not {wait}"
+assert limiter.acquire('get_question', 'b') == 0, "Clients have separate buckets"
+assert limiter.acquire('check_answer', 'a') == 0, "Routes without a rule aren't limited"
+now[0] += 0.5
+assert limiter.acquire('get_question', 'a') == 0 and limiter.acquire('get_question', 'a') > 0, \
+    "Half a second refills one token"
+now[0] += 10
+assert [limiter.acquire('get_question', 'a') for _ in range(3)] == [0, 0, 0], "An idle bucket refills to the burst"
+assert limiter.acquire('get_question', 'a') > 0, "The burst is capped"
+now[0] += 10
+limiter.acquire('get_question', 'c')
+assert len(limiter) == 1, "Refilled buckets should be swept"
+small = RateLimiter({'r': (1.0, 1)}, max_clients=2, clock=lambda: now[0])
+for client in 'xyz':
+    small.acquire('r', client)
+assert len(small) == 2, "Buckets are capped at max_clients"
+print("GCRA: burst, refill, per-client buckets, sweeping")
+
+shedder = LoadShedder(max_in_flight=2)
+assert shedder.enter() == 0 and shedder.enter() == 0 and shedder.enter() > 0, "The 3rd request in flight is shed"
+shedder.leave()
+assert shedder.enter() == 0 and shedder.shed == 1
+overloaded = [True]
+checked = LoadShedder(checks=[lambda: overloaded[0]], check_interval=1, clock=lambda: now[0])
+assert checked.enter() == 1, "A failing check sheds with Retry-After of the check interval"
+overloaded[0] = False
+assert checked.enter() == 1, "The check result is reused within the interval"
+now[0] += 1
+assert checked.enter() == 0, "The check runs again after the interval"
+print("Load shedding: in-flight cap and cached overload checks")
+
+print("\n" + "=" * 50)
+print("Testing session history...")
+print("=" * 50)
+
+# Saving a session twice counts it once; pages chain through their cursors without gaps or overlaps
+from session_history import SessionHistory
+
+history = SessionHistory(os.path.join(tempfile.mkdtemp(), 'sessions.sqlite3'))
+key = history.claim('ann@example.com')
+assert key and history.claim('ann@example.com') is None, "A history key is handed out once"
+assert history.authorize('ann@example.com', key) and not history.authorize('ann@example.com', key + 'x')
+assert not history.authorize('bob@example.com', key), "A key only opens its own user's history"
+answers = [{'correct': True, 'pointsEarned': 10, 'timestamp': '2026-10-18T10:00:20Z'},
+           {'correct': False, 'pointsEarned': 0, 'timestamp': '2026-10-18T10:00:50Z'}]
+started = 1792317600.0      # 2026-10-18T10:00:00Z
+assert history.add('ann@example.com', 'session-0', 3, 'addition', started, started + 60, answers)
+assert not history.add('ann@example.com', 'session-0', 3, 'addition', started, started + 60, answers), \
+    "Saving the same session again should be a no-op"
+progress = history.progress('ann@example.com')
+assert len(progress) == 1 and progress[0]['sessions'] == 1 and progress[0]['attempts'] == 2, progress
+assert progress[0]['correct'] == 1 and progress[0]['score'] == 10 and progress[0]['average_seconds'] == 25.0
+for i in range(1, 7):
+    history.add('ann@example.com', f'session-{i}', 3, 'addition', started, started + 60, answers)
+history.add('bob@example.com', 'session-bob', 3, 'addition', started, started + 60, answers)
+pages, cursor = [], None
+while True:
+    sessions, cursor = history.page('ann@example.com', limit=3, before=cursor)
+    pages.append([entry['sessionId'] for entry in sessions])
+    if cursor is None:
+        break
+assert pages == [['session-6', 'session-5', 'session-4'], ['session-3', 'session-2', 'session-1'], ['session-0']], pages
+sessions, cursor = history.page('ann@example.com', limit=7)
+assert len(sessions) == 7 and cursor is None, "An exactly full last page has no cursor"
+assert history.add('bob@example.com', 'session-0', 3, 'addition', started, started + 60, answers), \
+    "Session ids only need to be unique per user"
+assert history.progress('bob@example.com')[0]['sessions'] == 2
+
+# A first save claims the key in the same transaction: a failed save leaves the user unclaimed
+huge = [dict(answers[0], pointsEarned=10 ** 30)]
+new_key, saved = history.claim_and_add('cy@example.com', 'session-0', 3, 'addition', started, started + 60, huge)
+assert new_key and saved and history.progress('cy@example.com')[0]['score'] == 1000, "Points are clamped"
+assert history.claim_and_add('cy@example.com', 'session-1', 3, 'addition', started, started + 60, answers) == (None, False)
+try:
+    history.claim_and_add('di@example.com', 'session-0', 3, 'addition', started, started + 60, [{'x': {1}}])
+except TypeError:
+    pass
+assert history.claim('di@example.com'), "A failed first save should not use up the key"
+
+# Files from before per-user session ids are migrated with their rows
+legacy_path = os.path.join(tempfile.mkdtemp(), 'sessions.sqlite3')
+legacy = sqlite3.connect(legacy_path)
+legacy.execute("CREATE TABLE sessions (id INTEGER PRIMARY KEY, session_id TEXT NOT NULL UNIQUE,"
+               " user TEXT NOT NULL, grade INTEGER NOT NULL, section TEXT NOT NULL, started_at REAL, ended_at REAL,"
+               " questions INTEGER NOT NULL, correct INTEGER NOT NULL, score INTEGER NOT NULL, detail TEXT NOT NULL)")
+legacy.execute("CREATE INDEX sessions_user ON sessions (user, id)")
+legacy.execute("INSERT INTO sessions (session_id, user, grade, section, questions, correct, score, detail)"
+               " VALUES ('session-0', 'ann@example.com', 3, 'addition', 2, 1, 10, '[]')")
+legacy.commit()
+legacy.close()
+migrated = SessionHistory(legacy_path)
+assert migrated.add('bob@example.com', 'session-0', 3, 'addition', started, started + 60, answers)
+assert [entry['sessionId'] for entry in migrated.page('ann@example.com')[0]] == ['session-0']
+print("Session history: saves are idempotent per user, cursors page without gaps, first saves are atomic")
+
+print("\n" + "=" * 50)
+print("Testing bank cache...")
+print("=" * 50)
+
+# A cached bank is reused until its CSV changes, and a corrupt cache is rebuilt
+from bank_cache import BankCache
+
+cache_dir = tempfile.mkdtemp()
+csv_path = os.path.join(cache_dir, 'bank.csv')
+parses = []
+
+def parse_lines(path):
+    parses.append(path)
+    with open(path) as f:
+        return [line.strip() for line in f]
+
+with open(csv_path, 'w') as f:
+    f.write('a\nb\n')
+os.utime(csv_path, (1000, 1000))
+cache = BankCache(os.path.join(cache_dir, '.cache'))
+assert cache.load(csv_path, parse_lines) == ['a', 'b'] and len(parses) == 1
+assert BankCache(cache.directory).load(csv_path, parse_lines) == ['a', 'b'] and len(parses) == 1, \
+    "An unchanged CSV should load from the cache"
+with open(csv_path, 'w') as f:
+    f.write('a\nc\n')        # same size: only the mtime tells
+os.utime(csv_path, (2000, 2000))
+assert cache.load(csv_path, parse_lines) == ['a', 'c'] and len(parses) == 2, "An edited CSV should be re-parsed"
+with open(cache.path_for(csv_path), 'r+b') as f:
+    f.seek(-1, os.SEEK_END)
+    last = f.read(1)
+    f.seek(-1, os.SEEK_END)
+    f.write(bytes([last[0] ^ 0xFF]))
+assert cache.load(csv_path, parse_lines) == ['a', 'c'] and len(parses) == 3, "A corrupt cache should be rebuilt"
+assert cache.load(csv_path, parse_lines) == ['a', 'c'] and len(parses) == 3
+print("Bank cache: reused until the CSV changes, corrupt files rebuilt")
+
+print("\n" + "=" * 50)
+print("Testing answer tokens...")
+print("=" * 50)
+
+# Tokens carry their answer until they expire; anything altered or signed with another key is invalid
+from question_tokens import TokenSigner, INVALID
+
+now = [1000.0]
+signer = TokenSigner('secret', ttl=60, clock=lambda: now[0])
+token = signer.sign({'quotient': 3, 'remainder': 1})
+assert signer.verify(token) == (FOUND, {'quotient': 3, 'remainder': 1})
+assert TokenSigner('other', clock=lambda: now[0]).verify(token) == (INVALID, None), "Another key's token is invalid"
+signature = token.split('.')[1]
+forged = signer.sign(7).split('.')[0] + '.' + signature
+assert signer.verify(forged) == (INVALID, None), "A swapped payload is invalid"
+for garbage in ('', 'abc', 'a.b.c', 'é.x', 5, None):
+    assert signer.verify(garbage) == (INVALID, None), f"{garbage!r} should be invalid"
+now[0] += 60
+assert signer.verify(token) == (EXPIRED, None), "A token is valid for ttl seconds"
+print("Answer tokens: round trip, forgery and expiry")
+
+print("\n" + "=" * 50)
+print("Testing answer checks...")
+print("=" * 50)
+
+# Malformed or absurd answers are simply wrong, never an exception
+from answer_checks import compare_answer, EXACT_INT, FRACTION_TOLERANCE
+
+assert compare_answer(FRACTION_TOLERANCE, 0.83, '0.83') and compare_answer(EXACT_INT, 12, 12)
+for user in (10 ** 400, -10 ** 400, '9' * 400, True, None, 'abc', [1]):
+    assert not compare_answer(FRACTION_TOLERANCE, 0.83, user), f"{str(user)[:20]!r} should be incorrect"
+    assert not compare_answer(EXACT_INT, 12, user), f"{str(user)[:20]!r} should be incorrect"
+print("Answer checks: huge and malformed answers are incorrect")
+
+print("\n" + "=" * 50)
+print("Testing question pools...")
+print("=" * 50)
+
+# Unregistered keys miss; a registered pool fills in the background and refills below low water
+from question_pool import QuestionPool
+
+built = []
+
+def build_numbered(section, grade):
+    built.append((grade, section))
+    return {'question': f"{section} {len(built)}"}
+
+pool = QuestionPool(build_numbered, size=4, low_water=2)
+assert pool.take('addition', 3) is None and pool.stats()['misses'] == 0, "Unregistered keys aren't pooled"
+pool.register(3, 'addition')
+pool.start()
+deadline = time.monotonic() + 5
+while pool.stats()['levels']['3:addition'] < 4 and time.monotonic() < deadline:
+    time.sleep(0.01)
+assert pool.stats()['levels']['3:addition'] == 4, "A registered pool should fill up"
+taken = [pool.take('addition', 3) for _ in range(3)]
+assert all(taken) and len({q['question'] for q in taken}) == 3, "Each question is handed out once"
+while pool.stats()['levels']['3:addition'] < 4 and time.monotonic() < deadline:
+    time.sleep(0.01)
+assert pool.stats()['levels']['3:addition'] == 4, "A pool below low water should refill"
+assert pool.stats()['hits'] == 3 and pool.stats()['refills'] >= 2
+assert QuestionPool(build_numbered, size=0).enabled is False
+capped = QuestionPool(build_numbered, size=1, max_keys=2)
+for grade in range(5, 10):
+    capped.register(grade, 'charts')
+assert len(capped.stats()['levels']) == 2, "Pools past max_keys shouldn't be created"
+print("Question pools: fill, hand out each question once, refill below low water")
+
 print("\n" + "=" * 50)
 print("All tests passed! ✓")
 print("=" * 50)
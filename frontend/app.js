@@ -29,6 +29,8 @@ console.log('📡 API Base URL:', API_BASE_URL);
 
 // Session tracking
 let currentSessionId = null;
+// Next question index of the session (the server returns it with each batch)
+let sessionQuestionIndex = 0;
 let currentSessionData = {
   userName: '',
   grade: null,
@@ -42,6 +44,7 @@ let currentSessionData = {
 // Function to create a new session
 function startNewSession(userName, grade, section) {
   currentSessionId = generateUUID();
+  sessionQuestionIndex = 0;
   currentSessionData = {
     sessionId: currentSessionId,
     userName: userName,
@@ -55,17 +58,66 @@ function startNewSession(userName, grade, section) {
 }
 
 // Function to add question to session
-function addQuestionToSession(question, userAnswer, correctAnswer, correct, pointsEarned) {
+function addQuestionToSession(question, userAnswer, correctAnswer, correct, pointsEarned, section) {
   currentSessionData.questions.push({
     question: question,
     userAnswer: userAnswer,
     correctAnswer: correctAnswer,
     correct: correct,
     pointsEarned: pointsEarned,
+    section: section,
     timestamp: new Date()
   });
 }
 
+// Key guarding this user's server-side history (issued by the server on the first save)
+function historyKeyName(userEmail) {
+  return 'mathQuizHistoryKey:' + userEmail.trim().toLowerCase();
+}
+
+function historyHeaders(userEmail) {
+  const key = localStorage.getItem(historyKeyName(userEmail));
+  return key ? { 'X-History-Key': key } : {};
+}
+
+// Save session to the backend's session history (returns false if the server can't store it)
+async function saveSessionToServer(userEmail) {
+  try {
+    const response = await fetch(API_BASE_URL + '/sessions', {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json', ...historyHeaders(userEmail) },
+      body: JSON.stringify({ ...currentSessionData, user: userEmail })
+    });
+    if (!response.ok) {
+      console.warn('[SERVER] Session history unavailable:', response.status);
+      return false;
+    }
+    const result = await response.json();
+    if (result.historyKey) {
+      localStorage.setItem(historyKeyName(userEmail), result.historyKey);
+    }
+    console.log('[SERVER] ✓ Session saved to server');
+    return true;
+  } catch (error) {
+    console.warn('[SERVER] Session save failed:', error.message);
+    return false;
+  }
+}
+
+// Load one page of sessions from the server, newest first: { sessions, next } (null if unavailable)
+async function loadServerSessions(userEmail, before) {
+  try {
+    let url = `${API_BASE_URL}/sessions?user=${encodeURIComponent(userEmail)}&limit=20`;
+    if (before) url += `&before=${before}`;
+    const response = await fetch(url, { headers: historyHeaders(userEmail) });
+    if (!response.ok) return null;
+    return await response.json();
+  } catch (error) {
+    console.warn('[SERVER] Session history load failed:', error.message);
+    return null;
+  }
+}
+
 // Function to save session to Firestore (with localStorage fallback)
 async function saveSessionToFirebase() {
   if (!currentSessionId) return;
@@ -82,6 +134,11 @@ async function saveSessionToFirebase() {
     currentSessionData.endTime = new Date();
     currentSessionData.totalScore = currentSessionData.questions.reduce((sum, q) => sum + (q.pointsEarned || 0), 0);
     
+    // The backend keeps history when it can; Firebase and localStorage are fallbacks
+    if (await saveSessionToServer(userEmail)) {
+      return;
+    }
+    
     console.log('[FIREBASE] Saving session with email:', userEmail);
     console.log('[FIREBASE] Session data:', currentSessionData);
     
@@ -219,6 +276,7 @@ document.addEventListener('DOMContentLoaded', () => {
     const nextBtn = document.getElementById('next-btn');
     const adminSkipBtn = document.getElementById('admin-skip-btn');
     let currentQuestionId = null;
+    let currentQuestionToken = null; // Signed answer token (only when the server runs in token mode)
     let currentSection = sectionSelect.value;
     let currentGrade = null;
     let attemptCount = 0;
@@ -971,19 +1029,25 @@ document.addEventListener('DOMContentLoaded', () => {
         return renderSubtractionVisualization(data, chartContainer, 10); // Grade 2: 10 sections
     }
 
-    function loadQuestion(section) {
-        console.log('[QUESTION] Loading question for section:', section, 'grade:', currentGrade);
-        
-        if (!currentGrade) {
-            console.error('[QUESTION] No grade selected');
-            questionText.textContent = 'Please select a grade to begin.';
-            return;
+    // Questions are fetched in batches: one round trip per QUESTION_BATCH_SIZE questions
+    const QUESTION_BATCH_SIZE = 10;
+    let questionQueue = [];
+    let questionQueueKey = null;
+
+    function fetchNextQuestion(section) {
+        const queueKey = currentGrade + ':' + section;
+        if (questionQueueKey === queueKey && questionQueue.length > 0) {
+            return Promise.resolve(questionQueue.shift());
         }
         
-        const apiUrl = API_BASE_URL + '/question?section=' + section + '&grade=' + currentGrade;
-        console.log('[QUESTION] Fetching from:', apiUrl);
+        // The session id and index keep questions from repeating within this quiz session
+        let apiUrl = API_BASE_URL + '/questions?section=' + section + '&grade=' + currentGrade + '&count=' + QUESTION_BATCH_SIZE;
+        if (currentSessionId) {
+            apiUrl += '&session=' + currentSessionId + '&index=' + sessionQuestionIndex;
+        }
+        console.log('[QUESTION] Fetching batch from:', apiUrl);
         
-        fetch(apiUrl)
+        return fetch(apiUrl)
             .then(res => {
                 console.log('[QUESTION] Response status:', res.status);
                 if (!res.ok) {
@@ -991,6 +1055,26 @@ document.addEventListener('DOMContentLoaded', () => {
                 }
                 return res.json();
             })
+            .then(batch => {
+                questionQueueKey = queueKey;
+                questionQueue = batch.questions;
+                if (batch.nextIndex !== undefined) {
+                    sessionQuestionIndex = batch.nextIndex;
+                }
+                return questionQueue.shift();
+            });
+    }
+
+    function loadQuestion(section) {
+        console.log('[QUESTION] Loading question for section:', section, 'grade:', currentGrade);
+        
+        if (!currentGrade) {
+            console.error('[QUESTION] No grade selected');
+            questionText.textContent = 'Please select a grade to begin.';
+            return;
+        }
+        
+        fetchNextQuestion(section)
             .then(data => {
                 console.log('[QUESTION] ✓ Received question');
                 console.log('[DEBUG] Full data object:', data);
@@ -1007,6 +1091,7 @@ document.addEventListener('DOMContentLoaded', () => {
                     questionText.textContent = data.question;
                 }
                 currentQuestionId = data.id;
+                currentQuestionToken = data.token || null;
                 currentSection = section;
                 currentCorrectAnswer = null;
                 answerFields.innerHTML = '';
@@ -1307,7 +1392,7 @@ document.addEventListener('DOMContentLoaded', () => {
                     fetch(API_BASE_URL + '/get_answer', {
                         method: 'POST',
                         headers: { 'Content-Type': 'application/json' },
-                        body: JSON.stringify({ id: currentQuestionId })
+                        body: JSON.stringify({ id: currentQuestionId, token: currentQuestionToken, grade: currentGrade, section: currentSection })
                     })
                     .then(res => res.json())
                     .then(answerData => {
@@ -1372,7 +1457,7 @@ document.addEventListener('DOMContentLoaded', () => {
         fetch(API_BASE_URL + '/answer', {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({ id: currentQuestionId, answer: userAnswer })
+            body: JSON.stringify({ id: currentQuestionId, token: currentQuestionToken, answer: userAnswer, grade: currentGrade, section: currentSection })
         })
         .then(res => res.json())
         .then(data => {
@@ -1397,7 +1482,8 @@ document.addEventListener('DOMContentLoaded', () => {
                   userAnswer,
                   data.correct_answer,
                   true,
-                  points
+                  points,
+                  currentSection
                 );
                 if (currentSection === 'division') {
                     document.getElementById('quotient-input').disabled = true;
@@ -1442,7 +1528,8 @@ document.addEventListener('DOMContentLoaded', () => {
                       userAnswer,
                       data.correct_answer,
                       false,
-                      0
+                      0,
+                      currentSection
                     );
                     if (currentSection === 'division') {
                         document.getElementById('quotient-input').disabled = true;
@@ -1542,9 +1629,17 @@ document.addEventListener('DOMContentLoaded', () => {
                 return;
             }
             
-            console.log('[DEBUG] Requesting sessions for:', userEmail);
-            console.log('[DEBUG] Firebase db instance:', db);
-            const sessions = await loadUserSessions(userEmail);
+            // Server history comes a page at a time; without it (or before anything was saved
+            // there) fall back to Firebase / localStorage
+            const page = await loadServerSessions(userEmail);
+            let sessions;
+            if (page && page.sessions.length > 0) {
+                sessions = page.sessions;
+            } else {
+                console.log('[DEBUG] Firebase db instance:', db);
+                sessions = await loadUserSessions(userEmail);
+                sessions.sort((a, b) => new Date(b.startTime) - new Date(a.startTime));
+            }
             console.log('[DEBUG] Received sessions:', sessions);
             
             if (sessions.length === 0) {
@@ -1553,30 +1648,10 @@ document.addEventListener('DOMContentLoaded', () => {
             }
             
             historyList.innerHTML = '';
-            sessions.sort((a, b) => new Date(b.startTime) - new Date(a.startTime));
-            
-            sessions.forEach(session => {
-                const sessionDate = new Date(session.startTime).toLocaleDateString();
-                const sessionTime = new Date(session.startTime).toLocaleTimeString();
-                const totalQuestions = session.questions.length;
-                const correctAnswers = session.questions.filter(q => q.correct).length;
-                const score = session.totalScore;
-                const maxPossibleScore = totalQuestions * 10; // 10 points per question maximum
-                
-                const historyItem = document.createElement('div');
-                historyItem.className = 'history-item';
-                historyItem.innerHTML = `
-                    <div class="history-item-header">
-                        <span>Grade ${session.grade} - ${session.section}</span>
-                        <span>${sessionDate} ${sessionTime}</span>
-                    </div>
-                    <div class="history-item-details">
-                        <p>Questions: ${correctAnswers}/${totalQuestions} correct</p>
-                        <div class="history-item-score">Score: ${score}/${maxPossibleScore} points</div>
-                    </div>
-                `;
-                historyList.appendChild(historyItem);
-            });
+            sessions.forEach(renderHistoryItem);
+            if (page && page.next) {
+                addLoadMoreButton(userEmail, page.next);
+            }
         } catch (error) {
             console.error('[ERROR] Failed to load sessions:', error);
             const errorMsg = error.message || 'Unknown error';
@@ -1584,6 +1659,47 @@ document.addEventListener('DOMContentLoaded', () => {
         }
     });
 
+    // One saved session in the history list (server records carry counts, local ones the full question list)
+    function renderHistoryItem(session) {
+        const sessionDate = new Date(session.startTime).toLocaleDateString();
+        const sessionTime = new Date(session.startTime).toLocaleTimeString();
+        const totalQuestions = session.totalQuestions ?? session.questions.length;
+        const correctAnswers = session.correctAnswers ?? session.questions.filter(q => q.correct).length;
+        const score = session.totalScore;
+        const maxPossibleScore = totalQuestions * 10; // 10 points per question maximum
+        
+        const historyItem = document.createElement('div');
+        historyItem.className = 'history-item';
+        historyItem.innerHTML = `
+            <div class="history-item-header">
+                <span>Grade ${session.grade} - ${session.section}</span>
+                <span>${sessionDate} ${sessionTime}</span>
+            </div>
+            <div class="history-item-details">
+                <p>Questions: ${correctAnswers}/${totalQuestions} correct</p>
+                <div class="history-item-score">Score: ${score}/${maxPossibleScore} points</div>
+            </div>
+        `;
+        historyList.appendChild(historyItem);
+    }
+
+    // "Show older sessions" fetches the next page from the server and appends it
+    function addLoadMoreButton(userEmail, before) {
+        const loadMoreBtn = document.createElement('button');
+        loadMoreBtn.textContent = 'Show older sessions';
+        loadMoreBtn.addEventListener('click', async () => {
+            loadMoreBtn.disabled = true;
+            const page = await loadServerSessions(userEmail, before);
+            loadMoreBtn.remove();
+            if (!page) return;
+            page.sessions.forEach(renderHistoryItem);
+            if (page.next) {
+                addLoadMoreButton(userEmail, page.next);
+            }
+        });
+        historyList.appendChild(loadMoreBtn);
+    }
+
     // Close History Modal
     closeHistoryBtn.addEventListener('click', () => {
         historyModal.classList.add('hidden');